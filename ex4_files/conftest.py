@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+from ex4lib.providers import BACKEND_ENV, BACKENDS, NODE_PER_WORKER_ENV, RPC_URL_ENV, XDIST_WORKER_ENV, selected_backend
+
+# Parallel runs (pytest-xdist): `pytest -n auto --backend tester`, or with nodes on consecutive ports from --rpc-url
+# `pytest -n 4 --node-per-worker` (see ex4lib/providers.py).
+
+
+def pytest_addoption(parser):
+    parser.addoption('--backend', choices=BACKENDS, default=None,
+                     help=f"chain backend for the tests (default: ${BACKEND_ENV} or 'http')")
+    parser.addoption('--rpc-url', default=None, help=f"node URL for the http backend (default: ${RPC_URL_ENV})")
+    parser.addoption('--node-per-worker', action='store_true',
+                     help="with pytest-xdist, worker gwN uses the node at the --rpc-url port + N")
+
+
+def pytest_configure(config):
+    # test modules build their Web3 with ex4lib.providers.make_web3(), which reads these variables
+    if config.getoption('backend'):
+        os.environ[BACKEND_ENV] = config.getoption('backend')
+    if config.getoption('rpc_url'):
+        os.environ[RPC_URL_ENV] = config.getoption('rpc_url')
+    if config.getoption('node_per_worker'):
+        os.environ[NODE_PER_WORKER_ENV] = '1'
+    # workers sharing one node would race for its accounts' nonces and revert each other's snapshots
+    parallel = config.getoption('numprocesses', default=None) or os.environ.get(XDIST_WORKER_ENV)
+    if parallel and selected_backend() == 'http' and not os.environ.get(NODE_PER_WORKER_ENV):
+        raise pytest.UsageError("parallel runs on the http backend need a node per worker: add --node-per-worker "
+                                "(nodes on consecutive ports from --rpc-url) or use --backend tester")
@@ -1,40 +1,48 @@
-from web3 import Web3
-import solcx  # type: ignore
+import os
+import sys
 from typing import Any
 from web3.types import Wei
 
-# run the line below to install the compiler ->  only once is needed.
-solcx.install_solc(version='latest')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from ex4lib.compiler import compile_contract  # noqa: E402
+from ex4lib.providers import make_web3  # noqa: E402
+from ex4lib.receipts import ReceiptWaiter  # noqa: E402
+from ex4lib.solc_binary import locked_version  # noqa: E402
+from ex4lib.tx_sender import TxSender, dev_accounts  # noqa: E402
 
+# the compiler is not installed here: the version pinned in solc.lock is looked up locally
+# (see ex4lib/solc_binary.py) and only when greeter.sol is not in the compile cache yet.
 
-def compile(file_name: str) -> Any:
-    # set the version
-    solcx.set_solc_version('0.8.19')
-
-    # compile
-    compiled_sol = solcx.compile_files(
-        [file_name], output_values=['abi', 'bin'])
 
-    # retrieve the contract interface
-    contract_id, contract_interface = compiled_sol.popitem()
+def compile(file_name: str) -> Any:
+    # compile with the pinned version (artifacts are cached, so solc only runs when the source changes)
+    # and retrieve the contract interface
+    contract_interface = compile_contract(file_name, locked_version())
     return contract_interface['bin'], contract_interface['abi']
 
 
 bytecode, abi = compile("greeter.sol")
 
 
-# Connect to the blockchain: (Hardhat node should be running at this port)
-w3 = Web3(Web3.HTTPProvider("http://127.0.0.1:8545"))
+# Connect to the blockchain: (Hardhat node should be running at this port, or set EX4_BACKEND=tester
+# to use an in-process EVM instead)
+w3 = make_web3()
+
+# Transactions are signed here with the keys of the node's pre-made accounts and sent raw; the sender keeps
+# track of nonces and gas limits itself, so each write below is a single request to the node.
+accounts = dev_accounts(w3, 3)
+sender = TxSender(w3, accounts)
+# waits for receipts by following new blocks (one request per block, not one per hash and poll)
+receipts = ReceiptWaiter(w3)
 
 # deploy the contract
 Greeter = w3.eth.contract(abi=abi, bytecode=bytecode)
 
 # Submit the transaction that deploys the contract. It is deployed by accounts[0] which is the first of the 10 pre-made accounts created by hardhat.
-tx_hash = Greeter.constructor("Hello!").transact(
-    {'from': w3.eth.accounts[0]})
+tx_hash = sender.deploy(Greeter.constructor("Hello!"), accounts[0].address)
 
 # Wait for the transaction to be mined, and get the transaction receipt
-tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+tx_receipt = receipts.wait_one(tx_hash)
 
 # get a contract instance
 print(tx_receipt)
@@ -43,30 +51,28 @@ greeter = w3.eth.contract(address=tx_receipt["contractAddress"], abi=abi)
 # here we call a view function (that does not require a transaction to the blockchain). This is done via '.call()'
 print(greeter.functions.greet().call())
 
-# here we call a function that changes the state and does require a blockchain transaction. This is done via '.transact()'
-tx_hash = greeter.functions.setGreeting(
-    'Nihao').transact({"from": w3.eth.accounts[1]})  # type: ignore
+# here we call a function that changes the state and does require a blockchain transaction.
+# (with an unlocked account this would be .transact({'from': ...}); the sender signs it locally instead)
+tx_hash = sender.transact(greeter.functions.setGreeting('Nihao'), accounts[1].address)
 
 # wait for a transaction to be mined.
-tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+tx_receipt = receipts.wait_one(tx_hash)
 
 # check the greeting again.
 print(greeter.functions.greet().call())
 
-tx_hash = w3.eth.send_transaction({
+tx_hash = sender.send({
     'to': greeter.address,
-    'from': w3.eth.accounts[1],  # type: ignore
+    'from': accounts[1].address,
     'value': Wei(10**16)
 })
-tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+tx_receipt = receipts.wait_one(tx_hash)
 
 print("the contract's balance is:", w3.eth.get_balance(greeter.address))
 
 # now we withdraw:
-tx_hash = greeter.functions.withdraw().transact(
-    {"from": w3.eth.accounts[2]})  # type: ignore
-tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+tx_hash = sender.transact(greeter.functions.withdraw(), accounts[2].address)
+tx_receipt = receipts.wait_one(tx_hash)
 
 print("the contract's balance is:", w3.eth.get_balance(greeter.address))
-print("account 2 now has:", w3.eth.get_balance(
-    w3.eth.accounts[2]))  # type: ignore
+print("account 2 now has:", w3.eth.get_balance(accounts[2].address))
@@ -0,0 +1 @@
+# Shared helpers for the exercise scripts and tests (compiling, connecting, sending, reading).
@@ -0,0 +1,142 @@
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from eth_abi import decode, encode
+from eth_utils import function_abi_to_4byte_selector, to_checksum_address
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.contract.contract import ContractFunction
+from web3.types import BlockIdentifier
+
+# Read-only requests (eth_call, eth_getBalance, eth_getStorageAt) collected and sent as a single JSON-RPC batch.
+# Contract calls are encoded and decoded here, so results come back in order as plain Python values.
+# Providers without batch support (e.g. the in-process tester) get the same requests one by one.
+
+
+class BatchRequestError(RuntimeError):
+    def __init__(self, index: int, method: str, error: Any):
+        super().__init__(f"request #{index} ({method}) failed: {error}")
+        self.index = index
+        self.error = error
+
+
+def _abi_type(param: dict) -> str:
+    # the canonical type of an ABI parameter, with tuples spelled out as (t1,t2,...)
+    if param['type'].startswith('tuple'):
+        return '(' + ','.join(_abi_type(c) for c in param['components']) + ')' + param['type'][len('tuple'):]
+    return param['type']
+
+
+def _normalize(abi_type: str, value: Any) -> Any:
+    # addresses decode as lowercase hex; web3 hands them out checksummed, so do the same
+    if abi_type == 'address':
+        return to_checksum_address(value)
+    if abi_type.endswith(']'):
+        inner = abi_type[:abi_type.rindex('[')]
+        return [_normalize(inner, v) for v in value]
+    if abi_type.startswith('('):
+        return tuple(_normalize(t, v) for t, v in zip(_split_tuple(abi_type), value))
+    return value
+
+
+def _split_tuple(abi_type: str) -> List[str]:
+    parts, depth, start = [], 0, 1
+    for i, c in enumerate(abi_type[1:-1], start=1):
+        if c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c == ',' and depth == 0:
+            parts.append(abi_type[start:i])
+            start = i + 1
+    parts.append(abi_type[start:-1])
+    return parts
+
+
+def encode_call(function: ContractFunction) -> Tuple[HexBytes, Callable[[bytes], Any]]:
+    # Returns the calldata for a bound contract function and a decoder for its return data.
+    abi = function.abi
+    input_types = [_abi_type(p) for p in abi['inputs']]
+    output_types = [_abi_type(p) for p in abi['outputs']]
+    data = HexBytes(function_abi_to_4byte_selector(abi) + encode(input_types, list(function.args)))
+
+    def decoder(raw: bytes) -> Any:
+        values = [_normalize(t, v) for t, v in zip(output_types, decode(output_types, raw))]
+        return values[0] if len(values) == 1 else tuple(values)
+
+    return data, decoder
+
+
+def _to_int(result: Any) -> int:
+    return int(result, 16) if isinstance(result, str) else int(result)
+
+
+class BatchReader:
+    def __init__(self, w3: Web3, block_identifier: BlockIdentifier = 'latest', sender: Optional[str] = None):
+        # sender is the msg.sender of the eth_calls
+        self.w3 = w3
+        self.sender = sender
+        # a tag or hex string as given, a block number in hex, a block hash (bytes) as 0x-hex
+        if isinstance(block_identifier, str):
+            self.block = block_identifier
+        elif isinstance(block_identifier, (bytes, bytearray)):
+            self.block = HexBytes(block_identifier).to_0x_hex()
+        else:
+            self.block = hex(block_identifier)
+        # for the unbatched path, which takes block numbers as ints but block hashes only as hex
+        self._block_identifier = self.block if isinstance(block_identifier, (bytes, bytearray)) else block_identifier
+        self._requests: List[Tuple[str, list, Callable[[Any], Any]]] = []
+
+    def __len__(self) -> int:
+        return len(self._requests)
+
+    def add(self, method: str, params: list, decoder: Callable[[Any], Any] = lambda result: result) -> int:
+        # queues a raw JSON-RPC request; returns its index in the results of execute()
+        self._requests.append((method, params, decoder))
+        return len(self._requests) - 1
+
+    def call(self, function: ContractFunction) -> int:
+        # e.g. reader.call(contract.functions.balanceOf(player))
+        data, decoder = encode_call(function)
+        transaction = {'to': function.address, 'data': Web3.to_hex(data)}
+        if self.sender:
+            transaction['from'] = self.sender
+        return self.add('eth_call', [transaction, self.block], lambda result: decoder(HexBytes(result)))
+
+    def balance(self, address: str) -> int:
+        return self.add('eth_getBalance', [address, self.block], _to_int)
+
+    def storage_at(self, address: str, slot: int) -> int:
+        return self.add('eth_getStorageAt', [address, hex(slot), self.block], HexBytes)
+
+    def execute(self) -> List[Any]:
+        # sends everything queued so far and returns the decoded results in the order they were added
+        requests, self._requests = self._requests, []
+        if not requests:
+            return []
+        payload = [(method, params) for method, params, _ in requests]
+        provider: Any = self.w3.provider
+        if not hasattr(provider, 'make_batch_request'):
+            # no batching here: go through web3's normal request path (and its error handling) one by one.
+            # (eth-tester takes block numbers as ints, and rejects hex ones for some methods)
+            return [decoder(self.w3.manager.request_blocking(  # type: ignore
+                        method, [self._block_identifier if param is self.block else param for param in params]))
+                    for method, params, decoder in requests]
+        responses = provider.make_batch_request(payload)
+        if not isinstance(responses, list):
+            raise BatchRequestError(0, 'batch', responses.get('error', responses))
+        # servers may answer a batch in any order; the ids follow the request order
+        responses = sorted(responses, key=lambda r: r['id'])
+        results = []
+        for index, ((method, _, decoder), response) in enumerate(zip(requests, responses)):
+            if response.get('error') is not None:
+                raise BatchRequestError(index, method, response['error'])
+            results.append(decoder(response['result']))
+        return results
+
+
+def batch_call(w3: Web3, functions: Sequence[ContractFunction], block_identifier: BlockIdentifier = 'latest') -> List[Any]:
+    # [f.call() for f in functions], in one round-trip
+    reader = BatchReader(w3, block_identifier)
+    for function in functions:
+        reader.call(function)
+    return reader.execute()
@@ -0,0 +1,56 @@
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from web3 import Web3
+from web3.exceptions import MethodUnavailable
+
+# Chain control for development nodes (Hardhat and the in-process tester): snapshots, reverts and mining.
+
+
+def _rpc(w3: Web3, method: str, *params: Any) -> Any:
+    # request_blocking raises on a JSON-RPC error instead of handing back the raw response.
+    return w3.manager.request_blocking(method, list(params))  # type: ignore
+
+
+def snapshot(w3: Web3) -> Any:
+    # Records the current chain state and returns its id (to be passed to revert()).
+    return _rpc(w3, 'evm_snapshot')
+
+
+def revert(w3: Web3, snapshot_id: Any) -> None:
+    # Restores the chain state recorded by snapshot(). A snapshot id can only be reverted to once.
+    # Hardhat answers true/false, the in-process tester answers null (and raises on an unknown id).
+    if _rpc(w3, 'evm_revert', snapshot_id) is False:
+        raise RuntimeError(f"evm_revert to snapshot {snapshot_id} failed")
+
+
+def mine(w3: Web3, blocks: int = 1) -> None:
+    # Mines blocks empty blocks in one request: hardhat_mine on Hardhat (and Anvil), evm_mine with a count on the
+    # in-process tester. Other nodes get one evm_mine per block.
+    if blocks <= 0:
+        return
+    if hasattr(w3.provider, 'ethereum_tester'):
+        _rpc(w3, 'evm_mine', blocks)
+        return
+    try:
+        _rpc(w3, 'hardhat_mine', hex(blocks))
+    except MethodUnavailable:
+        for _ in range(blocks):
+            _rpc(w3, 'evm_mine')
+
+
+def mine_to(w3: Web3, block_number: int) -> None:
+    # Mines until the chain head is block_number (nothing if it is already there or past it).
+    mine(w3, block_number - w3.eth.block_number)
+
+
+@contextmanager
+def isolated(w3: Web3) -> Iterator[None]:
+    # Whatever happens inside (mined blocks, transactions) is reverted on exit.
+    #   with chain.isolated(w3):
+    #       chain.mine(w3, 10_000)
+    snapshot_id = snapshot(w3)
+    try:
+        yield
+    finally:
+        revert(w3, snapshot_id)
@@ -0,0 +1,151 @@
+import os
+import secrets
+import sqlite3
+import time
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from eth_hash.auto import keccak
+
+from ex4lib.rps_types import Move
+
+# Local store for the (gameID, move, key, commitment) of every move we commit to, so revealMove can find its key.
+# Rows are looked up by commitment (primary key) or by game id (indexed). Writes are grouped: they go into an open
+# transaction that is committed (and so fsynced) every batch_size records, on flush() and on close(); a crash loses
+# at most the last unflushed batch, so flush() before sending the makeMove transactions that use them.
+# The keys are stored in plain text: the file is created readable by its owner only.
+# Game ids are uint256 and are stored as decimal text, like in rps_indexer.
+
+DEFAULT_BATCH_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS commitments (
+    commitment BLOB PRIMARY KEY,
+    game_id TEXT NOT NULL,
+    player TEXT,
+    move INTEGER NOT NULL,
+    key BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS commitments_by_game ON commitments (game_id);
+"""
+
+
+def commitment_of(move: int, key: bytes) -> bytes:
+    # keccak256(abi.encodePacked(int256(move), bytes32(key))), as checked by RPS.revealMove
+    return keccak(int(move).to_bytes(32, 'big', signed=True) + key)
+
+
+class VaultEntry(NamedTuple):
+    commitment: bytes
+    game_id: int
+    player: Optional[str]
+    move: Move
+    key: bytes
+    created_at: float
+    done: bool
+
+
+class CommitmentVault:
+    def __init__(self, db_path: str, batch_size: int = DEFAULT_BATCH_SIZE):
+        if db_path != ':memory:' and not os.path.exists(db_path):
+            os.close(os.open(db_path, os.O_CREAT | os.O_WRONLY, 0o600))
+        self.batch_size = batch_size
+        self._pending = 0
+        # autocommit off: we decide when a batch is committed
+        self.db = sqlite3.connect(db_path, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = FULL')
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self) -> 'CommitmentVault':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.flush()
+        self.db.close()
+
+    def flush(self) -> None:
+        # commits (and fsyncs) every record added since the last flush
+        if self.db.in_transaction:
+            self.db.execute('COMMIT')
+        self._pending = 0
+
+    ##### writing #####
+
+    def add(self, game_id: int, move: int, key: bytes, commitment: Optional[bytes] = None,
+            player: Optional[str] = None) -> bytes:
+        # Stores one record and returns its commitment (computed from move and key unless given).
+        if commitment is None:
+            commitment = commitment_of(move, key)
+        self.add_many([(game_id, move, key, commitment)], player)
+        return commitment
+
+    def add_many(self, records: Iterable[Tuple[int, int, bytes, bytes]], player: Optional[str] = None) -> int:
+        # Stores (game_id, move, key, commitment) records; returns how many were added.
+        now = time.time()
+        rows = [(bytes(commitment), str(game_id), player, int(move), bytes(key), now)
+                for game_id, move, key, commitment in records]
+        if not self.db.in_transaction:
+            self.db.execute('BEGIN')
+        self.db.executemany('INSERT INTO commitments (commitment, game_id, player, move, key, created_at) '
+                            'VALUES (?, ?, ?, ?, ?, ?)', rows)
+        self._pending += len(rows)
+        if self._pending >= self.batch_size:
+            self.flush()
+        return len(rows)
+
+    def new_commitment(self, game_id: int, move: int, player: Optional[str] = None) -> bytes:
+        # Draws a fresh key for the move, stores it and returns the commitment to send with makeMove.
+        return self.add(game_id, move, secrets.token_bytes(32), player=player)
+
+    def mark_done(self, game_id: int) -> None:
+        # the game ended (revealed, canceled or timed out): its rows may be dropped by compact()
+        if not self.db.in_transaction:
+            self.db.execute('BEGIN')
+        self.db.execute('UPDATE commitments SET done = 1 WHERE game_id = ?', (str(game_id),))
+
+    ##### reading #####
+
+    def lookup(self, commitment: bytes) -> Optional[VaultEntry]:
+        row = self.db.execute('SELECT * FROM commitments WHERE commitment = ?', (bytes(commitment),)).fetchone()
+        return None if row is None else self._entry(row)
+
+    def for_game(self, game_id: int, player: Optional[str] = None) -> List[VaultEntry]:
+        # Every record of the game (one per side we play), oldest first.
+        query, params = 'SELECT * FROM commitments WHERE game_id = ?', [str(game_id)]
+        if player is not None:
+            query += ' AND player = ?'
+            params.append(player)
+        return [self._entry(row) for row in self.db.execute(query + ' ORDER BY created_at', params)]
+
+    def reveal_args(self, game_id: int, player: Optional[str] = None) -> Optional[Tuple[int, bytes]]:
+        # (move, key) for revealMove on the game, or None if we have no open commitment for it
+        entries = [entry for entry in self.for_game(game_id, player) if not entry.done]
+        return (int(entries[-1].move), entries[-1].key) if entries else None
+
+    def __len__(self) -> int:
+        return self.db.execute('SELECT COUNT(*) FROM commitments').fetchone()[0]
+
+    @staticmethod
+    def _entry(row: tuple) -> VaultEntry:
+        commitment, game_id, player, move, key, created_at, done = row
+        return VaultEntry(commitment, int(game_id), player, Move(move), key, created_at, bool(done))
+
+    ##### compaction #####
+
+    def compact(self, expire_before: Optional[float] = None) -> int:
+        # Deletes finished records, and (if expire_before is given) any record created before that time.
+        # Returns how many rows were deleted and gives the freed pages back to the file system.
+        self.flush()
+        self.db.execute('BEGIN')
+        deleted = self.db.execute('DELETE FROM commitments WHERE done = 1').rowcount
+        if expire_before is not None:
+            deleted += self.db.execute('DELETE FROM commitments WHERE created_at < ?', (expire_before,)).rowcount
+        self.db.execute('COMMIT')
+        self.db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        self.db.execute('VACUUM')
+        return deleted
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import solcx  # type: ignore
+
+from ex4lib.solc_binary import locked_version, resolve_solc
+
+# Compiled artifacts are keyed on everything that can change solc's output: the bytes of every source
+# file (and the local files it imports), the compiler version, the requested outputs and the options.
+# They are kept in memory for the lifetime of the process and persisted as one JSON file per key.
+
+DEFAULT_OUTPUT_VALUES = ('abi', 'bin')
+CACHE_DIR = Path(os.environ.get(
+    'SOLC_CACHE_DIR', Path(__file__).resolve().parent.parent / '.solc_cache'))
+
+_IMPORT_RE = re.compile(r'^\s*import\s+(?:[^;"\']*?\bfrom\s+)?["\']([^"\']+)["\']', re.MULTILINE)
+
+_memory_cache: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+PathLike = Union[str, Path]
+
+
+def _source_closure(files: Iterable[PathLike]) -> List[Tuple[str, bytes]]:
+    # Returns (name, content) for the given files and every local file they import, in a stable order.
+    # Imports that cannot be resolved on disk (e.g. remapped packages) are kept by name only.
+    seen: Dict[str, bytes] = {}
+    pending = [Path(f).resolve() for f in files]
+    while pending:
+        path = pending.pop()
+        name = str(path)
+        if name in seen:
+            continue
+        if not path.is_file():
+            seen[name] = b''
+            continue
+        content = path.read_bytes()
+        seen[name] = content
+        for imported in _IMPORT_RE.findall(content.decode('utf-8', errors='replace')):
+            pending.append((path.parent / imported).resolve())
+    return sorted(seen.items())
+
+
+def cache_key(files: Sequence[PathLike], solc_version: str,
+              output_values: Sequence[str] = DEFAULT_OUTPUT_VALUES, **options: Any) -> str:
+    # the content hash that identifies a compilation; file locations only matter through their contents.
+    digest = hashlib.sha256()
+    digest.update(json.dumps({
+        'solc_version': str(solc_version).lstrip('v'),
+        'output_values': sorted(output_values),
+        'options': options,
+    }, sort_keys=True, default=str).encode())
+    for name, content in _source_closure(files):
+        digest.update(Path(name).name.encode())
+        digest.update(hashlib.sha256(content).digest())
+    return digest.hexdigest()
+
+
+def _read_disk(key: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    try:
+        with open(CACHE_DIR / f'{key}.json') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_disk(key: str, artifacts: Dict[str, Dict[str, Any]]) -> None:
+    # written to a temporary file first so that concurrent test workers never read half a file.
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = CACHE_DIR / f'{key}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(artifacts, f)
+        os.replace(tmp_path, CACHE_DIR / f'{key}.json')
+    except OSError:
+        pass  # a read-only checkout still compiles, it just does not persist anything.
+
+
+def compile_files(files: Sequence[PathLike], solc_version: Optional[str] = None,
+                  output_values: Sequence[str] = DEFAULT_OUTPUT_VALUES, **options: Any) -> Dict[str, Dict[str, Any]]:
+    # Same result as solcx.compile_files (a dict of "file:Contract" -> interface), served from the cache when possible.
+    # The returned dict is shared between callers, so treat it as read-only.
+    # solc_version defaults to the one pinned in solc.lock; the binary is only looked up on a cache miss.
+    files = [str(f) for f in files]
+    solc_version = solc_version or locked_version()
+    key = cache_key(files, solc_version, output_values, **options)
+    artifacts = _memory_cache.get(key)
+    if artifacts is None:
+        artifacts = _read_disk(key)
+        if artifacts is None:
+            artifacts = solcx.compile_files(
+                files, output_values=list(output_values), solc_binary=resolve_solc(solc_version), **options)
+            _write_disk(key, artifacts)
+        _memory_cache[key] = artifacts
+    return artifacts
+
+
+def compile_contract(file_name: PathLike, solc_version: Optional[str] = None, contract_name: Optional[str] = None,
+                     output_values: Sequence[str] = DEFAULT_OUTPUT_VALUES, **options: Any) -> Dict[str, Any]:
+    # Returns the interface of a single contract in file_name.
+    # Without a contract_name this is the last contract solc reports, like the old `popitem()` helpers.
+    artifacts = compile_files([file_name], solc_version, output_values, **options)
+    if contract_name is None:
+        return artifacts[list(artifacts)[-1]]
+    for contract_id, interface in artifacts.items():
+        if contract_id.rsplit(':', 1)[-1] == contract_name:
+            return interface
+    raise KeyError(f"contract {contract_name} not found in {file_name}")
@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.contract import Contract
+
+from ex4lib import chain
+from ex4lib.compiler import compile_contract
+from ex4lib.providers import BACKENDS, make_web3
+from ex4lib.solc_binary import locked_version
+
+# Gas benchmark for every entry point of RPS, Wallet (VulnerableWallet.sol), Wallet2 and WalletAttack.
+# Each scenario runs on a fresh snapshot of the chain and records the gasUsed of its transactions under a name like
+# "RPS.makeMove[first,win,cold id]", each name once. The report is JSON; --baseline compares it with a committed
+# report and exits with status 1 when an entry got more expensive than the threshold allows. A missing baseline is an
+# error (nothing would ever be flagged) unless --update-baseline is given to create it.
+#
+#   python -m ex4lib.gas_bench --backend tester                     (run and print)
+#   python -m ex4lib.gas_bench --update-baseline                    (after an intended gas change)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, 'gas_baseline.json')
+DEFAULT_THRESHOLD = 0.01
+REVEAL_PHASE_LENGTH = 4
+
+
+class GasBench:
+    def __init__(self, w3: Web3):
+        self.w3 = w3
+        self.accounts = w3.eth.accounts
+        self.results: Dict[str, int] = {}
+
+    def record(self, name: str, tx_hash: Any) -> Any:
+        # a repeated name would silently replace the earlier measurement
+        if name in self.results:
+            raise ValueError(f"gas already recorded under {name!r}")
+        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        self.results[name] = receipt.gasUsed
+        return receipt
+
+    def deploy(self, file_name: str, contract_name: str, *args: Any, record: bool = True) -> Contract:
+        # record=False for a contract deployed again only to set up a scenario
+        contract_interface = compile_contract(os.path.join(ROOT, file_name), contract_name=contract_name)
+        factory = self.w3.eth.contract(abi=contract_interface['abi'], bytecode=contract_interface['bin'])
+        tx_hash = factory.constructor(*args).transact({'from': self.accounts[0]})
+        if record:
+            receipt = self.record(f'{contract_name}.constructor', tx_hash)
+        else:
+            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        return self.w3.eth.contract(address=receipt.contractAddress, abi=contract_interface['abi'])
+
+
+def _commitment(move: int, key: bytes) -> HexBytes:
+    return HexBytes(Web3.solidity_keccak(['int256', 'bytes32'], [move, key]))
+
+
+def rps_scenarios(bench: GasBench) -> None:
+    w3, (_, player1, player2) = bench.w3, bench.accounts[:3]
+    rps = bench.deploy('part2/RPS.sol', 'RPS', REVEAL_PHASE_LENGTH)
+    fn = rps.functions
+    bet = w3.to_wei(1, 'ether')
+    key1, key2 = b'\x01' * 32, b'\x02' * 32
+
+    bench.record('RPS.receive[first deposit]', rps.receive().transact({'from': player1, 'value': 5 * bet}))
+    bench.record('RPS.receive[top-up]', rps.receive().transact({'from': player1, 'value': 5 * bet}))
+    rps.receive().transact({'from': player2, 'value': 10 * bet})
+
+    def commit_both(game_id: int, move1: int, move2: int, label: str) -> None:
+        bench.record(f'RPS.makeMove[first,{label}]',
+                     fn.makeMove(game_id, bet, _commitment(move1, key1)).transact({'from': player1}))
+        bench.record(f'RPS.makeMove[second,{label}]',
+                     fn.makeMove(game_id, bet, _commitment(move2, key2)).transact({'from': player2}))
+
+    # win on a fresh id, then a tie on the same (reused) id
+    commit_both(1, 1, 3, 'win,cold id')
+    bench.record('RPS.revealMove[first]', fn.revealMove(1, 1, key1).transact({'from': player1}))
+    bench.record('RPS.revealMove[final,win]', fn.revealMove(1, 3, key2).transact({'from': player2}))
+    commit_both(1, 2, 2, 'tie,reused id')
+    fn.revealMove(1, 2, key1).transact({'from': player1})
+    bench.record('RPS.revealMove[final,tie]', fn.revealMove(1, 2, key2).transact({'from': player2}))
+
+    # timeout: only player1 reveals
+    commit_both(2, 1, 2, 'timeout,cold id')
+    fn.revealMove(2, 1, key1).transact({'from': player1})
+    chain.mine(w3, REVEAL_PHASE_LENGTH)
+    bench.record('RPS.revealPhaseEnded', fn.revealPhaseEnded(2).transact({'from': player1}))
+
+    fn.makeMove(3, bet, _commitment(1, key1)).transact({'from': player1})
+    bench.record('RPS.cancelGame', fn.cancelGame(3).transact({'from': player1}))
+    bench.record('RPS.withdraw', fn.withdraw(bet).transact({'from': player1}))
+
+    # a game without a standing balance: deposit with the commit, withdraw with the final reveal
+    bench.record('RPS.depositAndMakeMove[first]',
+                 fn.depositAndMakeMove(4, bet, _commitment(1, key1)).transact({'from': player1, 'value': bet}))
+    fn.depositAndMakeMove(4, bet, _commitment(3, key2)).transact({'from': player2, 'value': bet})
+    fn.revealMove(4, 3, key2).transact({'from': player2})
+    bench.record('RPS.revealMoveAndWithdraw[final,win]', fn.revealMoveAndWithdraw(4, 1, key1).transact({'from': player1}))
+
+
+def wallet_scenarios(bench: GasBench) -> None:
+    w3, (owner, user, receiver) = bench.w3, bench.accounts[:3]
+    for file_name, contract_name in [('part1/VulnerableWallet.sol', 'Wallet'), ('part1/Wallet2.sol', 'Wallet2')]:
+        wallet = bench.deploy(file_name, contract_name)
+        bench.record(f'{contract_name}.deposit[first]',
+                     wallet.functions.deposit().transact({'from': user, 'value': w3.to_wei(1, 'ether')}))
+        bench.record(f'{contract_name}.deposit[top-up]',
+                     wallet.functions.deposit().transact({'from': user, 'value': w3.to_wei(1, 'ether')}))
+        if contract_name == 'Wallet':
+            tx_hash = wallet.functions.sendTo(receiver).transact({'from': user})
+        else:
+            # Wallet2 only lets you send exactly your whole balance
+            tx_hash = wallet.functions.sendTo(receiver, w3.to_wei(2, 'ether')).transact({'from': user})
+        bench.record(f'{contract_name}.sendTo', tx_hash)
+
+
+def attack_scenarios(bench: GasBench) -> None:
+    w3, (owner, attacker) = bench.w3, bench.accounts[:2]
+    wallet = bench.deploy('part1/VulnerableWallet.sol', 'Wallet', record=False)
+    wallet.functions.deposit().transact({'from': owner, 'value': w3.to_wei(3, 'ether')})
+    attack = bench.deploy('part1/WalletAttack.sol', 'WalletAttack')
+    # the reentrant calls make gas estimation unreliable, so the limit is explicit
+    bench.record('WalletAttack.exploit', attack.functions.exploit(wallet.address).transact(
+        {'from': attacker, 'value': w3.to_wei(1, 'ether'), 'gas': 3_000_000}))
+
+
+SCENARIOS: List[Callable[[GasBench], None]] = [rps_scenarios, wallet_scenarios, attack_scenarios]
+
+
+def run(w3: Web3, bench: Optional[GasBench] = None) -> Dict[str, Any]:
+    # Runs every scenario, each from the same chain state, and returns the report.
+    bench = bench or GasBench(w3)
+    for scenario in SCENARIOS:
+        snapshot_id = chain.snapshot(w3)
+        try:
+            scenario(bench)
+        finally:
+            chain.revert(w3, snapshot_id)
+    return {'solc_version': locked_version(), 'gas': dict(sorted(bench.results.items()))}
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[str, Optional[int], int]]:
+    # Returns (name, baseline gas, new gas) for every entry that grew by more than threshold (a fraction).
+    # Entries missing from the baseline are not regressions; --update-baseline adds them.
+    regressions = []
+    for name, gas in report['gas'].items():
+        old = baseline.get('gas', {}).get(name)
+        if old is not None and gas > old * (1 + threshold):
+            regressions.append((name, old, gas))
+    return regressions
+
+
+def _print_table(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    old_gas = baseline.get('gas', {})
+    for name, gas in report['gas'].items():
+        old = old_gas.get(name)
+        change = '' if old is None else f'{gas - old:+d} ({(gas - old) / old:+.1%})'
+        print(f'{name:40} {gas:>10} {change}')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Gas benchmark for the RPS and Wallet contracts')
+    parser.add_argument('--backend', choices=BACKENDS, default=None)
+    parser.add_argument('--rpc-url', default=None)
+    parser.add_argument('--report', default='gas_report.json', help='where to write this run (JSON)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed relative increase per entry, e.g. 0.01 for 1%%')
+    parser.add_argument('--update-baseline', action='store_true', help='write this run as the new baseline')
+    args = parser.parse_args(argv)
+    if not args.update_baseline and not os.path.exists(args.baseline):
+        parser.error(f'no baseline at {args.baseline}; run with --update-baseline to create it')
+
+    report = run(make_web3(args.backend, args.rpc_url))
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        # only with --update-baseline: this run becomes the first baseline
+        baseline = {}
+    _print_table(report, baseline)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        return 0
+    if baseline and baseline.get('solc_version') != report['solc_version']:
+        print(f"baseline was made with solc {baseline.get('solc_version')}, this run used {report['solc_version']}")
+    regressions = compare(report, baseline, args.threshold)
+    for name, old, new in regressions:
+        print(f'REGRESSION {name}: {old} -> {new}', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
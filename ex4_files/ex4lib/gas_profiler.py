@@ -0,0 +1,558 @@
+import argparse
+import bisect
+import fnmatch
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import requests
+from eth_utils import to_checksum_address
+from hexbytes import HexBytes
+from web3 import Web3
+
+from ex4lib import gas_bench
+from ex4lib.compiler import compile_contract
+from ex4lib.providers import BACKENDS, make_web3
+
+# Gas profiler: where inside a transaction does the gas go, per opcode, per Solidity source line and per call stack.
+# A mined transaction is replayed step by step, either by the node (debug_traceTransaction, e.g. Hardhat; the
+# struct logs are parsed as they arrive, so a trace never has to fit in memory) or, on the in-process eth-tester
+# chain, by py-evm with its opcodes wrapped for the duration of the replay. Program counters are mapped back to
+# source lines with the compiler's source maps, so the contracts must be registered with artifacts compiled with
+# PROFILE_OUTPUT_VALUES.
+#
+# Each step is charged the gas it used itself: a CALL/CREATE is charged its own cost (access, value transfer,
+# memory), not the gas its callee used, which is charged to the callee's own steps. What no step pays for (the
+# intrinsic cost of the transaction, less the refunds) is reported on its own line.
+#
+#   python -m ex4lib.gas_profiler --backend tester --only 'RPS.revealMove*'    (profiles the gas_bench scenarios)
+#   flamegraph.pl gas_profile/all.folded > gas.svg                           (or open it in speedscope)
+
+PROFILE_OUTPUT_VALUES = ('abi', 'bin', 'bin-runtime', 'srcmap', 'srcmap-runtime', 'ast')
+CALL_OPS = frozenset({'CALL', 'CALLCODE', 'DELEGATECALL', 'STATICCALL', 'CREATE', 'CREATE2'})
+CREATE_OPS = frozenset({'CREATE', 'CREATE2'})
+TRANSACTION_LINE = '[transaction: intrinsic gas - refunds]'
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+class Step(NamedTuple):
+    depth: int  # 1 for the transaction's own frame
+    pc: int
+    op: str
+    gas: int  # gas left before the step
+    gas_cost: int  # what the step itself cost (not meaningful for CALL_OPS)
+    address: Optional[str] = None  # whose code runs (None if unknown)
+    creation: bool = False  # the code is init code (a deployment or CREATE)
+    error: bool = False  # the step failed and the frame lost all its gas (not a REVERT)
+
+
+##### struct logs (debug_traceTransaction) #####
+
+def iter_json_array(chunks: Iterable[bytes], key: bytes = b'"structLogs"') -> Iterator[Any]:
+    # Yields the items of the JSON array under key, parsing the document as its chunks arrive: only one item is
+    # ever held in memory. Raises ValueError if the document has no such array (e.g. a JSON-RPC error).
+    chunks = iter(chunks)
+    head = b''
+    for chunk in chunks:
+        head += chunk
+        found = head.find(key)
+        if found != -1:
+            break
+    else:
+        raise ValueError(f"no {key.decode()} in the response: {head[:500].decode(errors='replace')}")
+
+    item = bytearray()
+    nesting, in_string, in_array = 0, False, False
+    skip = -1  # index (in the current chunk) of a character escaped by a backslash
+    for chunk in _chain_first(head[found + len(key):], chunks):
+        item_start = 0
+        for match in _JSON_SPECIAL.finditer(chunk):
+            i = match.start()
+            if i == skip:
+                continue
+            char = chunk[i]
+            if not in_array:
+                in_array = char == ord('[')
+            elif in_string:
+                if char == ord('\\'):
+                    skip = i + 1
+                elif char == ord('"'):
+                    in_string = False
+            elif char == ord('"'):
+                in_string = True
+            elif char in b'{[':
+                if not nesting:
+                    item_start = i
+                nesting += 1
+            elif not nesting:
+                return  # the end of the array
+            else:
+                nesting -= 1
+                if not nesting:
+                    item += chunk[item_start:i + 1]
+                    yield json.loads(item)
+                    item.clear()
+        if nesting:
+            item += chunk[item_start:]
+        skip -= len(chunk)
+
+
+_JSON_SPECIAL = re.compile(rb'[][{}"\\]')
+
+
+def _chain_first(first: bytes, rest: Iterator[bytes]) -> Iterator[bytes]:
+    yield first
+    yield from rest
+
+
+def stream_struct_logs(w3: Web3, tx_hash: Any, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    # The struct logs of debug_traceTransaction, read from the HTTP response as it streams in. Memory and storage
+    # are left out of the trace; the stack is needed to follow calls.
+    payload = {'jsonrpc': '2.0', 'id': 1, 'method': 'debug_traceTransaction',
+               'params': [HexBytes(tx_hash).to_0x_hex(),
+                          {'disableMemory': True, 'disableStorage': True, 'enableMemory': False}]}
+    with requests.post(w3.provider.endpoint_uri, json=payload, stream=True) as response:
+        response.raise_for_status()
+        yield from iter_json_array(response.iter_content(chunk_size))
+
+
+def steps_from_struct_logs(logs: Iterable[Dict[str, Any]], address: str, creation: bool = False) -> Iterator[Step]:
+    # Steps of the transaction to address (the new contract if creation), following the calls it makes to find
+    # whose code every step runs (the callee address is read from the stack of the call).
+    frames: List[Tuple[Optional[str], bool]] = [(address, creation)]
+    called: Optional[Tuple[int, Optional[str], bool]] = None
+    for log in logs:
+        depth = log['depth']
+        if called is not None and depth == called[0] + 1:
+            frames.append(called[1:])
+        del frames[depth:]
+        called = None
+        op = log['op']
+        if op in CALL_OPS:
+            stack = log.get('stack') or []
+            if op in CREATE_OPS:
+                called = (depth, None, True)
+            elif len(stack) >= 2:
+                called = (depth, to_checksum_address(int(stack[-2], 16).to_bytes(32, 'big')[12:]), False)
+        error = bool(log.get('error')) and op != 'REVERT'
+        code_address, code_creation = frames[depth - 1] if depth <= len(frames) else (None, False)
+        yield Step(depth, log['pc'], op, int(log['gas']), int(log['gasCost']), code_address, code_creation, error)
+
+
+##### in-process replay (eth-tester / py-evm) #####
+
+def _mnemonic(opcode_fn: Any) -> str:
+    while not hasattr(opcode_fn, 'mnemonic') and hasattr(opcode_fn, '__wrapped__'):
+        opcode_fn = opcode_fn.__wrapped__
+    return getattr(opcode_fn, 'mnemonic', 'UNKNOWN')
+
+
+def replay_in_process(w3: Web3, tx_hash: Any) -> List[Step]:
+    # Replays a mined transaction on py-evm, from the state before it in its block, and returns its steps.
+    # The VM's opcode table is patched while the transaction runs, so this is not thread-safe.
+    from eth.exceptions import Halt, Revert, VMError
+
+    chain = w3.provider.ethereum_tester.backend.chain
+    receipt = w3.eth.get_transaction_receipt(tx_hash)
+    block = chain.get_canonical_block_by_number(receipt['blockNumber'])
+    parent = chain.get_block_header_by_hash(block.header.parent_hash)
+    vm = chain.get_vm(at_header=block.header.copy(state_root=parent.state_root))
+    state = vm.state
+    for transaction in block.transactions[:receipt['transactionIndex']]:
+        state.apply_transaction(transaction)
+
+    steps: List[Step] = []
+    computation_class = state.computation_class
+    original = computation_class.opcodes
+
+    def traced(opcode_fn: Any) -> Any:
+        op = _mnemonic(opcode_fn)
+
+        def run(computation: Any) -> None:
+            message = computation.msg
+            gas = computation.get_gas_remaining()
+            step = Step(message.depth + 1, computation.code.program_counter - 1, op, gas, 0,
+                        to_checksum_address(message.code_address if not message.is_create
+                                            else message.storage_address), message.is_create)
+            if op in CALL_OPS:
+                # its cost is worked out from the steps around it; the callee's steps come next
+                steps.append(step)
+                opcode_fn(computation=computation)
+                return
+            try:
+                opcode_fn(computation=computation)
+            except (Halt, Revert):
+                # STOP, RETURN and SELFDESTRUCT halt by raising too
+                steps.append(step._replace(gas_cost=gas - computation.get_gas_remaining()))
+                raise
+            except VMError:
+                steps.append(step._replace(gas_cost=gas, error=True))
+                raise
+            steps.append(step._replace(gas_cost=gas - computation.get_gas_remaining()))
+
+        run.mnemonic = op
+        return run
+
+    computation_class.opcodes = {opcode: traced(fn) for opcode, fn in original.items()}
+    try:
+        state.apply_transaction(block.transactions[receipt['transactionIndex']])
+    finally:
+        computation_class.opcodes = original
+    return steps
+
+
+##### attribution #####
+
+def _gas_left(last: Optional[Step], entry_gas: int) -> int:
+    # what a frame that ended with last had left for its caller
+    if last is None:
+        return entry_gas
+    if last.error:
+        return 0
+    return last.gas - last.gas_cost
+
+
+def attribute(steps: Iterable[Step]) -> Iterator[Tuple[Tuple[Step, ...], Step, int]]:
+    # Yields (the calls the step runs under, outermost first; the step; the gas it used itself) for every step.
+    # A call is yielded once its callee has returned, so streams stay streams: only open calls are buffered.
+    callers: List[Step] = []
+    entry_gas: List[int] = []
+    last: List[Optional[Step]] = []
+    previous: Optional[Step] = None
+    for step in steps:
+        if previous is not None and previous.op in CALL_OPS:
+            if step.depth > previous.depth:
+                callers.append(previous)
+                entry_gas.append(step.gas)
+                last.append(None)
+            else:
+                # nothing ran (no code, a precompile, or the call failed before starting)
+                yield tuple(callers), previous, previous.gas - step.gas
+        while callers and step.depth <= callers[-1].depth:
+            call = callers.pop()
+            used = entry_gas.pop() - _gas_left(last.pop(), 0)
+            inclusive = call.gas - step.gas if step.depth == call.depth else call.gas_cost + used
+            yield tuple(callers), call, inclusive - used
+        if callers and step.depth == callers[-1].depth + 1:
+            last[-1] = step
+        if step.op not in CALL_OPS:
+            yield tuple(callers), step, step.gas if step.error else step.gas_cost
+        previous = step
+    if previous is not None and previous.op in CALL_OPS and (not callers or callers[-1] is not previous):
+        yield tuple(callers), previous, previous.gas_cost
+    while callers:
+        call = callers.pop()
+        entry_gas.pop()
+        last.pop()
+        yield tuple(callers), call, call.gas_cost
+
+
+##### source maps #####
+
+class Location(NamedTuple):
+    file: str
+    line: int  # 1-based; 0 when the step maps to no source (compiler generated code)
+    function: str
+
+
+def instruction_indices(bytecode: bytes) -> Dict[int, int]:
+    # {pc: instruction index}; source maps have one entry per instruction, and PUSHn data is not an instruction
+    indices: Dict[int, int] = {}
+    pc = index = 0
+    while pc < len(bytecode):
+        indices[pc] = index
+        opcode = bytecode[pc]
+        pc += 1 + (opcode - 0x5f if 0x60 <= opcode <= 0x7f else 0)
+        index += 1
+    return indices
+
+
+def decompress_source_map(srcmap: str) -> List[Tuple[int, int, int]]:
+    # (offset, length, source index) per instruction; an empty field repeats the previous entry's
+    entries: List[Tuple[int, int, int]] = []
+    current = [0, 0, -1]
+    for entry in srcmap.split(';'):
+        for i, field in enumerate(entry.split(':')[:3]):
+            if field:
+                current[i] = int(field)
+        entries.append((current[0], current[1], current[2]))
+    return entries
+
+
+def _bytecode(hex_code: str) -> bytes:
+    # unlinked library placeholders (__$...$__) take the 20 bytes of an address
+    code = hex_code[2:] if hex_code.startswith('0x') else hex_code
+    while '__' in code:
+        start = code.index('__')
+        code = code[:start] + '00' * 20 + code[start + 40:]
+    return bytes.fromhex(code)
+
+
+class SourceFile:
+    def __init__(self, path: str, text: bytes):
+        self.path = path
+        self.text = text
+        self.line_starts = [0] + [i + 1 for i, byte in enumerate(text) if byte == ord('\n')]
+        # (start, end, label) of every function and modifier, to name the innermost one around an offset
+        self.functions: List[Tuple[int, int, str]] = []
+
+    def line_of(self, offset: int) -> int:
+        return bisect.bisect_right(self.line_starts, offset)
+
+    def line_text(self, line: int) -> str:
+        if not 0 < line <= len(self.line_starts):
+            return ''
+        end = self.line_starts[line] if line < len(self.line_starts) else len(self.text)
+        return self.text[self.line_starts[line - 1]:end].decode('utf-8', errors='replace').strip()
+
+    def function_at(self, offset: int, length: int) -> Optional[str]:
+        best = None
+        for start, end, label in self.functions:
+            if start <= offset and offset + length <= end and (best is None or end - start < best[1] - best[0]):
+                best = (start, end, label)
+        return None if best is None else best[2]
+
+
+def _walk(node: Any) -> Iterator[Dict[str, Any]]:
+    if isinstance(node, dict):
+        if 'nodeType' in node:
+            yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk(value)
+
+
+def _src(node: Dict[str, Any]) -> Tuple[int, int, int]:
+    start, length, index = (int(field) for field in node['src'].split(':'))
+    return start, length, index
+
+
+class CodeMap:
+    # pc -> Location for one bytecode (runtime or init code) of a contract
+    def __init__(self, name: str, hex_code: str, srcmap: str, sources: Dict[int, SourceFile]):
+        self.name = name
+        self.indices = instruction_indices(_bytecode(hex_code)) if hex_code else {}
+        self.entries = decompress_source_map(srcmap) if srcmap else []
+        self.sources = sources
+
+    def locate(self, pc: int) -> Location:
+        index = self.indices.get(pc)
+        if index is None or index >= len(self.entries):
+            return Location(self.name, 0, self.name)
+        offset, length, source_index = self.entries[index]
+        source = self.sources.get(source_index)
+        if source is None:
+            return Location(self.name, 0, self.name)
+        function = source.function_at(offset, length) or self.name
+        return Location(source.path, source.line_of(offset), function)
+
+
+##### profiling #####
+
+class Profile:
+    def __init__(self, name: str, gas_used: int, sources: Dict[str, SourceFile]):
+        self.name = name
+        self.gas_used = gas_used
+        self.sources = sources
+        self.by_line: Dict[Tuple[str, int], List[int]] = {}  # -> [gas, steps]
+        self.by_op: Dict[str, List[int]] = {}
+        self.stacks: Dict[str, int] = {}  # collapsed (flamegraph) stack -> gas
+        self.execution_gas = 0
+
+    def add(self, frames: Sequence[Location], location: Location, op: str, gas: int) -> None:
+        self.execution_gas += gas
+        line = self.by_line.setdefault((location.file, location.line), [0, 0])
+        line[0] += gas
+        line[1] += 1
+        by_op = self.by_op.setdefault(op, [0, 0])
+        by_op[0] += gas
+        by_op[1] += 1
+        stack = ';'.join([f'{frame.function};{frame.file}:{frame.line}' for frame in frames]
+                         + [location.function, f'{location.file}:{location.line}'])
+        self.stacks[stack] = self.stacks.get(stack, 0) + gas
+
+    @property
+    def transaction_gas(self) -> int:
+        return self.gas_used - self.execution_gas
+
+    def folded(self) -> List[str]:
+        # Brendan Gregg's collapsed stack format (flamegraph.pl, speedscope, inferno)
+        lines = [f'{self.name};{stack} {gas}' for stack, gas in sorted(self.stacks.items()) if gas > 0]
+        if self.transaction_gas > 0:
+            lines.append(f'{self.name};{TRANSACTION_LINE} {self.transaction_gas}')
+        return lines
+
+    def report(self, top: Optional[int] = None) -> str:
+        rows = [f'{self.name}: {self.gas_used} gas used, {self.execution_gas} by the steps below',
+                f'{"gas":>9} {"%":>6} {"steps":>6}  line']
+        for (file, line), (gas, count) in sorted(self.by_line.items(), key=lambda item: -item[1][0])[:top]:
+            source = self.sources.get(file)
+            text = source.line_text(line) if source is not None and line else '(no source)'
+            rows.append(f'{gas:>9} {gas / self.gas_used:>6.1%} {count:>6}  {file}:{line}  {text}')
+        rows.append(f'{self.transaction_gas:>9} {self.transaction_gas / self.gas_used:>6.1%} {"":>6}  '
+                    f'{TRANSACTION_LINE}')
+        rows.append('')
+        rows.append(f'{"gas":>9} {"steps":>6}  opcode')
+        for op, (gas, count) in sorted(self.by_op.items(), key=lambda item: -item[1][0])[:top]:
+            rows.append(f'{gas:>9} {count:>6}  {op}')
+        return '\n'.join(rows)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {'name': self.name, 'gas_used': self.gas_used, 'execution_gas': self.execution_gas,
+                'by_line': {f'{file}:{line}': gas for (file, line), (gas, _) in self.by_line.items()},
+                'by_op': {op: gas for op, (gas, _) in self.by_op.items()}}
+
+
+class GasProfiler:
+    def __init__(self, w3: Web3, in_process: Optional[bool] = None):
+        # in_process: replay on eth-tester's py-evm instead of debug_traceTransaction (the default on eth-tester)
+        self.w3 = w3
+        self.in_process = hasattr(w3.provider, 'ethereum_tester') if in_process is None else in_process
+        self.sources: Dict[str, SourceFile] = {}
+        self._runtime: Dict[str, CodeMap] = {}
+        self._creation: List[Tuple[bytes, CodeMap]] = []
+        self._locations: Dict[Tuple[Optional[str], bool, int], Location] = {}
+
+    def _source_files(self, interface: Dict[str, Any]) -> Dict[int, SourceFile]:
+        # the contract's source file, by its index in the source maps, with its functions and modifiers
+        ast = interface.get('ast')
+        if not ast:
+            return {}
+        # keyed by the whole path: contracts in different directories may share a file name
+        path = ast.get('absolutePath', '')
+        if path not in self.sources:
+            try:
+                with open(path, 'rb') as f:
+                    text = f.read()
+            except OSError:
+                text = b''
+            source = self.sources[path] = SourceFile(path, text)
+            for contract in _walk(ast):
+                if contract['nodeType'] != 'ContractDefinition':
+                    continue
+                for node in _walk(contract.get('nodes', [])):
+                    if node['nodeType'] in ('FunctionDefinition', 'ModifierDefinition'):
+                        start, length, _ = _src(node)
+                        label = node.get('name') or node.get('kind', 'function')
+                        source.functions.append((start, start + length, f"{contract['name']}.{label}"))
+        return {_src(ast)[2]: self.sources[path]}
+
+    def register(self, name: str, interface: Dict[str, Any], address: Optional[str] = None) -> None:
+        # interface is compiled with PROFILE_OUTPUT_VALUES; without an address, only its deployments are mapped
+        sources = self._source_files(interface)
+        self._creation.append((_bytecode(interface.get('bin', '')),
+                               CodeMap(name, interface.get('bin', ''), interface.get('srcmap', ''), sources)))
+        if address is not None:
+            self._runtime[to_checksum_address(address)] = CodeMap(
+                name, interface.get('bin-runtime', ''), interface.get('srcmap-runtime', ''), sources)
+
+    def _creation_map(self, init_code: bytes) -> Optional[CodeMap]:
+        for code, code_map in self._creation:
+            if code and init_code.startswith(code):
+                return code_map
+        return None
+
+    def _locate(self, step: Step, init_code: bytes) -> Location:
+        key = (step.address, step.creation, step.pc)
+        location = self._locations.get(key)
+        if location is None:
+            code_map = self._creation_map(init_code) if step.creation else self._runtime.get(step.address)
+            if code_map is None:
+                label = step.address or 'CREATE'
+                location = Location(label, 0, label)
+            else:
+                location = code_map.locate(step.pc)
+            if not step.creation:
+                self._locations[key] = location
+        return location
+
+    def steps(self, tx_hash: Any) -> Iterable[Step]:
+        if self.in_process:
+            return replay_in_process(self.w3, tx_hash)
+        tx = self.w3.eth.get_transaction(tx_hash)
+        if tx['to'] is None:
+            address = self.w3.eth.get_transaction_receipt(tx_hash)['contractAddress']
+            return steps_from_struct_logs(stream_struct_logs(self.w3, tx_hash), address, creation=True)
+        return steps_from_struct_logs(stream_struct_logs(self.w3, tx_hash), tx['to'])
+
+    def profile(self, tx_hash: Any, name: Optional[str] = None) -> Profile:
+        tx = self.w3.eth.get_transaction(tx_hash)
+        receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+        profile = Profile(name or HexBytes(tx_hash).to_0x_hex(), receipt['gasUsed'], self.sources)
+        # init code run by CREATE is not known here; it is mapped only when it is the transaction's own
+        init_code = bytes(tx['input']) if tx['to'] is None else b''
+        for callers, step, gas in attribute(self.steps(tx_hash)):
+            frames = [self._locate(call, init_code if call.depth == 1 else b'') for call in callers]
+            profile.add(frames, self._locate(step, init_code if step.depth == 1 else b''), step.op, gas)
+        return profile
+
+
+##### gas_bench scenarios #####
+
+class ProfilingBench(gas_bench.GasBench):
+    # GasBench that profiles the transactions it records whose name matches one of the patterns
+    def __init__(self, w3: Web3, patterns: Sequence[str] = ('*',)):
+        super().__init__(w3)
+        self.profiler = GasProfiler(w3)
+        self.patterns = patterns
+        self.profiles: List[Profile] = []
+
+    def deploy(self, file_name: str, contract_name: str, *args: Any, record: bool = True):
+        interface = compile_contract(os.path.join(gas_bench.ROOT, file_name), contract_name=contract_name,
+                                     output_values=PROFILE_OUTPUT_VALUES)
+        self.profiler.register(contract_name, interface)
+        contract = super().deploy(file_name, contract_name, *args, record=record)
+        self.profiler.register(contract_name, interface, contract.address)
+        return contract
+
+    def record(self, name: str, tx_hash: Any) -> Any:
+        receipt = super().record(name, tx_hash)
+        if any(fnmatch.fnmatchcase(name, pattern) for pattern in self.patterns):
+            self.profiles.append(self.profiler.profile(receipt['transactionHash'], name))
+        return receipt
+
+
+def _file_name(name: str) -> str:
+    return ''.join(c if c.isalnum() or c in '.-_' else '_' for c in name)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Gas profile (per source line, opcode and call stack) of the '
+                                                 'gas_bench transactions')
+    parser.add_argument('--backend', choices=BACKENDS, default=None)
+    parser.add_argument('--rpc-url', default=None)
+    parser.add_argument('--only', action='append', default=None, metavar='PATTERN',
+                        help="profile only the entries matching this glob, e.g. 'RPS.revealMove*' (repeatable)")
+    parser.add_argument('--out-dir', default='gas_profile')
+    parser.add_argument('--top', type=int, default=15, help='lines and opcodes to print per transaction')
+    args = parser.parse_args(argv)
+
+    bench = ProfilingBench(make_web3(args.backend, args.rpc_url), args.only or ['*'])
+    gas_bench.run(bench.w3, bench)
+    os.makedirs(args.out_dir, exist_ok=True)
+    folded: List[str] = []
+    written: Dict[str, int] = {}
+    for profile in bench.profiles:
+        print(profile.report(args.top), end='\n\n')
+        base = os.path.join(args.out_dir, _file_name(profile.name))
+        # names that differ only in the characters _file_name replaces would share a file
+        written[base] = written.get(base, 0) + 1
+        if written[base] > 1:
+            base += f'-{written[base]}'
+        with open(base + '.txt', 'w') as f:
+            f.write(profile.report() + '\n')
+        with open(base + '.json', 'w') as f:
+            json.dump(profile.to_json(), f, indent=2)
+        folded.extend(profile.folded())
+    with open(os.path.join(args.out_dir, 'all.folded'), 'w') as f:
+        f.write('\n'.join(folded) + '\n')
+    print(f'{len(bench.profiles)} transactions profiled, flamegraph input in {args.out_dir}/all.folded')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
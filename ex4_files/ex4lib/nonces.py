@@ -0,0 +1,54 @@
+import threading
+from typing import Dict, Set
+
+# Hands out transaction nonces per sender without asking the node each time. A sender is seeded once with its
+# pending transaction count; after that every take() is local. When a send fails the caller gives the nonce back
+# (release), so the nonce that was taken but never used does not leave a gap. Other sends may hold later nonces
+# by then, so it is not safe to rewind the sender to the node's pending count (reset) while sends are in flight.
+# Shared by the async player engine (rps_player) and the signed-transaction sender (tx_sender).
+
+
+class NonceTracker:
+    def __init__(self):
+        self._next: Dict[str, int] = {}
+        self._released: Dict[str, Set[int]] = {}
+        self._lock = threading.Lock()
+
+    def is_seeded(self, sender: str) -> bool:
+        return sender in self._next
+
+    def seed(self, sender: str, nonce: int) -> None:
+        # starts tracking sender at nonce, unless it is tracked already (a concurrent seed won)
+        with self._lock:
+            self._next.setdefault(sender, nonce)
+
+    def take(self, sender: str) -> int:
+        # released nonces first (lowest first), so gaps are filled before new nonces are handed out
+        with self._lock:
+            released = self._released.get(sender)
+            if released:
+                nonce = min(released)
+                released.remove(nonce)
+                return nonce
+            nonce = self._next[sender]
+            self._next[sender] = nonce + 1
+            return nonce
+
+    def release(self, sender: str, nonce: int) -> None:
+        # a nonce taken for a send that failed. The last one handed out is simply taken back; an earlier one is
+        # kept for the next take(), since later nonces may already be in flight.
+        with self._lock:
+            released = self._released.setdefault(sender, set())
+            released.add(nonce)
+            while self._next[sender] - 1 in released:
+                self._next[sender] -= 1
+                released.remove(self._next[sender])
+
+    def reset(self, sender: str, nonce: int) -> None:
+        # the node says the next nonce is this one: forget what we handed out past it
+        with self._lock:
+            self._next[sender] = nonce
+            self._released.pop(sender, None)
+
+    def peek(self, sender: str) -> int:
+        return self._next[sender]
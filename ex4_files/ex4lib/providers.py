@@ -0,0 +1,71 @@
+import os
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from web3 import AsyncWeb3, Web3
+
+# Picks the chain the scripts and tests talk to:
+#   EX4_BACKEND=http    (default) a running node, e.g. `npx hardhat node`, at EX4_RPC_URL
+#   EX4_BACKEND=tester  an in-process py-evm chain through eth-tester - no node, no HTTP.
+# The pytest options --backend / --rpc-url (see conftest.py) set the same variables.
+#
+# Under pytest-xdist every worker is a separate process: with the tester backend each gets its own chains anyway; with
+# http, EX4_NODE_PER_WORKER=1 (--node-per-worker) sends worker gwN to the node at the URL's port + N, so workers do
+# not share accounts, nonces or snapshots (start one node per worker: npx hardhat node --port 8545, 8546, ...).
+
+BACKEND_ENV = 'EX4_BACKEND'
+RPC_URL_ENV = 'EX4_RPC_URL'
+DEFAULT_BACKEND = 'http'
+DEFAULT_RPC_URL = "http://127.0.0.1:8545"
+BACKENDS = ('http', 'tester')
+NODE_PER_WORKER_ENV = 'EX4_NODE_PER_WORKER'
+XDIST_WORKER_ENV = 'PYTEST_XDIST_WORKER'
+
+
+def selected_backend(backend: Optional[str] = None) -> str:
+    backend = backend or os.environ.get(BACKEND_ENV) or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend!r}, expected one of {BACKENDS}")
+    return backend
+
+
+def worker_index() -> int:
+    # N for pytest-xdist worker gwN, 0 outside xdist
+    worker = os.environ.get(XDIST_WORKER_ENV, '')
+    return int(worker[2:]) if worker.startswith('gw') else 0
+
+
+def resolve_rpc_url(rpc_url: Optional[str] = None) -> str:
+    url = rpc_url or os.environ.get(RPC_URL_ENV) or DEFAULT_RPC_URL
+    if os.environ.get(NODE_PER_WORKER_ENV) and worker_index():
+        parts = urlsplit(url)
+        netloc = f'{parts.hostname}:{(parts.port or 80) + worker_index()}'
+        url = urlunsplit(parts._replace(netloc=netloc))
+    return url
+
+
+def make_web3(backend: Optional[str] = None, rpc_url: Optional[str] = None) -> Web3:
+    backend = selected_backend(backend)
+    if backend == 'tester':
+        try:
+            from eth_tester import EthereumTester, PyEVMBackend  # type: ignore
+        except ImportError as e:
+            raise ImportError(
+                "the 'tester' backend needs eth-tester with py-evm: pip install 'eth-tester[py-evm]'") from e
+        # eth-tester answers evm_mine, evm_snapshot and evm_revert like the Hardhat node does.
+        return Web3(Web3.EthereumTesterProvider(EthereumTester(PyEVMBackend())))
+    return Web3(Web3.HTTPProvider(resolve_rpc_url(rpc_url)))
+
+
+def make_async_web3(backend: Optional[str] = None, rpc_url: Optional[str] = None) -> AsyncWeb3:
+    # The AsyncWeb3 counterpart of make_web3. With the tester backend this is a separate in-process chain (it does
+    # not share state with a Web3 from make_web3); with http both talk to the same node.
+    backend = selected_backend(backend)
+    if backend == 'tester':
+        try:
+            from web3.providers.eth_tester import AsyncEthereumTesterProvider
+            return AsyncWeb3(AsyncEthereumTesterProvider())
+        except ImportError as e:
+            raise ImportError(
+                "the 'tester' backend needs eth-tester with py-evm: pip install 'eth-tester[py-evm]'") from e
+    return AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(resolve_rpc_url(rpc_url)))
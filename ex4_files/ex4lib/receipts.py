@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Iterable, List, Optional, Set
+
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.exceptions import TimeExhausted, TransactionNotFound, Web3RPCError
+from web3.types import TxReceipt
+
+# Waits for many transactions at once. Instead of polling eth_getTransactionReceipt for every hash, the waiter
+# follows the chain block by block: one eth_getBlockReceipts per new block (or, on nodes without it, the block's
+# transaction hashes and a receipt request only for the hashes we wait for). The poll interval starts short, grows
+# while no block arrives and drops back when one does, so fast dev chains answer quickly and idle ones are not
+# hammered. Every submitted hash gets a concurrent.futures.Future resolved with its receipt.
+#
+#   waiter = ReceiptWaiter(w3)
+#   receipts = waiter.wait([tx_hash1, tx_hash2, ...])
+
+DEFAULT_MIN_INTERVAL = 0.01
+DEFAULT_MAX_INTERVAL = 1.0
+# blocks scanned behind the head on the first poll, and kept afterwards, for hashes submitted after being mined
+DEFAULT_LOOKBACK = 16
+
+
+class ReceiptWaiter:
+    def __init__(self, w3: Web3, min_interval: float = DEFAULT_MIN_INTERVAL, max_interval: float = DEFAULT_MAX_INTERVAL,
+                 lookback: int = DEFAULT_LOOKBACK):
+        self.w3 = w3
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.lookback = lookback
+        self._pending: Dict[HexBytes, Future] = {}
+        # submitted after the first poll and not in the kept blocks: maybe mined before them, asked for directly
+        self._unseen: Set[HexBytes] = set()
+        self._recent: 'OrderedDict[int, Dict[HexBytes, TxReceipt]]' = OrderedDict()
+        self._next_block: Optional[int] = None
+        self._block_receipts = True
+        self._interval = min_interval
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def submit(self, tx_hash: HexBytes) -> Future:
+        # Future for the receipt of tx_hash (resolved by poll(), wait() or the background thread)
+        tx_hash = HexBytes(tx_hash)
+        with self._lock:
+            if tx_hash in self._pending:
+                return self._pending[tx_hash]
+            future: Future = Future()
+            for receipts in self._recent.values():
+                if tx_hash in receipts:
+                    future.set_result(receipts[tx_hash])
+                    return future
+            self._pending[tx_hash] = future
+            if self._next_block is not None:
+                self._unseen.add(tx_hash)
+            return future
+
+    ##### following the chain #####
+
+    def _receipts_of_block(self, block_number: int, wanted: Iterable[HexBytes]) -> Dict[HexBytes, TxReceipt]:
+        if self._block_receipts:
+            try:
+                return {HexBytes(r['transactionHash']): r for r in self.w3.eth.get_block_receipts(block_number)}
+            except Web3RPCError:
+                # eth_getBlockReceipts is not available on this node
+                self._block_receipts = False
+        tx_hashes = {HexBytes(tx_hash) for tx_hash in self.w3.eth.get_block(block_number)['transactions']}
+        return {tx_hash: self.w3.eth.get_transaction_receipt(tx_hash) for tx_hash in tx_hashes.intersection(wanted)}
+
+    def poll(self) -> int:
+        # Reads the blocks mined since the last poll and resolves the futures they answer; returns how many blocks.
+        head = self.w3.eth.block_number
+        skipped = False
+        if self._next_block is None or head - self._next_block >= self.lookback:
+            # first poll, or a long pause: skip to the last lookback blocks and, once they are scanned, ask for the
+            # hashes they did not answer directly (they may have been mined before them)
+            self._next_block = max(0, head - self.lookback + 1)
+            skipped = self._next_block > 0
+        scanned = 0
+        while self._next_block <= head:
+            with self._lock:
+                wanted = list(self._pending)
+            receipts = self._receipts_of_block(self._next_block, wanted)
+            with self._lock:
+                self._recent[self._next_block] = receipts
+                while len(self._recent) > self.lookback:
+                    self._recent.popitem(last=False)
+                for tx_hash, receipt in receipts.items():
+                    future = self._pending.pop(tx_hash, None)
+                    if future is not None:
+                        future.set_result(receipt)
+            self._next_block += 1
+            scanned += 1
+        with self._lock:
+            if skipped:
+                self._resolve_directly(list(self._pending))
+            elif self._unseen:
+                self._resolve_directly([tx_hash for tx_hash in self._unseen if tx_hash in self._pending])
+            self._unseen.clear()
+        # adaptive backoff: short after a block, doubling (up to max_interval) while nothing happens
+        self._interval = self.min_interval if scanned else min(self._interval * 2, self.max_interval)
+        return scanned
+
+    def _resolve_directly(self, tx_hashes: Iterable[HexBytes]) -> None:
+        # one receipt request per hash, for hashes that may have been mined before the blocks we scan (needs _lock)
+        for tx_hash in tx_hashes:
+            try:
+                receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                continue
+            future = self._pending.pop(tx_hash, None)
+            if future is not None:
+                future.set_result(receipt)
+
+    def wait(self, tx_hashes: Iterable[HexBytes], timeout: float = 120) -> List[TxReceipt]:
+        # Receipts of all the transactions, in the same order; raises TimeExhausted if some are not mined in time.
+        tx_hashes = [HexBytes(tx_hash) for tx_hash in tx_hashes]
+        futures = [self.submit(tx_hash) for tx_hash in tx_hashes]
+        deadline = time.monotonic() + timeout
+        while not all(future.done() for future in futures):
+            if self._thread is None:
+                self.poll()
+                if all(future.done() for future in futures):
+                    break
+            if time.monotonic() >= deadline:
+                with self._lock:
+                    missing = [tx_hash for tx_hash in tx_hashes if tx_hash in self._pending]
+                    self._resolve_directly(missing)
+                if all(future.done() for future in futures):
+                    break
+                raise TimeExhausted(f"{len(missing)} transactions were not mined within {timeout} seconds")
+            time.sleep(self._interval)
+        return [future.result() for future in futures]
+
+    def wait_one(self, tx_hash: HexBytes, timeout: float = 120) -> TxReceipt:
+        return self.wait([tx_hash], timeout)[0]
+
+    ##### background thread #####
+
+    def start(self) -> None:
+        # polls in a daemon thread, so futures from submit() resolve without calling wait()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='receipt-waiter', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            with self._lock:
+                idle = not self._pending
+            if not idle:
+                self.poll()
+            self._stop.wait(self.max_interval if idle else self._interval)
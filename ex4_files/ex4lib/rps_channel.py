@@ -0,0 +1,380 @@
+import os
+import secrets
+import sqlite3
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from eth_abi import encode
+from eth_account import Account
+from eth_account.messages import encode_defunct
+from eth_account.signers.local import LocalAccount
+from eth_hash.auto import keccak
+
+from ex4lib.commit_vault import commitment_of
+from ex4lib.rps_types import Move
+
+# Off-chain side of part2/RPSChannel.sol: a ChannelPlayer signs its commitments and the states after each round,
+# checks the opponent's messages, and keeps everything it will need on chain (the latest co-signed state, both
+# signed commitments of the round in play, its own keys) in a ChannelStore before sending anything. A round:
+#
+#   c1, c2 = alice.commit(Move.ROCK, bet), bob.commit(Move.PAPER, bet)
+#   alice.receive_commit(c2); bob.receive_commit(c1)
+#   alice.receive_reveal(bob.reveal()); bob.receive_reveal(alice.reveal())
+#   s1, s2 = alice.sign_next_state(), bob.sign_next_state()
+#   alice.receive_state_signature(s2); bob.receive_state_signature(s1)
+#
+# Messages are NamedTuples; how they travel between the players is up to the caller. The *_args() methods return
+# the arguments of the contract's functions for closing the channel or disputing a round.
+#
+# A channel id can be opened again once settled, so signed messages (and the store's rows) are bound to the
+# contract, the channel id and the opening: RPSChannel.openings(channelID) right after the channel was opened.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS states (
+    contract TEXT NOT NULL,
+    channel_id TEXT NOT NULL,
+    opening INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    balance1 TEXT NOT NULL,
+    balance2 TEXT NOT NULL,
+    final INTEGER NOT NULL,
+    signature1 BLOB NOT NULL,
+    signature2 BLOB NOT NULL,
+    PRIMARY KEY (contract, channel_id, opening, round)
+);
+CREATE TABLE IF NOT EXISTS commits (
+    contract TEXT NOT NULL,
+    channel_id TEXT NOT NULL,
+    opening INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    player INTEGER NOT NULL,
+    bet_amount TEXT NOT NULL,
+    hidden_move BLOB NOT NULL,
+    signature BLOB NOT NULL,
+    move INTEGER,
+    key BLOB,
+    PRIMARY KEY (contract, channel_id, opening, round, player)
+);
+"""
+
+
+class ChannelError(Exception):
+    pass
+
+
+class ChannelKey(NamedTuple):
+    # one opening of a channel
+    contract_address: str
+    channel_id: int
+    opening: int
+
+    def row(self) -> Tuple[str, str, int]:
+        return self.contract_address.lower(), str(self.channel_id), self.opening
+
+
+class StateUpdate(NamedTuple):
+    channel_id: int
+    round: int
+    balance1: int
+    balance2: int
+    final: bool = False
+
+
+class SignedState(NamedTuple):
+    state: StateUpdate
+    signature1: bytes
+    signature2: bytes
+
+
+class SignedCommit(NamedTuple):
+    channel_id: int
+    round: int
+    bet_amount: int
+    hidden_move: bytes
+    signature: bytes
+
+
+class Reveal(NamedTuple):
+    channel_id: int
+    round: int
+    move: Move
+    key: bytes
+
+
+##### messages #####
+
+def state_hash(contract_address: str, opening: int, state: StateUpdate) -> bytes:
+    # RPSChannel.stateHash
+    return keccak(encode(['address', 'uint256', 'uint256', 'uint256', 'uint256', 'uint256', 'bool'],
+                         [contract_address, state.channel_id, opening, state.round, state.balance1, state.balance2,
+                          state.final]))
+
+
+def commit_hash(contract_address: str, channel_id: int, opening: int, player: str, round: int, bet_amount: int,
+                hidden_move: bytes) -> bytes:
+    # RPSChannel.commitHash; player is the signer
+    return keccak(encode(['address', 'uint256', 'uint256', 'address', 'uint256', 'uint256', 'bytes32'],
+                         [contract_address, channel_id, opening, player, round, bet_amount, hidden_move]))
+
+
+def sign_hash(account: LocalAccount, message_hash: bytes) -> bytes:
+    # an Ethereum signed message of the 32 byte hash, as RPSChannel.signer recovers it
+    return bytes(account.sign_message(encode_defunct(primitive=message_hash)).signature)
+
+
+def signer(message_hash: bytes, signature: bytes) -> Optional[str]:
+    try:
+        return Account.recover_message(encode_defunct(primitive=message_hash), signature=signature)
+    except Exception:
+        return None
+
+
+def winner(move1: int, move2: int) -> int:
+    # 0 on a tie, 1 if move1 wins, 2 if move2 wins
+    if move1 == move2:
+        return 0
+    return 1 if (move1 - move2) % 3 == 1 else 2
+
+
+##### storage #####
+
+class ChannelStore:
+    # Every write is committed (and fsynced) before the method returns: a message may only be sent once what it
+    # commits us to is on disk. Holds secret keys, so the file is created readable by its owner only.
+
+    def __init__(self, db_path: str):
+        if db_path != ':memory:' and not os.path.exists(db_path):
+            os.close(os.open(db_path, os.O_CREAT | os.O_WRONLY, 0o600))
+        self.db = sqlite3.connect(db_path)
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = FULL')
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self) -> 'ChannelStore':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def save_state(self, channel: ChannelKey, signed: SignedState) -> None:
+        state = signed.state
+        with self.db:
+            self.db.execute('INSERT OR REPLACE INTO states VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                            (*channel.row(), state.round, str(state.balance1), str(state.balance2),
+                             int(state.final), signed.signature1, signed.signature2))
+
+    def latest_state(self, channel: ChannelKey) -> Optional[SignedState]:
+        row = self.db.execute('SELECT * FROM states WHERE contract = ? AND channel_id = ? AND opening = ? '
+                              'ORDER BY round DESC LIMIT 1', channel.row()).fetchone()
+        if row is None:
+            return None
+        _, channel_id, _, round, balance1, balance2, final, signature1, signature2 = row
+        return SignedState(StateUpdate(int(channel_id), round, int(balance1), int(balance2), bool(final)),
+                           signature1, signature2)
+
+    def save_commit(self, channel: ChannelKey, player: int, commit: SignedCommit, move: Optional[int] = None,
+                    key: Optional[bytes] = None) -> None:
+        # player is 1 or 2; move and key are known for our own commitments, and for the opponent's once revealed
+        with self.db:
+            self.db.execute('INSERT OR REPLACE INTO commits VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                            (*channel.row(), commit.round, player, str(commit.bet_amount),
+                             bytes(commit.hidden_move), bytes(commit.signature),
+                             None if move is None else int(move), key))
+
+    def commits(self, channel: ChannelKey,
+                round: int) -> Dict[int, Tuple[SignedCommit, Optional[Move], Optional[bytes]]]:
+        # {player: (commit, move, key)} of the round
+        rows = self.db.execute('SELECT * FROM commits WHERE contract = ? AND channel_id = ? AND opening = ? '
+                               'AND round = ?', (*channel.row(), round))
+        return {player: (SignedCommit(int(channel_id), round, int(bet_amount), hidden_move, signature),
+                         None if move is None else Move(move), key)
+                for _, channel_id, _, round, player, bet_amount, hidden_move, signature, move, key in rows}
+
+    def prune(self, channel: ChannelKey, round: int) -> None:
+        # drops the commitments of rounds up to round and the states before it (superseded by a co-signed state)
+        with self.db:
+            self.db.execute('DELETE FROM commits WHERE contract = ? AND channel_id = ? AND opening = ? '
+                            'AND round <= ?', (*channel.row(), round))
+            self.db.execute('DELETE FROM states WHERE contract = ? AND channel_id = ? AND opening = ? '
+                            'AND round < ?', (*channel.row(), round))
+
+
+##### player #####
+
+class ChannelPlayer:
+    def __init__(self, account: LocalAccount, contract_address: str, channel_id: int, opening: int, player1: str,
+                 player2: str, deposit1: int, deposit2: int, store: ChannelStore):
+        # The channel as opened on chain (opening is RPSChannel.openings(channel_id) once it was opened); the latest
+        # co-signed state and the round in play are loaded from store.
+        if account.address not in (player1, player2):
+            raise ChannelError(f"{account.address} does not play in channel {channel_id}")
+        self.account = account
+        self.contract_address = contract_address
+        self.channel_id = channel_id
+        self.opening = opening
+        self.channel_key = ChannelKey(contract_address, channel_id, opening)
+        self.players = {1: player1, 2: player2}
+        self.me = 1 if account.address == player1 else 2
+        self.opponent = 3 - self.me
+        self.store = store
+        self.latest = (store.latest_state(self.channel_key)
+                       or SignedState(StateUpdate(channel_id, 0, deposit1, deposit2), b'', b''))
+        self._round: Dict[int, Tuple[SignedCommit, Optional[Move], Optional[bytes]]] = store.commits(
+            self.channel_key, self.round)
+        self._next_state: Optional[StateUpdate] = None
+        self._next_signature = b''
+
+    @property
+    def state(self) -> StateUpdate:
+        return self.latest.state
+
+    @property
+    def round(self) -> int:
+        # the round in play (one after the latest co-signed state)
+        return self.state.round + 1
+
+    def balance(self, player: int) -> int:
+        return self.state.balance1 if player == 1 else self.state.balance2
+
+    ##### commit #####
+
+    def commit(self, move: int, bet_amount: int) -> SignedCommit:
+        # Our signed commitment to move for the round in play; the key is stored before the commitment is returned.
+        if self.state.final:
+            raise ChannelError("the channel is closed")
+        if self.me in self._round:
+            raise ChannelError(f"already committed to round {self.round}")
+        self._check_bet(bet_amount)
+        key = secrets.token_bytes(32)
+        hidden_move = commitment_of(move, key)
+        signature = sign_hash(self.account, commit_hash(self.contract_address, self.channel_id, self.opening,
+                                                        self.account.address, self.round, bet_amount,
+                                                        hidden_move))
+        commit = SignedCommit(self.channel_id, self.round, bet_amount, hidden_move, signature)
+        self.store.save_commit(self.channel_key, self.me, commit, move, key)
+        self._round[self.me] = (commit, Move(move), key)
+        return commit
+
+    def receive_commit(self, commit: SignedCommit) -> None:
+        if (commit.channel_id, commit.round) != (self.channel_id, self.round):
+            raise ChannelError(f"commitment for channel {commit.channel_id} round {commit.round}, "
+                               f"expected round {self.round}")
+        if self.opponent in self._round:
+            raise ChannelError(f"opponent already committed to round {self.round}")
+        self._check_bet(commit.bet_amount)
+        if self.me in self._round and bytes(self._round[self.me][0].hidden_move) == bytes(commit.hidden_move):
+            # our own commitment sent back: revealed after ours, it would tie every round
+            raise ChannelError("the opponent's commitment is a copy of ours")
+        message_hash = commit_hash(self.contract_address, self.channel_id, self.opening, self.players[self.opponent],
+                                   commit.round, commit.bet_amount, commit.hidden_move)
+        if signer(message_hash, commit.signature) != self.players[self.opponent]:
+            raise ChannelError("invalid signature on the opponent's commitment")
+        self.store.save_commit(self.channel_key, self.opponent, commit)
+        self._round[self.opponent] = (commit, None, None)
+
+    def _check_bet(self, bet_amount: int) -> None:
+        if not 0 < bet_amount <= min(self.state.balance1, self.state.balance2):
+            raise ChannelError(f"bet {bet_amount} is not covered by both balances")
+        for commit, _, _ in self._round.values():
+            if commit.bet_amount != bet_amount:
+                raise ChannelError(f"bet {bet_amount} does not match the other commitment ({commit.bet_amount})")
+
+    ##### reveal #####
+
+    def reveal(self) -> Reveal:
+        # Only once both commitments are in: revealing earlier would let the opponent choose its move.
+        if len(self._round) < 2:
+            raise ChannelError(f"round {self.round} is not fully committed")
+        _, move, key = self._round[self.me]
+        return Reveal(self.channel_id, self.round, move, key)
+
+    def receive_reveal(self, reveal: Reveal) -> None:
+        if (reveal.channel_id, reveal.round) != (self.channel_id, self.round) or self.opponent not in self._round:
+            raise ChannelError(f"reveal for channel {reveal.channel_id} round {reveal.round} is not expected")
+        commit = self._round[self.opponent][0]
+        if reveal.move not in (Move.ROCK, Move.PAPER, Move.SCISSORS):
+            raise ChannelError("invalid move")
+        if commitment_of(reveal.move, reveal.key) != commit.hidden_move:
+            raise ChannelError("the reveal does not match the opponent's commitment")
+        self.store.save_commit(self.channel_key, self.opponent, commit, reveal.move, reveal.key)
+        self._round[self.opponent] = (commit, Move(reveal.move), reveal.key)
+
+    ##### state #####
+
+    def next_state(self) -> StateUpdate:
+        # the balances after the round in play, once both moves are known
+        if len(self._round) < 2 or self._round[self.opponent][1] is None:
+            raise ChannelError(f"round {self.round} is not fully revealed")
+        moves = {player: move for player, (_, move, _) in self._round.items()}
+        bet_amount = self._round[self.me][0].bet_amount
+        balance1, balance2 = self.state.balance1, self.state.balance2
+        outcome = winner(moves[1], moves[2])
+        if outcome == 1:
+            balance1, balance2 = balance1 + bet_amount, balance2 - bet_amount
+        elif outcome == 2:
+            balance1, balance2 = balance1 - bet_amount, balance2 + bet_amount
+        return StateUpdate(self.channel_id, self.round, balance1, balance2)
+
+    def final_state(self) -> StateUpdate:
+        # the latest balances, marked final so the channel can be closed at once
+        if self._round:
+            raise ChannelError(f"round {self.round} is in play")
+        return self.state._replace(round=self.round, final=True)
+
+    def _sign_state(self, state: StateUpdate) -> bytes:
+        self._next_state = state
+        self._next_signature = sign_hash(self.account, state_hash(self.contract_address, self.opening, state))
+        return self._next_signature
+
+    def sign_next_state(self) -> bytes:
+        return self._sign_state(self.next_state())
+
+    def sign_final_state(self) -> bytes:
+        return self._sign_state(self.final_state())
+
+    def receive_state_signature(self, signature: bytes) -> SignedState:
+        # The opponent's signature on the state we signed last: the state becomes the latest one.
+        state = self._next_state
+        if state is None:
+            raise ChannelError("no state to co-sign")
+        message_hash = state_hash(self.contract_address, self.opening, state)
+        if signer(message_hash, signature) != self.players[self.opponent]:
+            raise ChannelError("invalid signature on the state")
+        ours = self._next_signature
+        signed = SignedState(state, *((ours, signature) if self.me == 1 else (signature, ours)))
+        self.store.save_state(self.channel_key, signed)
+        self.store.prune(self.channel_key, state.round)
+        self.latest, self._round, self._next_state = signed, {}, None
+        return signed
+
+    ##### on chain #####
+
+    def close_args(self) -> tuple:
+        # RPSChannel.close(...) with the co-signed final state
+        if not self.state.final:
+            raise ChannelError("the latest state is not final")
+        return (self.channel_id, self.state.round, self.state.balance1, self.state.balance2,
+                self.latest.signature1, self.latest.signature2)
+
+    def submit_state_args(self) -> tuple:
+        # RPSChannel.submitState(...) with the latest co-signed state (round 0 is on chain already: use startClose)
+        if self.state.round == 0:
+            raise ChannelError("no co-signed state yet")
+        state = self.state
+        return (self.channel_id, state.round, state.balance1, state.balance2, state.final,
+                self.latest.signature1, self.latest.signature2)
+
+    def dispute_args(self) -> tuple:
+        # RPSChannel.disputeRound(...) for the round in play, once we hold both signed commitments
+        if len(self._round) < 2:
+            raise ChannelError(f"round {self.round} is not fully committed")
+        commit1, commit2 = self._round[1][0], self._round[2][0]
+        return (self.channel_id, commit1.bet_amount, commit1.hidden_move, commit1.signature, commit2.hidden_move,
+                commit2.signature)
+
+    def reveal_args(self) -> tuple:
+        # RPSChannel.revealMove(...) for our move in the disputed round
+        _, move, key = self._round[self.me]
+        return self.channel_id, int(move), key
@@ -0,0 +1,172 @@
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, TypeVar
+
+from hexbytes import HexBytes
+from web3.contract import Contract
+from web3.contract.contract import ContractFunction
+from web3.exceptions import ContractLogicError
+from web3.types import BlockIdentifier
+
+from ex4lib.batch import BatchReader
+from ex4lib.rps_types import GameState, Move
+
+# Client helpers for the bulk views of RPS (getGameStates, getGameStateRange, balancesOf).
+# Every eth_call answers for up to page_size ids, and up to pages_per_batch calls share one JSON-RPC batch.
+#
+# make_moves / reveal_moves send the batch entry points (makeMoves, revealMoves) in chunks that fit in a fraction
+# of the block gas limit. Each chunk is all or nothing on chain; if a chunk reverts, the chunks before it stay
+# mined and ChunkReverted says which items it held, so the caller can re-read the games and resubmit the rest.
+# A chunk whose own estimate does not fit under the cap is split again; a single item that does not fit is an error.
+
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_PAGES_PER_BATCH = 20
+# part of the block gas limit a single batch transaction may use
+DEFAULT_GAS_FRACTION = 0.5
+GAS_MARGIN = 1.25
+
+
+class GameSummary(NamedTuple):
+    game_id: int
+    state: GameState
+    bet_amount: int
+    reveal_block: int
+
+
+def _summaries(game_ids: Sequence[int], result: tuple) -> Iterator[GameSummary]:
+    states, bet_amounts, reveal_blocks = result
+    for game_id, state, bet_amount, reveal_block in zip(game_ids, states, bet_amounts, reveal_blocks):
+        yield GameSummary(game_id, GameState(state), bet_amount, reveal_block)
+
+
+def iter_game_range(contract: Contract, first_game_id: int, stop_game_id: int,
+                    page_size: int = DEFAULT_PAGE_SIZE, pages_per_batch: int = DEFAULT_PAGES_PER_BATCH,
+                    block_identifier: BlockIdentifier = 'latest') -> Iterator[GameSummary]:
+    # Yields a GameSummary for every id in [first_game_id, stop_game_id), including ids with no game (NO_GAME).
+    # Pin block_identifier to a number to get a consistent snapshot across pages.
+    page_starts = range(first_game_id, stop_game_id, page_size)
+    for i in range(0, len(page_starts), pages_per_batch):
+        reader = BatchReader(contract.w3, block_identifier)
+        starts = page_starts[i:i + pages_per_batch]
+        for start in starts:
+            reader.call(contract.functions.getGameStateRange(start, min(page_size, stop_game_id - start)))
+        for start, result in zip(starts, reader.execute()):
+            yield from _summaries(range(start, start + len(result[0])), result)
+
+
+def get_games(contract: Contract, game_ids: Sequence[int], page_size: int = DEFAULT_PAGE_SIZE,
+              pages_per_batch: int = DEFAULT_PAGES_PER_BATCH,
+              block_identifier: BlockIdentifier = 'latest') -> List[GameSummary]:
+    # GameSummary for each of the (arbitrary) game ids, in the same order.
+    games: List[GameSummary] = []
+    pages = [list(game_ids[i:i + page_size]) for i in range(0, len(game_ids), page_size)]
+    for i in range(0, len(pages), pages_per_batch):
+        reader = BatchReader(contract.w3, block_identifier)
+        batch = pages[i:i + pages_per_batch]
+        for page in batch:
+            reader.call(contract.functions.getGameStates(page))
+        for page, result in zip(batch, reader.execute()):
+            games.extend(_summaries(page, result))
+    return games
+
+
+def balances_of(contract: Contract, players: Sequence[str], page_size: int = DEFAULT_PAGE_SIZE,
+                block_identifier: BlockIdentifier = 'latest') -> Dict[str, int]:
+    # {player: balanceOf(player)} for all the players, in as few calls as page_size allows (one batch).
+    reader = BatchReader(contract.w3, block_identifier)
+    pages = [list(players[i:i + page_size]) for i in range(0, len(players), page_size)]
+    for page in pages:
+        reader.call(contract.functions.balancesOf(page))
+    balances: Dict[str, int] = {}
+    for page, result in zip(pages, reader.execute()):
+        balances.update(zip(page, result))
+    return balances
+
+
+class ChunkReverted(ContractLogicError):
+    def __init__(self, start: int, stop: int, game_ids: Sequence[int], error: ContractLogicError,
+                 tx_hashes: List[HexBytes]):
+        # items[start:stop] (games game_ids) reverted; tx_hashes are the chunks sent before them
+        super().__init__(f"items {start}-{stop - 1} (games {list(game_ids)}) reverted: {error}", error.data)
+        self.start = start
+        self.stop = stop
+        self.game_ids = list(game_ids)
+        self.tx_hashes = tx_hashes
+
+
+class MoveCommitment(NamedTuple):
+    game_id: int
+    bet_amount: int
+    hidden_move: bytes
+
+
+class MoveReveal(NamedTuple):
+    game_id: int
+    move: Move
+    key: bytes
+
+
+def _chunk_size(estimate: Callable[[int], int], count: int, max_gas: int) -> int:
+    # How many items fit in max_gas, from the estimates for the first one and the first two items.
+    if count < 2:
+        return count
+    one, two = estimate(1), estimate(2)
+    per_item = max(two - one, 1) * GAS_MARGIN
+    base = max(one - per_item, 0)
+    return max(1, min(count, int((max_gas - base) // per_item)))
+
+
+R = TypeVar('R')
+
+
+def _send_chunks(contract: Contract, build: Callable[[Sequence], ContractFunction], items: Sequence,
+                 sender: str, max_gas: Optional[int], gas_fraction: float) -> List[HexBytes]:
+    if not items:
+        return []
+    if max_gas is None:
+        max_gas = int(contract.w3.eth.get_block('latest')['gasLimit'] * gas_fraction)
+    tx = {'from': sender}
+    tx_hashes: List[HexBytes] = []
+
+    def attempt(start: int, stop: int, call: Callable[[], R]) -> R:
+        try:
+            return call()
+        except ContractLogicError as e:
+            raise ChunkReverted(start, stop, [item.game_id for item in items[start:stop]], e, tx_hashes) from e
+
+    size = _chunk_size(lambda n: attempt(0, n, lambda: build(items[:n]).estimate_gas(tx)), len(items), max_gas)
+    start = 0
+    while start < len(items):
+        stop = min(start + size, len(items))
+        function = build(items[start:stop])
+        estimate = attempt(start, stop, lambda: function.estimate_gas(tx))
+        if estimate * GAS_MARGIN > max_gas and stop - start > 1:
+            # costlier than the first items suggested: halve the chunks from here on
+            size = (stop - start) // 2
+            continue
+        if estimate > max_gas:
+            raise ValueError(f"item {start} (game {items[start].game_id}) needs {estimate} gas, "
+                             f"more than max_gas={max_gas}")
+        gas = min(int(estimate * GAS_MARGIN), max_gas)
+        tx_hashes.append(attempt(start, stop, lambda: function.transact({**tx, 'gas': gas})))
+        start = stop
+    return tx_hashes
+
+
+def make_moves(contract: Contract, sender: str, commitments: Sequence[MoveCommitment], max_gas: Optional[int] = None,
+               gas_fraction: float = DEFAULT_GAS_FRACTION) -> List[HexBytes]:
+    # makeMove for every commitment, in as few makeMoves transactions as fit under max_gas each (by default
+    # gas_fraction of the latest block's gas limit). Returns the transaction hashes, in order.
+    def build(chunk: Sequence[MoveCommitment]) -> ContractFunction:
+        return contract.functions.makeMoves([c.game_id for c in chunk], [c.bet_amount for c in chunk],
+                                            [c.hidden_move for c in chunk])
+
+    return _send_chunks(contract, build, commitments, sender, max_gas, gas_fraction)
+
+
+def reveal_moves(contract: Contract, sender: str, reveals: Sequence[MoveReveal], max_gas: Optional[int] = None,
+                 gas_fraction: float = DEFAULT_GAS_FRACTION) -> List[HexBytes]:
+    # revealMove for every reveal, chunked like make_moves.
+    def build(chunk: Sequence[MoveReveal]) -> ContractFunction:
+        return contract.functions.revealMoves([r.game_id for r in chunk], [int(r.move) for r in chunk],
+                                              [r.key for r in chunk])
+
+    return _send_chunks(contract, build, reveals, sender, max_gas, gas_fraction)
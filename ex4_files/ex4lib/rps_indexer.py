@@ -0,0 +1,190 @@
+import sqlite3
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from eth_utils import event_abi_to_log_topic
+from web3.contract import Contract
+from web3.exceptions import Web3Exception
+
+from ex4lib.rps_types import GameState, Move
+
+# Follows the RPS event log (eth_getLogs over block-range chunks) and keeps a local SQLite copy of every game
+# and every balance. Each chunk is applied in one transaction together with the checkpoint (the next block to
+# read), so an indexer that is stopped at any point resumes exactly where it left off.
+# uint256 values (game ids, amounts) do not fit SQLite integers and are stored as decimal text.
+
+DEFAULT_CHUNK_SIZE = 2000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id TEXT PRIMARY KEY,
+    state INTEGER NOT NULL,
+    player1 TEXT,
+    player2 TEXT,
+    bet_amount TEXT NOT NULL,
+    move1 INTEGER NOT NULL,
+    move2 INTEGER NOT NULL,
+    reveal_block INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_by_state ON games (state);
+CREATE TABLE IF NOT EXISTS balances (
+    player TEXT PRIMARY KEY,
+    balance TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    contract TEXT PRIMARY KEY,
+    next_block INTEGER NOT NULL
+);
+"""
+
+
+class IndexedGame(NamedTuple):
+    game_id: int
+    state: GameState
+    player1: Optional[str]
+    player2: Optional[str]
+    bet_amount: int
+    move1: Move
+    move2: Move
+    reveal_block: int
+
+
+class RPSIndexer:
+    def __init__(self, contract: Contract, db_path: str, start_block: int = 0,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, confirmations: int = 0):
+        # confirmations: how many blocks to stay behind the head (a cheap guard against short reorgs).
+        self.contract = contract
+        self.w3 = contract.w3
+        self.start_block = start_block
+        self.chunk_size = chunk_size
+        self.confirmations = confirmations
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript(SCHEMA)
+        self._events = {event_abi_to_log_topic(abi): contract.events[abi['name']]()
+                        for abi in contract.abi if abi['type'] == 'event'}
+        self._handlers: Dict[str, Callable[[Dict[str, Any], int], None]] = {
+            'Deposit': self._on_deposit,
+            'Withdrawal': self._on_withdrawal,
+            'MoveCommitted': self._on_move_committed,
+            'GameCanceled': self._on_game_canceled,
+            'MoveRevealed': self._on_move_revealed,
+            'GameEnded': self._on_game_ended,
+        }
+
+    def close(self) -> None:
+        self.db.close()
+
+    @property
+    def next_block(self) -> int:
+        row = self.db.execute('SELECT next_block FROM checkpoints WHERE contract = ?',
+                              (self.contract.address,)).fetchone()
+        return row[0] if row else self.start_block
+
+    def sync(self, to_block: Optional[int] = None) -> int:
+        # Indexes everything up to to_block (default: the head minus confirmations); returns the last indexed block.
+        if to_block is None:
+            to_block = self.w3.eth.block_number - self.confirmations
+        from_block = self.next_block
+        while from_block <= to_block:
+            end = min(from_block + self.chunk_size - 1, to_block)
+            try:
+                logs = self.w3.eth.get_logs({'address': self.contract.address, 'fromBlock': from_block, 'toBlock': end})
+            except (ValueError, Web3Exception):
+                # nodes cap the range / number of results of eth_getLogs: retry with smaller chunks
+                if self.chunk_size == 1:
+                    raise
+                self.chunk_size = max(1, self.chunk_size // 2)
+                continue
+            with self.db:
+                for log in logs:
+                    event = self._events.get(bytes(log['topics'][0]))
+                    if event is not None:
+                        decoded = event.process_log(log)
+                        self.apply(decoded['event'], decoded['args'], log['blockNumber'])
+                self.db.execute('INSERT OR REPLACE INTO checkpoints (contract, next_block) VALUES (?, ?)',
+                                (self.contract.address, end + 1))
+            from_block = end + 1
+        return from_block - 1
+
+    def follow(self, poll_interval: float = 1.0, should_stop: Callable[[], bool] = lambda: False) -> None:
+        # keeps the store up to date with the chain until should_stop() returns True
+        while not should_stop():
+            self.sync()
+            time.sleep(poll_interval)
+
+    ##### reading the store #####
+
+    def game(self, game_id: int) -> Optional[IndexedGame]:
+        row = self.db.execute('SELECT * FROM games WHERE game_id = ?', (str(game_id),)).fetchone()
+        if row is None:
+            return None
+        game_id, state, player1, player2, bet_amount, move1, move2, reveal_block = row
+        return IndexedGame(int(game_id), GameState(state), player1, player2, int(bet_amount),
+                           Move(move1), Move(move2), reveal_block)
+
+    def games_in_state(self, state: GameState) -> list:
+        rows = self.db.execute('SELECT game_id FROM games WHERE state = ?', (int(state),)).fetchall()
+        return [self.game(int(game_id)) for game_id, in rows]
+
+    def balance(self, player: str) -> int:
+        row = self.db.execute('SELECT balance FROM balances WHERE player = ?', (player,)).fetchone()
+        return int(row[0]) if row else 0
+
+    ##### applying events #####
+
+    def apply(self, event_name: str, args: Dict[str, Any], block_number: int) -> None:
+        # Updates the store for one decoded RPS event (part of the caller's transaction).
+        handler = self._handlers.get(event_name)
+        if handler is not None:
+            handler(args, block_number)
+
+    def _add_balance(self, player: str, delta: int) -> None:
+        self.db.execute('INSERT OR REPLACE INTO balances (player, balance) VALUES (?, ?)',
+                        (player, str(self.balance(player) + delta)))
+
+    def _update_game(self, game_id: int, **fields: Any) -> None:
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        self.db.execute(f'UPDATE games SET {assignments} WHERE game_id = ?', (*fields.values(), str(game_id)))
+
+    def _on_deposit(self, args: Dict[str, Any], block_number: int) -> None:
+        self._add_balance(args['player'], args['amount'])
+
+    def _on_withdrawal(self, args: Dict[str, Any], block_number: int) -> None:
+        self._add_balance(args['player'], -args['amount'])
+
+    def _on_move_committed(self, args: Dict[str, Any], block_number: int) -> None:
+        game = self.game(args['gameID'])
+        self._add_balance(args['player'], -args['betAmount'])
+        if game is None or game.state == GameState.NO_GAME:
+            self.db.execute('INSERT OR REPLACE INTO games VALUES (?, ?, ?, NULL, ?, 0, 0, 0)',
+                            (str(args['gameID']), int(GameState.MOVE1), args['player'], str(args['betAmount'])))
+        else:
+            self._update_game(args['gameID'], state=int(GameState.MOVE2), player2=args['player'])
+
+    def _on_game_canceled(self, args: Dict[str, Any], block_number: int) -> None:
+        game = self.game(args['gameID'])
+        if game is not None:
+            self._add_balance(args['player'], game.bet_amount)
+        self._update_game(args['gameID'], state=int(GameState.NO_GAME))
+
+    def _on_move_revealed(self, args: Dict[str, Any], block_number: int) -> None:
+        game = self.game(args['gameID'])
+        if game is None:
+            return
+        column = 'move1' if args['player'] == game.player1 else 'move2'
+        if game.state == GameState.MOVE2:
+            self._update_game(args['gameID'], state=int(GameState.REVEAL1), reveal_block=block_number,
+                              **{column: int(args['move'])})
+        else:
+            self._update_game(args['gameID'], **{column: int(args['move'])})
+
+    def _on_game_ended(self, args: Dict[str, Any], block_number: int) -> None:
+        game = self.game(args['gameID'])
+        if game is None:
+            return
+        if int(args['winner'], 16) == 0:
+            self._add_balance(game.player1, args['payout'])
+            self._add_balance(game.player2, args['payout'])
+        else:
+            self._add_balance(args['winner'], args['payout'])
+        self._update_game(args['gameID'], state=int(GameState.NO_GAME))
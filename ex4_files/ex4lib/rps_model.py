@@ -0,0 +1,325 @@
+import random
+from array import array
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from web3.contract import Contract
+from web3.exceptions import ContractLogicError
+
+from ex4lib import chain
+from ex4lib.commit_vault import commitment_of
+from ex4lib.rps_types import GameState, Move
+
+# Pure Python model of RPS.sol, to explore its rules without a chain. Players are indices 0..num_players-1 and game
+# ids are 0..num_games-1; the game table is a set of flat arrays (one entry per game id), so a model is cheap to
+# create and each step is a few list/array updates. Every call either applies the contract's effects or raises
+# Revert with the contract's reason string, without changing anything. As on an automining dev node, each
+# successful transaction is mined in a block of its own.
+#
+# differential() replays an action sequence against a deployed contract and checks that the chain agrees with the
+# model step by step (reverts, game states, balances).
+
+MAX_BET = 2 ** 96 - 1
+NO_PLAYER = -1
+
+
+class Revert(Exception):
+    pass
+
+
+class Action(NamedTuple):
+    # name is one of the RPSModel transaction methods (or 'mine'); player is an index
+    name: str
+    player: int
+    args: Tuple[Any, ...]
+
+
+def _winner(move1: int, move2: int) -> int:
+    # 0 on a tie, 1 if move1 wins, 2 if move2 wins
+    if move1 == move2:
+        return 0
+    return 1 if (move1 - move2) % 3 == 1 else 2
+
+
+class RPSModel:
+    def __init__(self, reveal_period_length: int, num_players: int, num_games: int, block_number: int = 0):
+        if reveal_period_length < 1:
+            raise Revert("Reveal period must be at least 1 block")
+        self.reveal_period_length = reveal_period_length
+        self.block_number = block_number
+        self.balances = [0] * num_players
+        # wei paid into and out of the contract
+        self.deposited = 0
+        self.withdrawn = 0
+        self.state = array('B', bytes(num_games))
+        self.move1 = array('B', bytes(num_games))
+        self.move2 = array('B', bytes(num_games))
+        self.player1 = array('i', [NO_PLAYER]) * num_games
+        self.player2 = array('i', [NO_PLAYER]) * num_games
+        self.reveal_block = array('q', bytes(8 * num_games))
+        self.bet_amount = [0] * num_games
+        self.hidden1: List[bytes] = [b''] * num_games
+        self.hidden2: List[bytes] = [b''] * num_games
+
+    def _clear(self, game: int) -> None:
+        # delete games[gameID]
+        self.state[game] = self.move1[game] = self.move2[game] = 0
+        self.player1[game] = self.player2[game] = NO_PLAYER
+        self.reveal_block[game] = 0
+        self.bet_amount[game] = 0
+        self.hidden1[game] = self.hidden2[game] = b''
+
+    def _mined(self) -> None:
+        self.block_number += 1
+
+    ##### the contract's functions #####
+
+    def get_game_state(self, game: int) -> GameState:
+        return GameState(self.state[game])
+
+    def deposit(self, player: int, amount: int) -> None:
+        self.balances[player] += amount
+        self.deposited += amount
+        self._mined()
+
+    def withdraw(self, player: int, amount: int) -> None:
+        if self.balances[player] < amount:
+            raise Revert("Not enough balance")
+        self.balances[player] -= amount
+        self.withdrawn += amount
+        self._mined()
+
+    def make_move(self, player: int, game: int, bet_amount: int, hidden_move: bytes) -> None:
+        state = self.state[game]
+        if state == GameState.MOVE1:
+            if player == self.player1[game]:
+                raise Revert("Cannot play against yourself")
+            bet_amount = self.bet_amount[game]
+            if self.balances[player] < bet_amount:
+                raise Revert("Not enough balance")
+            self.balances[player] -= bet_amount
+            self.player2[game] = player
+            self.hidden2[game] = hidden_move
+            self.state[game] = GameState.MOVE2
+        elif state == GameState.NO_GAME:
+            if bet_amount > MAX_BET:
+                raise Revert("Bet amount too large")
+            if self.balances[player] < bet_amount:
+                raise Revert("Not enough balance")
+            self.balances[player] -= bet_amount
+            self.player1[game] = player
+            self.bet_amount[game] = bet_amount
+            self.hidden1[game] = hidden_move
+            self.state[game] = GameState.MOVE1
+        else:
+            raise Revert("Invalid game state")
+        self._mined()
+
+    def deposit_and_make_move(self, player: int, game: int, bet_amount: int, hidden_move: bytes, value: int) -> None:
+        # value is the ether sent with the call
+        self.balances[player] += value
+        try:
+            self.make_move(player, game, bet_amount, hidden_move)
+        except Revert:
+            self.balances[player] -= value
+            raise
+        self.deposited += value
+
+    def cancel_game(self, player: int, game: int) -> None:
+        if self.state[game] != GameState.MOVE1:
+            raise Revert("player1 must commit")
+        if player != self.player1[game]:
+            raise Revert("Only the first player can cancel")
+        self.balances[player] += self.bet_amount[game]
+        self._clear(game)
+        self._mined()
+
+    def reveal_move(self, player: int, game: int, move: int, key: bytes) -> None:
+        state = self.state[game]
+        if state != GameState.MOVE2 and state != GameState.REVEAL1:
+            raise Revert("Cannot reveal")
+        if player != self.player1[game] and player != self.player2[game]:
+            raise Revert("Only players in this game can reveal")
+        if move not in (Move.ROCK, Move.PAPER, Move.SCISSORS):
+            raise Revert("Invalid move")
+        if player == self.player1[game]:
+            mine, theirs, hidden = self.move1, self.move2, self.hidden1[game]
+            if mine[game] != Move.NONE:
+                raise Revert("Move1 already revealed")
+        else:
+            mine, theirs, hidden = self.move2, self.move1, self.hidden2[game]
+            if mine[game] != Move.NONE:
+                raise Revert("Move2 already revealed")
+        if commitment_of(move, key) != hidden:
+            raise Revert("Invalid commitment")
+        mine[game] = move
+        if state == GameState.REVEAL1:
+            if theirs[game] != Move.NONE:
+                self._end_game(game)
+        else:
+            self.reveal_block[game] = self.block_number + 1
+            self.state[game] = GameState.REVEAL1
+        self._mined()
+
+    def reveal_move_and_withdraw(self, player: int, game: int, move: int, key: bytes) -> None:
+        before = self.balances[player]
+        self.reveal_move(player, game, move, key)
+        self.withdrawn += self.balances[player] - before
+        self.balances[player] = before
+
+    def _end_game(self, game: int) -> None:
+        bet_amount = self.bet_amount[game]
+        winner = _winner(self.move1[game], self.move2[game])
+        if winner == 0:
+            self.balances[self.player1[game]] += bet_amount
+            self.balances[self.player2[game]] += bet_amount
+        else:
+            self.balances[(self.player1 if winner == 1 else self.player2)[game]] += 2 * bet_amount
+        self._clear(game)
+
+    def reveal_phase_ended(self, player: int, game: int) -> None:
+        if self.state[game] != GameState.REVEAL1:
+            raise Revert("Reveal phase not started yet")
+        if self.block_number + 1 < self.reveal_block[game] + self.reveal_period_length:
+            raise Revert("Reveal period is not over")
+        if player != self.player1[game] and player != self.player2[game]:
+            raise Revert("Only players in this game can claim")
+        revealed1, revealed2 = self.move1[game] != Move.NONE, self.move2[game] != Move.NONE
+        if revealed1 and not revealed2:
+            if player != self.player1[game]:
+                raise Revert("this function can only be called by the first revealer")
+            self.balances[player] += 2 * self.bet_amount[game]
+        elif revealed2 and not revealed1:
+            if player != self.player2[game]:
+                raise Revert("this function can only be called by the first revealer")
+            self.balances[player] += 2 * self.bet_amount[game]
+        self._clear(game)
+        self._mined()
+
+    def mine(self, player: int, blocks: int) -> None:
+        self.block_number += blocks
+
+    ##### checks #####
+
+    def locked(self) -> int:
+        # wei held by games (a bet per committed player)
+        return sum(self.bet_amount[game] * (1 if state == GameState.MOVE1 else 2)
+                   for game, state in enumerate(self.state) if state != GameState.NO_GAME)
+
+    def apply(self, action: Action) -> Optional[str]:
+        # Applies the action; returns the revert reason if it reverted, None otherwise.
+        try:
+            getattr(self, action.name)(action.player, *action.args)
+        except Revert as e:
+            return str(e)
+        return None
+
+
+##### random action sequences #####
+
+# a few fixed keys, so sequences are reproducible from the seed and commitments can be precomputed
+KEYS = [bytes([i + 1]) * 32 for i in range(4)]
+COMMITMENTS = {(move, key): commitment_of(move, key) for move in Move for key in KEYS}
+
+
+def random_actions(rng: random.Random, num_players: int, num_games: int, steps: int,
+                   max_bet: int = 10, reveal_period_length: int = 2) -> Iterator[Action]:
+    # Yields steps random actions, many of which revert (wrong player, state, key or move), so the revert paths are
+    # exercised as much as the successful ones.
+    for _ in range(steps):
+        player, game = rng.randrange(num_players), rng.randrange(num_games)
+        kind = rng.random()
+        if kind < 0.1:
+            yield Action('deposit', player, (rng.randrange(1, 4 * max_bet),))
+        elif kind < 0.15:
+            yield Action('withdraw', player, (rng.randrange(2 * max_bet),))
+        elif kind < 0.45:
+            # a NONE commitment can never be revealed and locks its game for good, so keep those rare
+            move, key = rng.randrange(1, 4) if rng.random() < 0.95 else Move.NONE, rng.choice(KEYS)
+            if rng.random() < 0.8:
+                yield Action('make_move', player, (game, rng.randrange(max_bet), COMMITMENTS[move, key]))
+            else:
+                yield Action('deposit_and_make_move', player,
+                             (game, rng.randrange(max_bet), COMMITMENTS[move, key], rng.randrange(2 * max_bet)))
+        elif kind < 0.5:
+            yield Action('cancel_game', player, (game,))
+        elif kind < 0.85:
+            name = 'reveal_move' if rng.random() < 0.8 else 'reveal_move_and_withdraw'
+            yield Action(name, player, (game, rng.randrange(4), rng.choice(KEYS)))
+        elif kind < 0.95:
+            yield Action('reveal_phase_ended', player, (game,))
+        else:
+            yield Action('mine', player, (rng.randrange(1, 2 * reveal_period_length + 1),))
+
+
+def explore(seed: int, steps: int, num_players: int = 4, num_games: int = 8, reveal_period_length: int = 2,
+            check: Callable[[RPSModel, int], None] = lambda model, total: None) -> RPSModel:
+    # Runs a random sequence on a fresh model; check(model, total deposited - withdrawn) is called after every step.
+    rng = random.Random(seed)
+    model = RPSModel(reveal_period_length, num_players, num_games)
+    for action in random_actions(rng, num_players, num_games, steps, reveal_period_length=reveal_period_length):
+        model.apply(action)
+        check(model, model.deposited - model.withdrawn)
+    return model
+
+
+##### differential mode #####
+
+class Mismatch(AssertionError):
+    pass
+
+
+def _send(contract: Contract, action: Action, sender: str) -> None:
+    fn = contract.functions
+    name, args = action.name, action.args
+    if name == 'deposit':
+        contract.receive().transact({'from': sender, 'value': args[0]})
+    elif name == 'withdraw':
+        fn.withdraw(*args).transact({'from': sender})
+    elif name == 'make_move':
+        fn.makeMove(*args).transact({'from': sender})
+    elif name == 'deposit_and_make_move':
+        fn.depositAndMakeMove(*args[:3]).transact({'from': sender, 'value': args[3]})
+    elif name == 'cancel_game':
+        fn.cancelGame(*args).transact({'from': sender})
+    elif name == 'reveal_move':
+        fn.revealMove(*args).transact({'from': sender})
+    elif name == 'reveal_move_and_withdraw':
+        fn.revealMoveAndWithdraw(*args).transact({'from': sender})
+    elif name == 'reveal_phase_ended':
+        fn.revealPhaseEnded(*args).transact({'from': sender})
+    elif name == 'mine':
+        chain.mine(contract.w3, args[0])
+    else:
+        raise ValueError(f"unknown action {name!r}")
+
+
+def differential(contract: Contract, players: Sequence[str], actions: Iterable[Action], first_game_id: int = 0,
+                 num_games: int = 8) -> RPSModel:
+    # Replays the actions on a freshly deployed contract (no games, no balances for players) and on a model, and
+    # raises Mismatch at the first step where they disagree on reverting, the game's state or the balances.
+    # Game g of the model is game first_game_id + g of the contract.
+    w3 = contract.w3
+    model = RPSModel(contract.functions.revealPeriodLength().call(), len(players), num_games, w3.eth.block_number)
+    for step, action in enumerate(actions):
+        chain_action = action
+        if action.name not in ('deposit', 'withdraw', 'mine'):
+            chain_action = action._replace(args=(first_game_id + action.args[0], *action.args[1:]))
+        try:
+            _send(contract, chain_action, players[action.player])
+            chain_revert = None
+        except ContractLogicError as e:
+            chain_revert = str(e)
+        model_revert = model.apply(action)
+        if (chain_revert is None) != (model_revert is None) or (model_revert and model_revert not in chain_revert):
+            raise Mismatch(f"step {step} {action}: chain {chain_revert or 'succeeded'}, "
+                           f"model {model_revert or 'succeeded'}")
+        model.block_number = w3.eth.block_number
+        if action.name != 'mine' and action.name not in ('deposit', 'withdraw'):
+            game = action.args[0]
+            state = contract.functions.getGameState(first_game_id + game).call()
+            if state != model.state[game]:
+                raise Mismatch(f"step {step} {action}: game state {state} on chain, {model.state[game]} in the model")
+        balances = contract.functions.balancesOf(list(players)).call()
+        if balances != model.balances:
+            raise Mismatch(f"step {step} {action}: balances {balances} on chain, {model.balances} in the model")
+    return model
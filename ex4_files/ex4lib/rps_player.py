@@ -0,0 +1,158 @@
+import asyncio
+import secrets
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from hexbytes import HexBytes
+from web3 import AsyncWeb3
+from web3.contract import AsyncContract
+from web3.types import TxParams, TxReceipt
+
+from ex4lib.commit_vault import CommitmentVault, commitment_of
+from ex4lib.nonces import NonceTracker
+from ex4lib.rps_types import GameState
+
+# asyncio player for RPS on AsyncWeb3: one AsyncRPSPlayer per account, any number of games in flight.
+# Transactions are sent with a locally tracked nonce and a fixed gas limit, so a send makes no nonce lookup and no
+# gas estimate, and commits/reveals for many games go out without waiting for each other's receipts. It is not a
+# single RPC: web3 fills in the fees (latest block, eth_maxPriorityFeePerGas) and its default middleware reads the
+# latest block and eth_chainId again to validate the transaction (TxSender signs locally and avoids all of these).
+# Each game's GameState transitions, as observed through getGameState, are kept in PlayerGame.history.
+#
+#   player = AsyncRPSPlayer(w3, contract, account)
+#   states = await player.play_many([(game_id, move, bet_amount), ...])
+
+# more than any RPS call costs; only the gas actually used is paid for
+DEFAULT_GAS_LIMIT = 200_000
+DEFAULT_CONCURRENCY = 100
+
+
+class TransactionFailed(Exception):
+    def __init__(self, receipt: TxReceipt):
+        super().__init__(f"transaction {receipt['transactionHash'].hex()} reverted")
+        self.receipt = receipt
+
+
+class PlayerGame:
+    def __init__(self, game_id: int, move: int, key: bytes, bet_amount: int):
+        self.game_id = game_id
+        self.move = move
+        self.key = key
+        self.bet_amount = bet_amount
+        self.state = GameState.NO_GAME
+        self.revealed = False
+        self.history: List[GameState] = []
+        self.tx_hashes: List[HexBytes] = []
+
+    def observe(self, state: GameState) -> None:
+        if not self.history or self.history[-1] != state:
+            self.history.append(state)
+        self.state = state
+
+
+class AsyncRPSPlayer:
+    def __init__(self, w3: AsyncWeb3, contract: AsyncContract, account: str, vault: Optional[CommitmentVault] = None,
+                 nonces: Optional[NonceTracker] = None, gas_limit: int = DEFAULT_GAS_LIMIT):
+        # vault: if given, every (game, move, key) is stored (and flushed) before its commitment is sent.
+        # nonces: share one tracker between players that may send from the same account.
+        self.w3 = w3
+        self.contract = contract
+        self.account = account
+        self.vault = vault
+        self.nonces = nonces or NonceTracker()
+        self.gas_limit = gas_limit
+        self.games: Dict[int, PlayerGame] = {}
+        self._seed_lock = asyncio.Lock()
+
+    ##### sending #####
+
+    async def _send(self, send: Callable[[TxParams], Awaitable[HexBytes]], tx: Optional[TxParams] = None) -> HexBytes:
+        if not self.nonces.is_seeded(self.account):
+            async with self._seed_lock:
+                if not self.nonces.is_seeded(self.account):
+                    self.nonces.seed(self.account, await self.w3.eth.get_transaction_count(self.account, 'pending'))
+        nonce = self.nonces.take(self.account)
+        tx = {**(tx or {}), 'from': self.account, 'gas': self.gas_limit, 'nonce': nonce}
+        try:
+            return HexBytes(await send(tx))
+        except Exception:
+            # the nonce was not used (rejected transaction or RPC error). Other sends may hold later nonces, so it is
+            # given back to the tracker rather than rewinding the account to the node's pending count.
+            self.nonces.release(self.account, nonce)
+            raise
+
+    async def wait(self, tx_hash: HexBytes, timeout: float = 120, poll_latency: float = 0.1) -> TxReceipt:
+        receipt = await self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout, poll_latency)
+        if receipt['status'] != 1:
+            raise TransactionFailed(receipt)
+        return receipt
+
+    async def deposit(self, amount: int) -> HexBytes:
+        return await self._send(self.w3.eth.send_transaction, {'to': self.contract.address, 'value': amount})
+
+    async def withdraw(self, amount: int) -> HexBytes:
+        return await self._send(self.contract.functions.withdraw(amount).transact)
+
+    async def commit(self, game_id: int, move: int, bet_amount: int, deposit: int = 0) -> HexBytes:
+        # Sends makeMove with a fresh key and returns the transaction hash without waiting for it to be mined.
+        # With a deposit, sends depositAndMakeMove with that much wei instead (no separate deposit transaction).
+        key = secrets.token_bytes(32)
+        commitment = commitment_of(move, key)
+        if self.vault is not None:
+            self.vault.add(game_id, move, key, commitment, player=self.account)
+            self.vault.flush()
+        game = self.games[game_id] = PlayerGame(game_id, move, key, bet_amount)
+        if deposit:
+            function = self.contract.functions.depositAndMakeMove(game_id, bet_amount, commitment)
+            tx_hash = await self._send(function.transact, {'value': deposit})
+        else:
+            tx_hash = await self._send(self.contract.functions.makeMove(game_id, bet_amount, commitment).transact)
+        game.tx_hashes.append(tx_hash)
+        return tx_hash
+
+    async def reveal(self, game_id: int, withdraw: bool = False) -> HexBytes:
+        # withdraw: send revealMoveAndWithdraw, which also pays out what the reveal won
+        game = self.games[game_id]
+        function = self.contract.functions.revealMoveAndWithdraw if withdraw else self.contract.functions.revealMove
+        tx_hash = await self._send(function(game_id, game.move, game.key).transact)
+        game.revealed = True
+        game.tx_hashes.append(tx_hash)
+        return tx_hash
+
+    ##### tracking games #####
+
+    async def refresh(self, game_id: int) -> GameState:
+        state = GameState(await self.contract.functions.getGameState(game_id).call())
+        if game_id in self.games:
+            self.games[game_id].observe(state)
+        return state
+
+    async def play(self, game_id: int, move: int, bet_amount: int, poll_interval: float = 0.1) -> GameState:
+        # Commits, waits for the opponent's commitment, reveals, and returns the game state after our reveal:
+        # REVEAL1 if the opponent has not revealed yet, NO_GAME if the game is over. The opponent may commit and
+        # reveal between two polls (MOVE1, then REVEAL1): we still reveal, or it could claim the pot as late.
+        await self.wait(await self.commit(game_id, move, bet_amount))
+        game = self.games[game_id]
+        state = await self.refresh(game_id)
+        while state == GameState.MOVE1:
+            await asyncio.sleep(poll_interval)
+            state = await self.refresh(game_id)
+        if state not in (GameState.MOVE2, GameState.REVEAL1) or game.revealed:
+            # canceled
+            return state
+        await self.wait(await self.reveal(game_id))
+        state = await self.refresh(game_id)
+        if state == GameState.NO_GAME and self.vault is not None:
+            self.vault.mark_done(game_id)
+        return state
+
+    async def play_many(self, games: Iterable[Tuple[int, int, int]], concurrency: int = DEFAULT_CONCURRENCY,
+                        poll_interval: float = 0.1) -> List[Any]:
+        # Plays (game_id, move, bet_amount) games concurrently, at most concurrency at a time. Returns each game's
+        # final state in order, or the exception that game raised.
+        limit = asyncio.Semaphore(concurrency)
+
+        async def play_one(game_id: int, move: int, bet_amount: int) -> GameState:
+            async with limit:
+                return await self.play(game_id, move, bet_amount, poll_interval)
+
+        return await asyncio.gather(*(play_one(*game) for game in games), return_exceptions=True)
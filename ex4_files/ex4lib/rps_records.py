@@ -0,0 +1,151 @@
+from typing import Dict, Iterator, Optional, Sequence, Tuple, Union
+
+from eth_utils import to_checksum_address
+
+from ex4lib.rps_types import GameState, Move
+
+# Typed records for RPS games, decoded straight from what the node returns:
+#   Game.from_call(contract.functions.games(id).call())   the web3-decoded tuple
+#   Game.from_return_data(raw)                           the raw eth_call return data of games(uint) (9 words)
+#   Game.from_storage(raw)                               the 4 storage slots of the game (see below), concatenated
+# GameTable keeps many games in one bytearray, 128 bytes per game in the contract's own storage layout, and decodes
+# a field only when it is read - no Python object per game or per field.
+#
+# Storage layout of RPS.Game (fields packed from the low-order end of each 32-byte big-endian word):
+#   slot 0: [betAmount uint96 | player1 address]
+#   slot 1: [unused | revealBlock uint64 | state | move2 | move1 | player2 address]
+#   slot 2: hiddenMove1
+#   slot 3: hiddenMove2
+
+GAME_SLOTS = 4
+RECORD_SIZE = 32 * GAME_SLOTS
+ZERO_ADDRESS = '0x' + '00' * 20
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def _address(raw: Buffer) -> str:
+    return ZERO_ADDRESS if not any(raw) else to_checksum_address(bytes(raw))
+
+
+class Game:
+    __slots__ = ('player1', 'bet_amount', 'player2', 'move1', 'move2', 'state', 'reveal_block',
+                 'hidden_move1', 'hidden_move2')
+
+    def __init__(self, player1: str = ZERO_ADDRESS, bet_amount: int = 0, player2: str = ZERO_ADDRESS,
+                 move1: Move = Move.NONE, move2: Move = Move.NONE, state: GameState = GameState.NO_GAME,
+                 reveal_block: int = 0, hidden_move1: bytes = bytes(32), hidden_move2: bytes = bytes(32)):
+        self.player1 = player1
+        self.bet_amount = bet_amount
+        self.player2 = player2
+        self.move1 = Move(move1)
+        self.move2 = Move(move2)
+        self.state = GameState(state)
+        self.reveal_block = reveal_block
+        self.hidden_move1 = bytes(hidden_move1)
+        self.hidden_move2 = bytes(hidden_move2)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Game) and all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{f}={getattr(self, f)!r}' for f in self.__slots__)
+        return f'Game({fields})'
+
+    def astuple(self) -> tuple:
+        # in the order of the games() getter, so it compares equal to its (web3-decoded) result
+        return tuple(getattr(self, f) for f in self.__slots__)
+
+    @classmethod
+    def from_call(cls, result: Sequence) -> 'Game':
+        return cls(*result)
+
+    @classmethod
+    def from_return_data(cls, data: Buffer) -> 'Game':
+        # ABI return data of games(uint): 9 static words, one per field, in declaration order
+        view = memoryview(data)
+        words = [view[i * 32:(i + 1) * 32] for i in range(9)]
+        return cls(_address(words[0][12:]), int.from_bytes(words[1], 'big'), _address(words[2][12:]),
+                   int.from_bytes(words[3], 'big'), int.from_bytes(words[4], 'big'), int.from_bytes(words[5], 'big'),
+                   int.from_bytes(words[6], 'big'), bytes(words[7]), bytes(words[8]))
+
+    @classmethod
+    def from_storage(cls, data: Buffer) -> 'Game':
+        # the game's 4 storage slots as returned by eth_getStorageAt, concatenated (see the layout above)
+        view = memoryview(data)
+        return cls(_address(view[12:32]), int.from_bytes(view[0:12], 'big'), _address(view[44:64]),
+                   view[43], view[42], view[41], int.from_bytes(view[33:41], 'big'), bytes(view[64:96]),
+                   bytes(view[96:128]))
+
+    def to_storage(self) -> bytes:
+        slot0 = self.bet_amount.to_bytes(12, 'big') + bytes.fromhex(self.player1[2:])
+        slot1 = (bytes(1) + self.reveal_block.to_bytes(8, 'big') + bytes([self.state, self.move2, self.move1])
+                 + bytes.fromhex(self.player2[2:]))
+        return slot0 + slot1 + self.hidden_move1 + self.hidden_move2
+
+
+class GameTable:
+    def __init__(self):
+        self._data = bytearray()
+        self._rows: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, game_id: int) -> bool:
+        return game_id in self._rows
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._rows)
+
+    def nbytes(self) -> int:
+        return len(self._data)
+
+    def _offset(self, game_id: int) -> int:
+        row = self._rows.get(game_id)
+        if row is None:
+            row = self._rows[game_id] = len(self._rows)
+            self._data.extend(bytes(RECORD_SIZE))
+        return row * RECORD_SIZE
+
+    def put_storage(self, game_id: int, data: Buffer) -> None:
+        # stores the game's raw storage slots as they are
+        if len(data) != RECORD_SIZE:
+            raise ValueError(f"a game is {RECORD_SIZE} bytes of storage, got {len(data)}")
+        offset = self._offset(game_id)
+        self._data[offset:offset + RECORD_SIZE] = data
+
+    def put(self, game_id: int, game: Game) -> None:
+        self.put_storage(game_id, game.to_storage())
+
+    def raw(self, game_id: int) -> memoryview:
+        # the game's 128 bytes, without copying (invalidated by the next put of a new game id)
+        offset = self._rows[game_id] * RECORD_SIZE
+        return memoryview(self._data)[offset:offset + RECORD_SIZE]
+
+    def __getitem__(self, game_id: int) -> Game:
+        return Game.from_storage(self.raw(game_id))
+
+    def get(self, game_id: int) -> Optional[Game]:
+        return self[game_id] if game_id in self._rows else None
+
+    # single fields, read without decoding the rest of the game
+
+    def state(self, game_id: int) -> GameState:
+        return GameState(self._data[self._rows[game_id] * RECORD_SIZE + 41])
+
+    def bet_amount(self, game_id: int) -> int:
+        offset = self._rows[game_id] * RECORD_SIZE
+        return int.from_bytes(self._data[offset:offset + 12], 'big')
+
+    def reveal_block(self, game_id: int) -> int:
+        offset = self._rows[game_id] * RECORD_SIZE
+        return int.from_bytes(self._data[offset + 33:offset + 41], 'big')
+
+    def in_state(self, state: GameState) -> Iterator[Tuple[int, int]]:
+        # (game id, reveal block) of every game in the state, scanning the packed bytes only
+        data = self._data
+        for game_id, row in self._rows.items():
+            offset = row * RECORD_SIZE
+            if data[offset + 41] == state:
+                yield game_id, int.from_bytes(data[offset + 33:offset + 41], 'big')
@@ -0,0 +1,69 @@
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from eth_hash.auto import keccak
+from eth_utils import to_canonical_address
+from web3 import Web3
+from web3.types import BlockIdentifier
+
+from ex4lib.batch import BatchReader
+from ex4lib.rps_records import GAME_SLOTS, Game, GameTable
+
+# Reads RPS state straight from contract storage (eth_getStorageAt), without executing any EVM code:
+#   games[gameID]    mapping at slot 0: the game's 4 slots start at keccak256(gameID . 0)
+#   balances[addr]   mapping at slot 1: keccak256(addr . 1)
+# (revealPeriodLength is immutable and lives in the code, not in storage.) The words are fetched in JSON-RPC batches
+# at one block, so a snapshot of thousands of games at any past block the node still has costs a few round-trips.
+# The packed fields are decoded by ex4lib.rps_records.
+
+GAMES_SLOT = 0
+BALANCES_SLOT = 1
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _word(value: int) -> bytes:
+    return value.to_bytes(32, 'big')
+
+
+def game_slot(game_id: int) -> int:
+    # first of the game's GAME_SLOTS consecutive slots
+    return int.from_bytes(keccak(_word(game_id) + _word(GAMES_SLOT)), 'big')
+
+
+def balance_slot(player: str) -> int:
+    return int.from_bytes(keccak(to_canonical_address(player).rjust(32, b'\0') + _word(BALANCES_SLOT)), 'big')
+
+
+class StorageReader:
+    def __init__(self, w3: Web3, address: str, block_identifier: BlockIdentifier = 'latest',
+                 batch_size: int = DEFAULT_BATCH_SIZE):
+        # Pin block_identifier to a number for a consistent (or historical) snapshot.
+        self.w3 = w3
+        self.address = address
+        self.block_identifier = block_identifier
+        self.batch_size = batch_size
+
+    def _read_words(self, slots: Sequence[int]) -> List[bytes]:
+        words: List[bytes] = []
+        for i in range(0, len(slots), self.batch_size):
+            reader = BatchReader(self.w3, self.block_identifier)
+            for slot in slots[i:i + self.batch_size]:
+                reader.storage_at(self.address, slot % 2 ** 256)
+            words.extend(bytes(word).rjust(32, b'\0') for word in reader.execute())
+        return words
+
+    def read_games(self, game_ids: Iterable[int], table: Optional[GameTable] = None) -> GameTable:
+        # Stores the raw storage of every game in table (a new one by default) and returns it.
+        game_ids = list(game_ids)
+        slots = [game_slot(game_id) + i for game_id in game_ids for i in range(GAME_SLOTS)]
+        words = self._read_words(slots)
+        table = GameTable() if table is None else table
+        for n, game_id in enumerate(game_ids):
+            table.put_storage(game_id, b''.join(words[n * GAME_SLOTS:(n + 1) * GAME_SLOTS]))
+        return table
+
+    def game(self, game_id: int) -> Game:
+        return self.read_games([game_id])[game_id]
+
+    def balances(self, players: Sequence[str]) -> Dict[str, int]:
+        words = self._read_words([balance_slot(player) for player in players])
+        return {player: int.from_bytes(word, 'big') for player, word in zip(players, words)}
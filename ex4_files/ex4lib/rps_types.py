@@ -0,0 +1,25 @@
+from enum import IntEnum
+
+# Python mirrors of the enums in part2/RPS.sol and part2/RPSChannel.sol (the values are what the contracts return).
+
+
+class GameState(IntEnum):
+    NO_GAME = 0
+    MOVE1 = 1
+    MOVE2 = 2
+    REVEAL1 = 3
+    LATE = 4
+
+
+class Move(IntEnum):
+    NONE = 0
+    ROCK = 1
+    PAPER = 2
+    SCISSORS = 3
+
+
+class ChannelState(IntEnum):
+    NONE = 0
+    OPENING = 1
+    OPEN = 2
+    CLOSING = 3
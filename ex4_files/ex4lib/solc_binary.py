@@ -0,0 +1,83 @@
+import functools
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Resolves the pinned solc compiler from local files only - no version listing, no downloads.
+# The pin lives in ex4_files/solc.lock:
+#   {"version": "0.8.19"}                       required
+#   "binary": "tools/solc-v0.8.19"              optional, relative to the lockfile
+#   "sha256": "<hex digest of the binary>"      optional, checked when present
+# Lookup order: $SOLC_BINARY, the lockfile's "binary", then the binary store
+# ($SOLC_STORE, else py-solc-x's install folder $SOLCX_BINARY_PATH or ~/.solcx).
+
+LOCKFILE = Path(os.environ.get('SOLC_LOCKFILE', Path(__file__).resolve().parent.parent / 'solc.lock'))
+
+
+class SolcNotFoundError(RuntimeError):
+    pass
+
+
+def _read_lock() -> Dict[str, Any]:
+    try:
+        with open(LOCKFILE) as f:
+            lock = json.load(f)
+    except (OSError, ValueError) as e:
+        raise SolcNotFoundError(f"cannot read solc lockfile {LOCKFILE}: {e}") from e
+    if 'version' not in lock:
+        raise SolcNotFoundError(f"solc lockfile {LOCKFILE} does not pin a 'version'")
+    return lock
+
+
+def locked_version() -> str:
+    # the compiler version pinned by the lockfile, e.g. '0.8.19'
+    return str(_read_lock()['version']).lstrip('v')
+
+
+def _store_dirs() -> List[Path]:
+    dirs = []
+    if os.environ.get('SOLC_STORE'):
+        dirs.append(Path(os.environ['SOLC_STORE']))
+    dirs.append(Path(os.environ.get('SOLCX_BINARY_PATH', Path.home() / '.solcx')))
+    return dirs
+
+
+def _candidates(version: str, lock: Dict[str, Any]) -> List[Path]:
+    candidates = []
+    if os.environ.get('SOLC_BINARY'):
+        candidates.append(Path(os.environ['SOLC_BINARY']))
+    if lock.get('binary') and str(lock['version']).lstrip('v') == version:
+        candidates.append(LOCKFILE.parent / lock['binary'])
+    for store in _store_dirs():
+        # py-solc-x layout is solc-v<version> (a directory holding solc.exe on windows)
+        if sys.platform.startswith('win'):
+            candidates.append(store / f'solc-v{version}' / 'solc.exe')
+        candidates.append(store / f'solc-v{version}')
+        candidates.append(store / f'solc-{version}')
+    return candidates
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_solc(version: Optional[str] = None) -> Path:
+    # Returns the path of the solc binary for version (default: the locked version), or raises SolcNotFoundError.
+    lock = _read_lock()
+    version = (version or str(lock['version'])).lstrip('v')
+    candidates = _candidates(version, lock)
+    for path in candidates:
+        if path.is_file():
+            break
+    else:
+        searched = '\n  '.join(str(p) for p in candidates)
+        raise SolcNotFoundError(
+            f"solc {version} not found. Searched:\n  {searched}\n"
+            f"Copy the binary into one of these locations, point SOLC_BINARY at it, or (with network access) "
+            f"run: python -c \"import solcx; solcx.install_solc('{version}')\"")
+    expected = lock.get('sha256') if str(lock['version']).lstrip('v') == version else None
+    if expected:
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        if digest != expected.lower():
+            raise SolcNotFoundError(f"{path} does not match the sha256 pinned in {LOCKFILE} ({digest})")
+    return path
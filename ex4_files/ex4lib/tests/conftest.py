@@ -0,0 +1,17 @@
+import pytest
+
+from ex4lib.providers import make_web3
+
+from evm_helpers import ECHO_INIT
+
+
+@pytest.fixture
+def tester_w3():
+    pytest.importorskip('eth_tester')
+    return make_web3('tester')
+
+
+@pytest.fixture
+def echo_address(tester_w3):
+    tx_hash = tester_w3.eth.send_transaction({'from': tester_w3.eth.accounts[0], 'data': '0x' + ECHO_INIT})
+    return tester_w3.eth.get_transaction_receipt(tx_hash)['contractAddress']
@@ -0,0 +1,21 @@
+# Runtime code: return calldata[4:36] as the single return word, i.e. `function echo(x) returns (x)` for any
+# one-word argument type. Deployed from hand-written init code so these tests do not need solc.
+ECHO_RUNTIME = '6004356000526020' + '6000f3'
+ECHO_INIT = '600b80600b6000396000f3' + ECHO_RUNTIME
+
+
+def echo_abi(abi_type: str) -> list:
+    return [{'type': 'function', 'name': 'echo', 'stateMutability': 'view',
+             'inputs': [{'name': 'x', 'type': abi_type}], 'outputs': [{'name': '', 'type': abi_type}]}]
+
+
+# Runtime code: `function store(x)` writes x to storage slots x, x + 1 and x + 2. Storing 0 costs little and
+# storing a new nonzero value costs fresh SSTOREs, so the cost of a call depends on its argument and the state, as
+# RPS calls do.
+STORE_RUNTIME = '600435808055' + '808060010155' + '806002015500'
+STORE_INIT = '601280600b6000396000f3' + STORE_RUNTIME
+
+
+def store_abi() -> list:
+    return [{'type': 'function', 'name': 'store', 'stateMutability': 'nonpayable',
+             'inputs': [{'name': 'x', 'type': 'uint256'}], 'outputs': []}]
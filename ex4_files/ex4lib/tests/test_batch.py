@@ -0,0 +1,77 @@
+import pytest
+from hexbytes import HexBytes
+
+from ex4lib.batch import BatchReader, BatchRequestError, batch_call
+
+from evm_helpers import echo_abi
+
+
+def test_batch_reads_come_back_decoded_in_order(tester_w3, echo_address):
+    uint_echo = tester_w3.eth.contract(address=echo_address, abi=echo_abi('uint256'))
+    address_echo = tester_w3.eth.contract(address=echo_address, abi=echo_abi('address'))
+    account = tester_w3.eth.accounts[1]
+
+    reader = BatchReader(tester_w3)
+    assert reader.call(uint_echo.functions.echo(7)) == 0
+    assert reader.balance(account) == 1
+    assert reader.call(address_echo.functions.echo(account)) == 2
+    assert reader.storage_at(echo_address, 0) == 3
+    assert len(reader) == 4
+
+    results = reader.execute()
+    assert results[:3] == [7, tester_w3.eth.get_balance(account), account]
+    assert int.from_bytes(results[3], 'big') == 0
+    assert reader.execute() == []
+
+
+def test_batch_call(tester_w3, echo_address):
+    echo = tester_w3.eth.contract(address=echo_address, abi=echo_abi('uint256'))
+    assert batch_call(tester_w3, [echo.functions.echo(i) for i in range(5)]) == list(range(5))
+
+
+class ShufflingProvider:
+    # answers a batch in reverse order, which JSON-RPC servers are allowed to do
+    def make_batch_request(self, requests):
+        return [{'id': i, 'jsonrpc': '2.0', 'result': hex(i * 10)} for i in range(len(requests))][::-1]
+
+
+class FailingProvider:
+    def make_batch_request(self, requests):
+        return [{'id': 0, 'jsonrpc': '2.0', 'error': {'code': -32000, 'message': 'boom'}}]
+
+
+class RecordingProvider:
+    def __init__(self):
+        self.requests = []
+
+    def make_batch_request(self, requests):
+        self.requests.extend(requests)
+        return [{'id': i, 'jsonrpc': '2.0', 'result': '0x0'} for i in range(len(requests))]
+
+
+class FakeWeb3:
+    def __init__(self, provider):
+        self.provider = provider
+
+
+def test_batch_responses_are_matched_by_id():
+    reader = BatchReader(FakeWeb3(ShufflingProvider()))
+    for _ in range(3):
+        reader.balance('0x' + '00' * 20)
+    assert reader.execute() == [0, 10, 20]
+
+
+def test_batch_errors_raise():
+    reader = BatchReader(FakeWeb3(FailingProvider()))
+    reader.balance('0x' + '00' * 20)
+    with pytest.raises(BatchRequestError, match='boom'):
+        reader.execute()
+
+
+def test_block_hash_is_sent_as_hex():
+    provider = RecordingProvider()
+    block_hash = HexBytes('0x' + 'ab' * 32)
+    reader = BatchReader(FakeWeb3(provider), block_hash)
+    reader.balance('0x' + '00' * 20)
+    reader.execute()
+    assert provider.requests == [('eth_getBalance', ['0x' + '00' * 20, '0x' + 'ab' * 32])]
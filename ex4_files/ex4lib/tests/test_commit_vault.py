@@ -0,0 +1,46 @@
+import os
+import stat
+import time
+
+from web3 import Web3
+
+from ex4lib.commit_vault import CommitmentVault, commitment_of
+from ex4lib.rps_types import Move
+
+
+def test_commitment_matches_solidity_keccak():
+    key = b'\x07' * 32
+    for move in [1, 2, 3, -1]:
+        assert commitment_of(move, key) == bytes(Web3.solidity_keccak(['int256', 'bytes32'], [move, key]))
+
+
+def test_records_survive_reopening_and_are_found_by_game_and_commitment(tmp_path):
+    path = str(tmp_path / 'vault.db')
+    with CommitmentVault(path, batch_size=2) as vault:
+        commitment1 = vault.new_commitment(7, Move.ROCK, player='0xA')
+        commitment2 = vault.new_commitment(7, Move.PAPER, player='0xB')
+        commitment3 = vault.new_commitment(2 ** 255, Move.SCISSORS)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    with CommitmentVault(path) as vault:
+        assert len(vault) == 3
+        entry = vault.lookup(commitment1)
+        assert (entry.game_id, entry.player, entry.move) == (7, '0xA', Move.ROCK)
+        assert commitment_of(entry.move, entry.key) == commitment1
+        assert [e.commitment for e in vault.for_game(7)] == [commitment1, commitment2]
+        assert vault.reveal_args(7, player='0xB') == (Move.PAPER, vault.lookup(commitment2).key)
+        assert vault.lookup(commitment3).game_id == 2 ** 255
+        assert vault.lookup(b'\x00' * 32) is None
+
+
+def test_compact_drops_finished_and_expired_games(tmp_path):
+    with CommitmentVault(str(tmp_path / 'vault.db')) as vault:
+        vault.new_commitment(1, Move.ROCK)
+        vault.new_commitment(2, Move.PAPER)
+        vault.mark_done(1)
+        assert vault.reveal_args(1) is None
+        cutoff = time.time()
+        time.sleep(0.01)
+        kept = vault.new_commitment(3, Move.SCISSORS)
+        assert vault.compact(expire_before=cutoff) == 2
+        assert len(vault) == 1 and vault.lookup(kept) is not None
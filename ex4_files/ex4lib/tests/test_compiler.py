@@ -0,0 +1,61 @@
+import pytest
+import solcx
+
+from ex4lib import compiler
+
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    monkeypatch.setattr(compiler, 'CACHE_DIR', tmp_path / 'cache')
+    monkeypatch.setattr(compiler, '_memory_cache', {})
+    (tmp_path / 'Lib.sol').write_text('pragma solidity ^0.8.19;\nlibrary Lib {}\n')
+    main = tmp_path / 'Main.sol'
+    main.write_text('pragma solidity ^0.8.19;\nimport "./Lib.sol";\ncontract Main {}\n')
+    return tmp_path
+
+
+@pytest.fixture
+def fake_solc(monkeypatch):
+    calls = []
+
+    def compile_files(files, output_values, solc_binary, **options):
+        calls.append(files)
+        return {'Main.sol:Lib': {'abi': [], 'bin': '00'}, 'Main.sol:Main': {'abi': [], 'bin': '6080'}}
+
+    monkeypatch.setattr(solcx, 'compile_files', compile_files)
+    monkeypatch.setattr(compiler, 'resolve_solc', lambda version: 'solc')
+    return calls
+
+
+def test_cache_key_depends_on_sources_imports_version_and_options(sources):
+    main = sources / 'Main.sol'
+    key = compiler.cache_key([main], '0.8.19')
+    assert compiler.cache_key([main], 'v0.8.19') == key
+    assert compiler.cache_key([main], '0.8.20') != key
+    assert compiler.cache_key([main], '0.8.19', ['abi', 'bin', 'bin-runtime']) != key
+    assert compiler.cache_key([main], '0.8.19', optimize=True) != key
+
+    (sources / 'Lib.sol').write_text('pragma solidity ^0.8.19;\nlibrary Lib { }\n')
+    assert compiler.cache_key([main], '0.8.19') != key
+
+
+def test_compile_runs_solc_once_per_key(sources, fake_solc):
+    main = sources / 'Main.sol'
+    first = compiler.compile_contract(main, '0.8.19')
+    second = compiler.compile_contract(main, '0.8.19', 'Main')
+    assert first is second
+    assert first['bin'] == '6080'
+    assert len(fake_solc) == 1
+
+    # a fresh process (empty memory cache) reads the artifacts back from disk
+    compiler._memory_cache.clear()
+    assert compiler.compile_contract(main, '0.8.19', 'Lib')['bin'] == '00'
+    assert len(fake_solc) == 1
+
+    compiler.compile_contract(main, '0.8.19', optimize=True)
+    assert len(fake_solc) == 2
+
+
+def test_compile_contract_unknown_name(sources, fake_solc):
+    with pytest.raises(KeyError):
+        compiler.compile_contract(sources / 'Main.sol', '0.8.19', 'Missing')
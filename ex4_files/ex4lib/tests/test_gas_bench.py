@@ -0,0 +1,29 @@
+import pytest
+
+from ex4lib.gas_bench import GasBench, compare, main
+
+
+def test_compare_flags_only_growth_above_threshold():
+    baseline = {'gas': {'RPS.cancelGame': 10000, 'RPS.withdraw': 20000, 'Wallet.deposit[first]': 40000}}
+    report = {'gas': {'RPS.cancelGame': 10100, 'RPS.withdraw': 20300, 'Wallet.deposit[first]': 30000,
+                      'RPS.revealPhaseEnded': 50000}}
+    assert compare(report, baseline, threshold=0.01) == [('RPS.withdraw', 20000, 20300)]
+    assert compare(report, baseline, threshold=0.02) == []
+    assert compare(report, {}) == []
+
+
+def test_missing_baseline_is_an_error(tmp_path, capsys):
+    # before anything is compiled or run
+    with pytest.raises(SystemExit) as exc_info:
+        main(['--backend', 'tester', '--baseline', str(tmp_path / 'gas_baseline.json')])
+    assert exc_info.value.code == 2
+    assert '--update-baseline' in capsys.readouterr().err
+
+
+def test_a_name_is_recorded_once(tester_w3):
+    bench = GasBench(tester_w3)
+    sender, receiver = tester_w3.eth.accounts[:2]
+    bench.record('transfer', tester_w3.eth.send_transaction({'from': sender, 'to': receiver, 'value': 1}))
+    with pytest.raises(ValueError, match="'transfer'"):
+        bench.record('transfer', tester_w3.eth.send_transaction({'from': sender, 'to': receiver, 'value': 2}))
+    assert bench.results == {'transfer': 21000}
@@ -0,0 +1,82 @@
+import json
+
+from ex4lib.gas_profiler import (CodeMap, GasProfiler, Location, SourceFile, attribute, iter_json_array,
+                                 replay_in_process, steps_from_struct_logs)
+
+
+def init_code(runtime: str) -> str:
+    # returns runtime as the deployed code
+    length = len(runtime) // 2
+    return f'60{length:02x}80600b6000396000f3' + runtime
+
+
+def deploy(w3, runtime: str) -> str:
+    tx_hash = w3.eth.send_transaction({'from': w3.eth.accounts[0], 'data': '0x' + init_code(runtime)})
+    return w3.eth.get_transaction_receipt(tx_hash)['contractAddress']
+
+
+def test_json_array_is_parsed_across_chunks():
+    logs = [{'pc': 0, 'op': 'PUSH1', 'stack': []}, {'pc': 2, 'op': 'REVERT', 'error': 'a "}] {[" \\ b'}]
+    document = json.dumps({'jsonrpc': '2.0', 'result': {'returnValue': '', 'structLogs': logs}}).encode()
+    for size in (1, 3, 7, len(document)):
+        assert list(iter_json_array(document[i:i + size] for i in range(0, len(document), size))) == logs
+    assert list(iter_json_array([b'{"result": {"structLogs": []}}'])) == []
+
+
+def test_calls_are_charged_their_own_cost():
+    callee = '0x' + '11' * 20
+    logs = [
+        {'depth': 1, 'pc': 0, 'op': 'PUSH1', 'gas': 1000, 'gasCost': 3},
+        {'depth': 1, 'pc': 2, 'op': 'CALL', 'gas': 997, 'gasCost': 600, 'stack': ['0x0', callee, '0x1f4']},
+        {'depth': 2, 'pc': 0, 'op': 'PUSH1', 'gas': 500, 'gasCost': 3},
+        {'depth': 2, 'pc': 2, 'op': 'STOP', 'gas': 497, 'gasCost': 0},
+        {'depth': 1, 'pc': 3, 'op': 'CALL', 'gas': 894, 'gasCost': 100, 'stack': ['0x0', callee, '0x0']},
+        {'depth': 1, 'pc': 4, 'op': 'STOP', 'gas': 794, 'gasCost': 0},
+    ]
+    steps = list(steps_from_struct_logs(logs, '0x' + '22' * 20))
+    assert steps[2].address == '0x' + '11' * 20 and steps[4].address == '0x' + '22' * 20
+    charged = [(len(callers), step.pc, step.op, gas) for callers, step, gas in attribute(steps)]
+    # the first call used 103 from its frame, 3 of them in the callee; the second ran no code
+    assert charged == [(0, 0, 'PUSH1', 3), (1, 0, 'PUSH1', 3), (1, 2, 'STOP', 0), (0, 2, 'CALL', 100),
+                       (0, 3, 'CALL', 100), (0, 4, 'STOP', 0)]
+
+
+def test_source_map_to_lines_and_functions():
+    source = SourceFile('/src/C.sol', b'contract C {\n  function f() {\n    x = 1;\n  }\n}\n')
+    source.functions.append((15, 45, 'C.f'))
+    # PUSH1 1, PUSH1 2, ADD, STOP: the pushed bytes are not instructions
+    code_map = CodeMap('C', '600160020100', '0:48:0;33:6;;:5:-1', {0: source})
+    assert code_map.locate(0) == Location('/src/C.sol', 1, 'C')
+    assert code_map.locate(2) == code_map.locate(4) == Location('/src/C.sol', 3, 'C.f')
+    assert code_map.locate(5) == Location('C', 0, 'C')
+    assert source.line_text(3) == 'x = 1;'
+
+
+def test_sources_with_the_same_file_name_are_kept_apart(tester_w3):
+    profiler = GasProfiler(tester_w3)
+    first = profiler._source_files({'ast': {'nodeType': 'SourceUnit', 'src': '0:0:0', 'absolutePath': '/a/C.sol'}})
+    second = profiler._source_files({'ast': {'nodeType': 'SourceUnit', 'src': '0:0:1', 'absolutePath': '/b/C.sol'}})
+    assert first[0].path == '/a/C.sol' and second[1].path == '/b/C.sol'
+    assert sorted(profiler.sources) == ['/a/C.sol', '/b/C.sol']
+
+
+def test_in_process_replay_accounts_for_all_the_gas(tester_w3, echo_address):
+    w3 = tester_w3
+    # CALL(gas, echo, 0, 0, 0, 0, 0); POP; STOP
+    caller = deploy(w3, '6000600060006000600073' + echo_address[2:].lower() + '5af15000')
+    tx_hash = w3.eth.send_transaction({'from': w3.eth.accounts[0], 'to': caller, 'gas': 100_000})
+    w3.eth.send_transaction({'from': w3.eth.accounts[0], 'to': caller, 'gas': 100_000})
+
+    steps = replay_in_process(w3, tx_hash)
+    assert [step.op for step in steps if step.depth == 1][-3:] == ['CALL', 'POP', 'STOP']
+    assert {step.address for step in steps if step.depth == 2} == {echo_address}
+    # PUSH1 4, CALLDATALOAD, PUSH1 0, MSTORE, PUSH1 32, PUSH1 0, RETURN
+    assert [step.op for step in steps if step.depth == 2][:2] == ['PUSH1', 'CALLDATALOAD']
+    assert len([step for step in steps if step.depth == 2]) == 7
+
+    profile = GasProfiler(w3).profile(tx_hash, 'call')
+    assert profile.transaction_gas == 21000
+    assert profile.gas_used == w3.eth.get_transaction_receipt(tx_hash)['gasUsed']
+    assert sum(gas for _, _, gas in attribute(steps)) == profile.execution_gas
+    assert any(line.startswith(f'call;{caller};{caller}:0;{echo_address};{echo_address}:0 ')
+               for line in profile.folded())
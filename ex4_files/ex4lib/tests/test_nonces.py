@@ -0,0 +1,32 @@
+import threading
+
+from ex4lib.nonces import NonceTracker
+
+
+def test_take_is_sequential_and_thread_safe():
+    nonces = NonceTracker()
+    nonces.seed('0xA', 7)
+    nonces.seed('0xA', 0)  # already tracked: ignored
+    taken = []
+    threads = [threading.Thread(target=lambda: taken.extend(nonces.take('0xA') for _ in range(100))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(taken) == list(range(7, 407))
+    nonces.reset('0xA', 10)
+    assert nonces.take('0xA') == 10 and nonces.peek('0xA') == 11
+    assert not nonces.is_seeded('0xB')
+
+
+def test_released_nonces_are_handed_out_again():
+    nonces = NonceTracker()
+    nonces.seed('0xA', 0)
+    _, second, third = (nonces.take('0xA') for _ in range(3))
+    # a failed send in the middle: 2 is still in flight, so 1 is reused instead of rewinding
+    nonces.release('0xA', second)
+    assert nonces.take('0xA') == 1 and nonces.take('0xA') == 3
+    # the last ones handed out are simply taken back
+    nonces.release('0xA', 3)
+    nonces.release('0xA', third)
+    assert nonces.peek('0xA') == 2 and nonces.take('0xA') == 2
@@ -0,0 +1,72 @@
+import pytest
+from web3 import Web3
+
+from ex4lib import chain
+from ex4lib.providers import make_web3, resolve_rpc_url, selected_backend
+
+pytest.importorskip('eth_tester')
+
+
+@pytest.fixture
+def w3():
+    return make_web3('tester')
+
+
+def test_selected_backend(monkeypatch):
+    monkeypatch.delenv('EX4_BACKEND', raising=False)
+    assert selected_backend() == 'http'
+    monkeypatch.setenv('EX4_BACKEND', 'tester')
+    assert selected_backend() == 'tester'
+    assert selected_backend('http') == 'http'
+    with pytest.raises(ValueError):
+        selected_backend('ganache')
+
+
+def test_http_backend_is_lazy():
+    w3 = make_web3('http', 'http://127.0.0.1:1')
+    assert isinstance(w3.provider, Web3.HTTPProvider)
+    assert w3.provider.endpoint_uri == 'http://127.0.0.1:1'
+
+
+def test_node_per_worker(monkeypatch):
+    monkeypatch.delenv('EX4_RPC_URL', raising=False)
+    monkeypatch.delenv('EX4_NODE_PER_WORKER', raising=False)
+    monkeypatch.setenv('PYTEST_XDIST_WORKER', 'gw3')
+    assert resolve_rpc_url() == 'http://127.0.0.1:8545'
+    monkeypatch.setenv('EX4_NODE_PER_WORKER', '1')
+    assert resolve_rpc_url() == 'http://127.0.0.1:8548'
+    assert resolve_rpc_url('http://node:9000/rpc') == 'http://node:9003/rpc'
+    monkeypatch.setenv('PYTEST_XDIST_WORKER', 'gw0')
+    assert resolve_rpc_url() == 'http://127.0.0.1:8545'
+
+
+def test_tester_backend_mines_and_reverts(w3):
+    sender, receiver = w3.eth.accounts[:2]
+    block = w3.eth.block_number
+    balance = w3.eth.get_balance(receiver)
+
+    snapshot_id = chain.snapshot(w3)
+    w3.eth.send_transaction({'from': sender, 'to': receiver, 'value': w3.to_wei(1, 'ether')})
+    w3.provider.make_request('evm_mine', [])
+    assert w3.eth.get_balance(receiver) == balance + w3.to_wei(1, 'ether')
+    assert w3.eth.block_number == block + 2
+
+    chain.revert(w3, snapshot_id)
+    assert w3.eth.get_balance(receiver) == balance
+    assert w3.eth.block_number == block
+
+
+def test_mine_in_one_request(w3, monkeypatch):
+    block = w3.eth.block_number
+    calls = []
+    request_blocking = w3.manager.request_blocking
+    monkeypatch.setattr(w3.manager, 'request_blocking',
+                        lambda method, *args, **kwargs: calls.append(method) or request_blocking(method, *args, **kwargs))
+    with chain.isolated(w3):
+        chain.mine(w3, 200)
+        assert calls == ['evm_snapshot', 'evm_mine']
+        chain.mine_to(w3, block + 300)
+        assert w3.eth.block_number == block + 300
+        chain.mine_to(w3, block)
+        assert w3.eth.block_number == block + 300
+    assert w3.eth.block_number == block
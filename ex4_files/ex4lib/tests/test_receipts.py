@@ -0,0 +1,69 @@
+import time
+
+import pytest
+from web3.exceptions import TimeExhausted
+
+from ex4lib.receipts import ReceiptWaiter
+
+
+def send(w3, value=1):
+    sender, receiver = w3.eth.accounts[:2]
+    return w3.eth.send_transaction({'from': sender, 'to': receiver, 'value': value})
+
+
+def test_waits_for_many_hashes_one_block_at_a_time(tester_w3, monkeypatch):
+    waiter = ReceiptWaiter(tester_w3, lookback=4)
+    tx_hashes = [send(tester_w3, i + 1) for i in range(6)]
+
+    calls = []
+    request_blocking = tester_w3.manager.request_blocking
+    monkeypatch.setattr(tester_w3.manager, 'request_blocking',
+                        lambda method, *args, **kwargs: calls.append(method) or request_blocking(method, *args, **kwargs))
+    receipts = waiter.wait(tx_hashes[2:])
+    assert [receipt.transactionHash for receipt in receipts] == tx_hashes[2:]
+    # eth-tester has no eth_getBlockReceipts: one block request per block, one receipt request per wanted hash
+    assert calls.count('eth_getBlockByNumber') == 4
+    assert calls.count('eth_getTransactionReceipt') == 4
+
+    # an older hash that is still in the window is answered from memory
+    calls.clear()
+    assert waiter.submit(tx_hashes[3]).result(timeout=0).transactionHash == tx_hashes[3]
+    assert calls == []
+
+
+def test_hash_mined_before_the_first_window_is_resolved(tester_w3):
+    old = send(tester_w3)
+    for i in range(5):
+        send(tester_w3, i + 2)
+    waiter = ReceiptWaiter(tester_w3, lookback=2)
+    future = waiter.submit(old)
+    waiter.poll()
+    assert future.result(timeout=0).transactionHash == old
+
+
+def test_hash_older_than_the_kept_blocks_is_resolved_at_once(tester_w3):
+    old = send(tester_w3)
+    waiter = ReceiptWaiter(tester_w3, lookback=2)
+    for i in range(5):
+        send(tester_w3, i + 2)
+    waiter.poll()
+    # not in the blocks the waiter keeps, and no block is skipped any more: asked for directly on the next poll
+    start = time.monotonic()
+    assert waiter.wait_one(old, timeout=3).transactionHash == old
+    assert time.monotonic() - start < 1
+
+
+def test_background_thread_resolves_futures(tester_w3):
+    waiter = ReceiptWaiter(tester_w3, max_interval=0.05)
+    waiter.start()
+    try:
+        future = waiter.submit(send(tester_w3))
+        assert future.result(timeout=5).status == 1
+    finally:
+        waiter.stop()
+
+
+def test_unknown_hash_times_out(tester_w3):
+    waiter = ReceiptWaiter(tester_w3, max_interval=0.01)
+    with pytest.raises(TimeExhausted):
+        waiter.wait([b'\x11' * 32], timeout=0.05)
@@ -0,0 +1,118 @@
+import pytest
+from eth_account import Account
+
+from ex4lib.commit_vault import commitment_of
+from ex4lib.rps_channel import (ChannelError, ChannelPlayer, ChannelStore, SignedCommit, commit_hash, sign_hash, signer,
+                                state_hash)
+from ex4lib.rps_types import Move
+
+CONTRACT = '0x' + '42' * 20
+ALICE, BOB, EVE = (Account.from_key(bytes([i]) * 32) for i in (1, 2, 3))
+
+
+def players(tmp_path, deposit=10, contract=CONTRACT, opening=1):
+    alice = ChannelPlayer(ALICE, contract, 7, opening, ALICE.address, BOB.address, deposit, deposit,
+                          ChannelStore(str(tmp_path / 'alice.db')))
+    bob = ChannelPlayer(BOB, contract, 7, opening, ALICE.address, BOB.address, deposit, deposit,
+                        ChannelStore(str(tmp_path / 'bob.db')))
+    return alice, bob
+
+
+def play_round(alice, bob, move1, move2, bet_amount):
+    commit1, commit2 = alice.commit(move1, bet_amount), bob.commit(move2, bet_amount)
+    alice.receive_commit(commit2)
+    bob.receive_commit(commit1)
+    alice.receive_reveal(bob.reveal())
+    bob.receive_reveal(alice.reveal())
+    signature1, signature2 = alice.sign_next_state(), bob.sign_next_state()
+    return bob.receive_state_signature(signature1), alice.receive_state_signature(signature2)
+
+
+def test_rounds_are_co_signed(tmp_path):
+    alice, bob = players(tmp_path)
+    outcomes = [(Move.ROCK, Move.SCISSORS), (Move.PAPER, Move.SCISSORS), (Move.PAPER, Move.PAPER)] * 5
+    for move1, move2 in outcomes:
+        signed_by_bob, signed_by_alice = play_round(alice, bob, move1, move2, 2)
+        assert signed_by_bob == signed_by_alice
+    state = alice.state
+    assert (state.round, state.balance1, state.balance2) == (15, 10, 10)
+    assert signer(state_hash(CONTRACT, 1, state), alice.latest.signature2) == BOB.address
+
+    play_round(alice, bob, Move.SCISSORS, Move.PAPER, 10)
+    alice.sign_final_state()
+    alice.receive_state_signature(bob.sign_final_state())
+    assert alice.close_args() == (7, 17, 20, 0, alice.latest.signature1, alice.latest.signature2)
+
+
+def test_invalid_messages_are_rejected(tmp_path):
+    alice, bob = players(tmp_path)
+    commit = bob.commit(Move.ROCK, 5)
+    with pytest.raises(ChannelError, match="signature"):
+        alice.receive_commit(commit._replace(hidden_move=b'\0' * 32))
+    with pytest.raises(ChannelError, match="round"):
+        alice.receive_commit(commit._replace(round=2))
+    with pytest.raises(ChannelError, match="not covered"):
+        alice.commit(Move.ROCK, 11)
+    alice.receive_commit(commit)
+    with pytest.raises(ChannelError, match="does not match"):
+        alice.commit(Move.PAPER, 4)
+    with pytest.raises(ChannelError, match="not fully committed"):
+        bob.reveal()
+    bob.receive_commit(alice.commit(Move.PAPER, 5))
+    reveal = bob.reveal()
+    with pytest.raises(ChannelError, match="does not match"):
+        alice.receive_reveal(reveal._replace(move=Move.SCISSORS))
+    alice.receive_reveal(reveal)
+    alice.sign_next_state()
+    with pytest.raises(ChannelError, match="invalid signature"):
+        alice.receive_state_signature(sign_hash(EVE, state_hash(CONTRACT, 1, alice.next_state())))
+    assert alice.state.round == 0
+
+
+def test_store_survives_a_restart(tmp_path):
+    alice, bob = players(tmp_path)
+    play_round(alice, bob, Move.ROCK, Move.PAPER, 3)
+    bob.receive_commit(alice.commit(Move.ROCK, 4))
+    alice.receive_commit(bob.commit(Move.SCISSORS, 4))
+    bob.receive_reveal(alice.reveal())
+    # bob knows he lost and stops answering: alice restarts and disputes the round on chain
+    alice.store.close()
+    alice, _ = players(tmp_path)
+    assert (alice.state.round, alice.state.balance1, alice.state.balance2) == (1, 7, 13)
+    assert alice.submit_state_args()[:6] == (7, 1, 7, 13, False, alice.latest.signature1)
+    channel_id, bet_amount, hidden1, signature1, hidden2, signature2 = alice.dispute_args()
+    assert (channel_id, bet_amount) == (7, 4) and signature2 == bob._round[2][0].signature
+    assert alice.reveal_args()[:2] == (7, Move.ROCK)
+
+
+def test_channels_reopened_or_on_other_contracts_are_separate(tmp_path):
+    alice, bob = players(tmp_path)
+    old_commit = bob.commit(Move.SCISSORS, 3)
+    alice.receive_commit(old_commit)
+    bob.receive_commit(alice.commit(Move.ROCK, 3))
+    alice.receive_reveal(bob.reveal())
+    bob.receive_reveal(alice.reveal())
+    signature1, signature2 = alice.sign_next_state(), bob.sign_next_state()
+    alice.receive_state_signature(signature2)
+    bob.receive_state_signature(signature1)
+    assert alice.state.round == 1
+    for other in [players(tmp_path, opening=2), players(tmp_path, contract='0x' + '43' * 20)]:
+        alice, bob = other
+        # the same store starts the channel over, and messages signed for the other channel are rejected
+        assert (alice.state.round, alice.state.balance1, bob.round) == (0, 10, 1)
+        with pytest.raises(ChannelError, match="invalid signature"):
+            alice.receive_commit(old_commit)
+
+
+def test_copied_commitment_is_rejected(tmp_path):
+    alice, bob = players(tmp_path)
+    ours = alice.commit(Move.ROCK, 5)
+    # bob signs alice's hidden move as his own, hoping to reveal alice's move and key after her
+    signature = sign_hash(BOB, commit_hash(CONTRACT, 7, 1, BOB.address, 1, 5, ours.hidden_move))
+    with pytest.raises(ChannelError, match="copy of ours"):
+        alice.receive_commit(SignedCommit(7, 1, 5, ours.hidden_move, signature))
+    # the signed message names its player: one bob signed as a commitment of alice's does not pass for his own
+    other = commitment_of(Move.PAPER, b'\x07' * 32)
+    signature = sign_hash(BOB, commit_hash(CONTRACT, 7, 1, ALICE.address, 1, 5, other))
+    with pytest.raises(ChannelError, match="invalid signature"):
+        alice.receive_commit(SignedCommit(7, 1, 5, other, signature))
@@ -0,0 +1,55 @@
+import pytest
+from web3.exceptions import ContractLogicError
+
+from ex4lib.rps_client import ChunkReverted, MoveReveal, _chunk_size, _send_chunks
+
+
+def test_chunk_size_fits_the_gas_cap():
+    # 21k base + 50k per item
+    estimate = lambda n: 21_000 + 50_000 * n
+    # per item with the 25% margin: 62.5k
+    assert _chunk_size(estimate, 100, 1_000_000) == 15
+    assert _chunk_size(estimate, 3, 10 ** 9) == 3
+    assert _chunk_size(estimate, 100, 10_000) == 1
+    assert _chunk_size(estimate, 1, 10) == 1
+
+
+
+class FakeBatch:
+    # a batch call costing 21k plus cost[game id] per game; game ids in `reverting` revert
+    def __init__(self, chunk, cost, reverting, sent):
+        self.chunk, self.cost, self.reverting, self.sent = chunk, cost, reverting, sent
+
+    def estimate_gas(self, tx):
+        if any(item.game_id in self.reverting for item in self.chunk):
+            raise ContractLogicError('execution reverted: Cannot reveal')
+        return 21_000 + sum(self.cost[item.game_id] for item in self.chunk)
+
+    def transact(self, tx):
+        self.sent.append(([item.game_id for item in self.chunk], tx['gas'], self.estimate_gas(tx)))
+        return len(self.sent)
+
+
+def send(cost, max_gas, reverting=()):
+    sent = []
+    items = [MoveReveal(game_id, 1, b'') for game_id in range(len(cost))]
+    tx_hashes = _send_chunks(None, lambda chunk: FakeBatch(chunk, cost, set(reverting), sent), items, '0xMe',
+                             max_gas, 0.5)
+    return tx_hashes, sent
+
+
+def test_chunks_costlier_than_the_first_items_are_split():
+    # the first two games suggest 10 per chunk, the later ones cost five times as much
+    tx_hashes, sent = send([10_000] * 2 + [50_000] * 10, 200_000)
+    assert [game for games, _, _ in sent for game in games] == list(range(12))
+    assert all(estimate <= gas <= 200_000 for _, gas, estimate in sent)
+    assert tx_hashes == list(range(1, len(sent) + 1))
+    with pytest.raises(ValueError, match='item 0'):
+        send([300_000], 200_000)
+
+
+def test_reverting_chunk_names_its_games():
+    with pytest.raises(ChunkReverted, match=r'games \[4, 5, 6, 7\]') as exc_info:
+        send([10_000] * 10, 80_000, reverting={5})
+    assert (exc_info.value.start, exc_info.value.stop) == (4, 8)
+    assert exc_info.value.tx_hashes == [1]
@@ -0,0 +1,79 @@
+import pytest
+
+from ex4lib.rps_indexer import RPSIndexer
+from ex4lib.rps_types import GameState, Move
+
+ALICE = '0x' + '11' * 20
+BOB = '0x' + '22' * 20
+NOBODY = '0x' + '00' * 20
+
+
+def event_abi(name, *inputs):
+    return {'type': 'event', 'name': name, 'anonymous': False,
+            'inputs': [{'name': n, 'type': t, 'indexed': i} for n, t, i in inputs]}
+
+
+# the events of part2/RPS.sol
+RPS_EVENTS_ABI = [
+    event_abi('Deposit', ('player', 'address', True), ('amount', 'uint256', False)),
+    event_abi('Withdrawal', ('player', 'address', True), ('amount', 'uint256', False)),
+    event_abi('MoveCommitted', ('gameID', 'uint256', True), ('player', 'address', True), ('betAmount', 'uint256', False)),
+    event_abi('GameCanceled', ('gameID', 'uint256', True), ('player', 'address', True)),
+    event_abi('MoveRevealed', ('gameID', 'uint256', True), ('player', 'address', True), ('move', 'uint8', False)),
+    event_abi('GameEnded', ('gameID', 'uint256', True), ('winner', 'address', True), ('payout', 'uint256', False)),
+]
+
+
+@pytest.fixture
+def indexer(tester_w3, tmp_path):
+    contract = tester_w3.eth.contract(address='0x' + '33' * 20, abi=RPS_EVENTS_ABI)
+    indexer = RPSIndexer(contract, str(tmp_path / 'rps.sqlite'), chunk_size=2)
+    yield indexer
+    indexer.close()
+
+
+def test_apply_follows_a_game(indexer):
+    big_id = 2 ** 256 - 1
+    indexer.apply('Deposit', {'player': ALICE, 'amount': 10}, 1)
+    indexer.apply('Deposit', {'player': BOB, 'amount': 10}, 1)
+    indexer.apply('MoveCommitted', {'gameID': big_id, 'player': ALICE, 'betAmount': 4}, 2)
+    assert indexer.game(big_id).state == GameState.MOVE1
+    indexer.apply('MoveCommitted', {'gameID': big_id, 'player': BOB, 'betAmount': 4}, 3)
+    assert (indexer.balance(ALICE), indexer.balance(BOB)) == (6, 6)
+
+    indexer.apply('MoveRevealed', {'gameID': big_id, 'player': BOB, 'move': Move.PAPER}, 5)
+    indexer.apply('MoveRevealed', {'gameID': big_id, 'player': ALICE, 'move': Move.ROCK}, 6)
+    game = indexer.game(big_id)
+    assert (game.state, game.move1, game.move2, game.reveal_block) == (GameState.REVEAL1, Move.ROCK, Move.PAPER, 5)
+    indexer.apply('GameEnded', {'gameID': big_id, 'winner': BOB, 'payout': 8}, 6)
+    assert indexer.game(big_id).state == GameState.NO_GAME
+    assert (indexer.balance(ALICE), indexer.balance(BOB)) == (6, 14)
+    indexer.apply('Withdrawal', {'player': BOB, 'amount': 14}, 7)
+    assert indexer.balance(BOB) == 0
+
+
+def test_apply_tie_cancel_and_reuse(indexer):
+    indexer.apply('Deposit', {'player': ALICE, 'amount': 5}, 1)
+    indexer.apply('MoveCommitted', {'gameID': 1, 'player': ALICE, 'betAmount': 5}, 2)
+    indexer.apply('GameCanceled', {'gameID': 1, 'player': ALICE}, 3)
+    assert indexer.balance(ALICE) == 5
+    assert indexer.games_in_state(GameState.MOVE1) == []
+
+    indexer.apply('Deposit', {'player': BOB, 'amount': 5}, 4)
+    indexer.apply('MoveCommitted', {'gameID': 1, 'player': BOB, 'betAmount': 3}, 4)
+    indexer.apply('MoveCommitted', {'gameID': 1, 'player': ALICE, 'betAmount': 3}, 4)
+    assert indexer.game(1).player1 == BOB
+    indexer.apply('GameEnded', {'gameID': 1, 'winner': NOBODY, 'payout': 3}, 5)
+    assert (indexer.balance(ALICE), indexer.balance(BOB)) == (5, 5)
+
+
+def test_sync_checkpoints_in_chunks(indexer, tester_w3):
+    tester_w3.provider.make_request('evm_mine', [5])
+    head = tester_w3.eth.block_number
+    assert indexer.sync() == head
+    assert indexer.next_block == head + 1
+    # a new indexer on the same store resumes from the checkpoint
+    resumed = RPSIndexer(indexer.contract, indexer.db.execute('PRAGMA database_list').fetchone()[2])
+    assert resumed.next_block == head + 1
+    assert resumed.sync() == head
+    resumed.close()
@@ -0,0 +1,79 @@
+import pytest
+
+from ex4lib.rps_model import RPSModel, Revert, commitment_of, explore
+from ex4lib.rps_types import GameState, Move
+
+KEY1, KEY2 = b'\x01' * 32, b'\x02' * 32
+
+
+def committed_game(move1, move2, bet_amount=5):
+    model = RPSModel(3, 3, 2)
+    model.deposit(0, 10)
+    model.deposit(1, 10)
+    model.make_move(0, 1, bet_amount, commitment_of(move1, KEY1))
+    model.make_move(1, 1, 999, commitment_of(move2, KEY2))  # the second bet amount is ignored
+    return model
+
+
+def test_game_outcomes():
+    model = committed_game(Move.ROCK, Move.SCISSORS)
+    model.reveal_move(1, 1, Move.SCISSORS, KEY2)
+    assert model.get_game_state(1) == GameState.REVEAL1
+    model.reveal_move(0, 1, Move.ROCK, KEY1)
+    assert model.get_game_state(1) == GameState.NO_GAME
+    assert model.balances[:2] == [15, 5]
+
+    model = committed_game(Move.PAPER, Move.PAPER)
+    model.reveal_move(0, 1, Move.PAPER, KEY1)
+    model.reveal_move(1, 1, Move.PAPER, KEY2)
+    assert model.balances[:2] == [10, 10]
+
+
+def test_reverts_leave_the_model_unchanged():
+    model = committed_game(Move.ROCK, Move.PAPER)
+    with pytest.raises(Revert, match="Invalid commitment"):
+        model.reveal_move(0, 1, Move.PAPER, KEY1)
+    with pytest.raises(Revert, match="Only players in this game can reveal"):
+        model.reveal_move(2, 1, Move.ROCK, KEY1)
+    with pytest.raises(Revert, match="Invalid game state"):
+        model.make_move(2, 1, 0, b'')
+    assert model.get_game_state(1) == GameState.MOVE2
+    assert model.balances == [5, 5, 0]
+
+
+def test_reveal_phase_ends_after_reveal_period():
+    model = committed_game(Move.ROCK, Move.PAPER)
+    model.reveal_move(0, 1, Move.ROCK, KEY1)
+    reveal_block = model.block_number
+    model.mine(0, 1)
+    with pytest.raises(Revert, match="Reveal period is not over"):
+        model.reveal_phase_ended(0, 1)
+    model.mine(0, 1)
+    with pytest.raises(Revert, match="first revealer"):
+        model.reveal_phase_ended(1, 1)
+    assert model.block_number + 1 == reveal_block + 3
+    model.reveal_phase_ended(0, 1)
+    assert model.balances[:2] == [15, 5]
+
+
+def test_random_sequences_conserve_money():
+    def check(model, total):
+        assert sum(model.balances) + model.locked() == total
+        assert all(balance >= 0 for balance in model.balances)
+
+    for seed in range(5):
+        explore(seed, 5000, check=check)
+
+
+def test_deposit_and_withdraw_with_moves():
+    model = RPSModel(3, 2, 2)
+    with pytest.raises(Revert, match="Not enough balance"):
+        model.deposit_and_make_move(0, 1, 10, commitment_of(Move.ROCK, KEY1), 5)
+    assert model.balances == [0, 0] and model.deposited == 0
+    model.deposit_and_make_move(0, 1, 5, commitment_of(Move.ROCK, KEY1), 8)
+    model.deposit_and_make_move(1, 1, 0, commitment_of(Move.PAPER, KEY2), 5)
+    model.reveal_move_and_withdraw(0, 1, Move.ROCK, KEY1)
+    model.reveal_move_and_withdraw(1, 1, Move.PAPER, KEY2)
+    # only the payout is withdrawn; player 0's unused deposit stays
+    assert model.balances == [3, 0]
+    assert (model.deposited, model.withdrawn) == (13, 10)
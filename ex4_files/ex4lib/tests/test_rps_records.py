@@ -0,0 +1,52 @@
+import sys
+
+from eth_abi import encode
+
+from ex4lib.rps_records import RECORD_SIZE, ZERO_ADDRESS, Game, GameTable
+from ex4lib.rps_types import GameState, Move
+
+PLAYER1 = '0x5B38Da6a701c568545dCfcB03FcB875f56beddC4'
+PLAYER2 = '0xAb8483F64d9C6d1EcF9b849Ae677dD3315835cb2'
+
+
+def sample_game(**fields):
+    game = Game(PLAYER1, 2 ** 96 - 1, PLAYER2, Move.ROCK, Move.SCISSORS, GameState.REVEAL1, 2 ** 64 - 1,
+                b'\x11' * 32, b'\x22' * 32)
+    for name, value in fields.items():
+        setattr(game, name, value)
+    return game
+
+
+def test_storage_layout_round_trip():
+    game = sample_game()
+    raw = game.to_storage()
+    assert len(raw) == RECORD_SIZE
+    # slot 1, from the low-order end: player2, move1, move2, state, revealBlock
+    assert raw[32:64].hex() == '00' + 'ff' * 8 + '030301' + PLAYER2[2:].lower()
+    assert Game.from_storage(raw) == game
+    assert Game.from_storage(bytes(RECORD_SIZE)) == Game()
+
+
+def test_decoding_call_results():
+    game = sample_game(move2=Move.NONE)
+    data = encode(['address', 'uint96', 'address', 'uint8', 'uint8', 'uint8', 'uint64', 'bytes32', 'bytes32'],
+                  list(game.astuple()))
+    assert Game.from_return_data(data) == game
+    assert Game.from_call(list(game.astuple())) == game
+    assert Game.from_call(list(game.astuple())).state is GameState.REVEAL1
+
+
+def test_table_holds_packed_records():
+    table = GameTable()
+    table.put(2 ** 255, sample_game())
+    table.put(7, Game(PLAYER1, 5, state=GameState.MOVE1))
+    table.put_storage(9, bytes(RECORD_SIZE))
+    table.put(7, Game(PLAYER1, 5, PLAYER2, state=GameState.MOVE2))
+
+    assert len(table) == 3 and table.nbytes() == 3 * RECORD_SIZE
+    assert table[2 ** 255] == sample_game()
+    assert table[7].player2 == PLAYER2 and table.state(7) == GameState.MOVE2 and table.bet_amount(7) == 5
+    assert table[9].player1 == ZERO_ADDRESS and table.get(10) is None
+    assert list(table.in_state(GameState.REVEAL1)) == [(2 ** 255, 2 ** 64 - 1)]
+    assert not hasattr(sample_game(), '__dict__')
+    assert sys.getsizeof(sample_game()) < sys.getsizeof(sample_game().astuple()) + 16
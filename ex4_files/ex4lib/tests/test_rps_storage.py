@@ -0,0 +1,35 @@
+from web3 import Web3
+
+from ex4lib.rps_records import Game
+from ex4lib.rps_storage import StorageReader, balance_slot, game_slot
+from ex4lib.rps_types import GameState, Move
+
+
+def test_slots_follow_the_solidity_mapping_layout():
+    assert game_slot(7) == int.from_bytes(Web3.solidity_keccak(['uint256', 'uint256'], [7, 0]), 'big')
+    player = '0x5B38Da6a701c568545dCfcB03FcB875f56beddC4'
+    assert balance_slot(player) == int.from_bytes(Web3.solidity_keccak(['uint256', 'uint256'], [int(player, 16), 1]),
+                                                  'big')
+
+
+def deploy_storage(w3, words):
+    # init code that only SSTOREs the given {slot: word} and deploys no code
+    init = ''.join('7f' + word.hex() + '7f' + slot.to_bytes(32, 'big').hex() + '55' for slot, word in words.items())
+    tx_hash = w3.eth.send_transaction({'from': w3.eth.accounts[0], 'data': '0x' + init + '00'})
+    return w3.eth.get_transaction_receipt(tx_hash)['contractAddress']
+
+
+def test_reads_games_and_balances_at_a_block(tester_w3):
+    player1, player2 = tester_w3.eth.accounts[1:3]
+    game = Game(player1, 10 ** 18, player2, Move.PAPER, Move.NONE, GameState.REVEAL1, 42, b'\x01' * 32, b'\x02' * 32)
+    raw = game.to_storage()
+    words = {game_slot(2 ** 200) + i: raw[32 * i:32 * (i + 1)] for i in range(4)}
+    words[balance_slot(player2)] = (123).to_bytes(32, 'big')
+    address = deploy_storage(tester_w3, words)
+
+    reader = StorageReader(tester_w3, address, tester_w3.eth.block_number, batch_size=3)
+    table = reader.read_games([2 ** 200, 5])
+    assert table[2 ** 200] == game
+    assert table[5] == Game()
+    assert reader.balances([player1, player2]) == {player1: 0, player2: 123}
+    assert StorageReader(tester_w3, address, tester_w3.eth.block_number - 1).game(2 ** 200) == Game()
@@ -0,0 +1,58 @@
+import hashlib
+import json
+
+import pytest
+
+from ex4lib import solc_binary
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    lockfile = tmp_path / 'solc.lock'
+    lockfile.write_text(json.dumps({'version': '0.8.19'}))
+    monkeypatch.setattr(solc_binary, 'LOCKFILE', lockfile)
+    monkeypatch.setenv('SOLC_STORE', str(tmp_path / 'store'))
+    monkeypatch.setenv('SOLCX_BINARY_PATH', str(tmp_path / 'solcx'))
+    monkeypatch.delenv('SOLC_BINARY', raising=False)
+    (tmp_path / 'store').mkdir()
+    solc_binary.resolve_solc.cache_clear()
+    yield tmp_path
+    solc_binary.resolve_solc.cache_clear()
+
+
+def test_locked_version(store):
+    assert solc_binary.locked_version() == '0.8.19'
+
+
+def test_resolve_from_store(store):
+    binary = store / 'store' / 'solc-v0.8.19'
+    binary.write_bytes(b'solc')
+    assert solc_binary.resolve_solc() == binary
+    assert solc_binary.resolve_solc('v0.8.19') == binary
+
+
+def test_env_binary_wins(store, monkeypatch):
+    (store / 'store' / 'solc-v0.8.19').write_bytes(b'solc')
+    override = store / 'my-solc'
+    override.write_bytes(b'solc')
+    monkeypatch.setenv('SOLC_BINARY', str(override))
+    assert solc_binary.resolve_solc() == override
+
+
+def test_missing_binary_fails_fast(store):
+    with pytest.raises(solc_binary.SolcNotFoundError, match='solc 0.8.19 not found'):
+        solc_binary.resolve_solc()
+
+
+def test_sha256_is_checked(store):
+    binary = store / 'store' / 'solc-v0.8.19'
+    binary.write_bytes(b'solc')
+    lock = {'version': '0.8.19', 'sha256': hashlib.sha256(b'other').hexdigest()}
+    solc_binary.LOCKFILE.write_text(json.dumps(lock))
+    with pytest.raises(solc_binary.SolcNotFoundError, match='does not match'):
+        solc_binary.resolve_solc()
+
+    solc_binary.resolve_solc.cache_clear()
+    lock['sha256'] = hashlib.sha256(b'solc').hexdigest()
+    solc_binary.LOCKFILE.write_text(json.dumps(lock))
+    assert solc_binary.resolve_solc() == binary
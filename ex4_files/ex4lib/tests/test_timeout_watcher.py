@@ -0,0 +1,50 @@
+from ex4lib.timeout_watcher import TimeoutWatcher
+
+
+class NoContract:
+    w3 = None
+    abi: list = []
+
+
+class RangeCappedNode:
+    # eth.get_logs refuses ranges of more than 3 blocks and records the ranges it served
+    def __init__(self):
+        self.eth = self
+        self.ranges = []
+
+    def get_logs(self, params):
+        if params['toBlock'] - params['fromBlock'] >= 3:
+            raise ValueError('block range too large')
+        self.ranges.append((params['fromBlock'], params['toBlock']))
+        return []
+
+
+def test_deadlines_come_due_in_order_and_closed_games_are_skipped():
+    watcher = TimeoutWatcher(NoContract(), ['0xMe'], reveal_period_length=4)
+    watcher.observe('MoveRevealed', {'gameID': 1, 'player': '0xMe'}, 10)
+    watcher.observe('MoveRevealed', {'gameID': 2, 'player': '0xMe'}, 8)
+    watcher.observe('MoveRevealed', {'gameID': 3, 'player': '0xOther'}, 8)  # not ours to claim
+    watcher.observe('MoveRevealed', {'gameID': 4, 'player': '0xMe'}, 9)
+    watcher.observe('MoveRevealed', {'gameID': 4, 'player': '0xOther'}, 11)  # revealed in time: game over
+
+    assert watcher.due(11) == []
+    assert watcher.due(12) == [(2, '0xMe')]
+    watcher.observe('GameEnded', {'gameID': 1}, 13)
+    assert watcher.due(100) == []
+
+    # a reused id gets a new deadline; the stale one of its previous game is ignored
+    watcher.observe('MoveRevealed', {'gameID': 2, 'player': '0xMe'}, 20)
+    watcher.observe('GameEnded', {'gameID': 2}, 21)
+    watcher.observe('MoveRevealed', {'gameID': 2, 'player': '0xMe'}, 22)
+    assert watcher.due(25) == []
+    assert watcher.due(26) == [(2, '0xMe')]
+
+
+
+def test_events_are_read_in_chunks_that_shrink_until_the_node_accepts_them():
+    contract = NoContract()
+    contract.w3, contract.address = RangeCappedNode(), '0xRPS'
+    watcher = TimeoutWatcher(contract, ['0xMe'], reveal_period_length=4, chunk_size=8)
+    watcher._read_events(10)
+    assert contract.w3.ranges == [(0, 1), (2, 3), (4, 5), (6, 7), (8, 9), (10, 10)]
+    assert watcher.next_block == 11
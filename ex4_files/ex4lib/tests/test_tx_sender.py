@@ -0,0 +1,57 @@
+import pytest
+
+from ex4lib.tx_sender import TxSender, dev_accounts
+
+from evm_helpers import STORE_INIT, echo_abi, store_abi
+
+
+def test_burst_from_one_account_is_one_rpc_per_transaction(tester_w3, echo_address, monkeypatch):
+    echo = tester_w3.eth.contract(address=echo_address, abi=echo_abi('uint256'))
+    accounts = dev_accounts(tester_w3, 2)
+    assert [account.address for account in accounts] == tester_w3.eth.accounts[:2]
+    sender = TxSender(tester_w3, accounts)
+    first_nonce = tester_w3.eth.get_transaction_count(accounts[0].address)
+
+    tx_hashes = [sender.transact(echo.functions.echo(i), accounts[0].address) for i in range(5)]
+    for tx_hash in tx_hashes:
+        assert tester_w3.eth.wait_for_transaction_receipt(tx_hash).status == 1
+    assert [tester_w3.eth.get_transaction(tx_hash).nonce for tx_hash in tx_hashes] == \
+        list(range(first_nonce, first_nonce + 5))
+    assert len(sender._gas) == 1
+
+    # later sends only push the raw transaction
+    calls = []
+    request_blocking = tester_w3.manager.request_blocking
+    monkeypatch.setattr(tester_w3.manager, 'request_blocking',
+                        lambda method, *args, **kwargs: calls.append(method) or request_blocking(method, *args, **kwargs))
+    sender.transact(echo.functions.echo(9), accounts[0].address)
+    assert calls == ['eth_sendRawTransaction']
+
+
+def test_rejected_transaction_does_not_leave_a_nonce_gap(tester_w3):
+    account = dev_accounts(tester_w3, 1)[0]
+    receiver = tester_w3.eth.accounts[1]
+    sender = TxSender(tester_w3, [account])
+    with pytest.raises(Exception):
+        sender.send({'from': account.address, 'to': receiver, 'value': 10 ** 40, 'gas': 21000})
+    tx_hash = sender.send({'from': account.address, 'to': receiver, 'value': 1, 'gas': 21000})
+    assert tester_w3.eth.wait_for_transaction_receipt(tx_hash).status == 1
+
+
+def test_call_that_outgrows_the_cached_gas_limit_is_retried(tester_w3):
+    account = dev_accounts(tester_w3, 1)[0]
+    tx_hash = tester_w3.eth.send_transaction({'from': account.address, 'data': '0x' + STORE_INIT})
+    store = tester_w3.eth.contract(address=tester_w3.eth.get_transaction_receipt(tx_hash)['contractAddress'],
+                                   abi=store_abi())
+    sender = TxSender(tester_w3, [account])
+    assert sender.wait(sender.transact(store.functions.store(0), account.address)).status == 1
+    [cached] = sender._gas.values()
+
+    # a fresh nonzero slot costs far more than the cached estimate for store(0): the first attempt runs out of gas
+    tx_hash = sender.transact(store.functions.store(5), account.address)
+    assert tester_w3.eth.wait_for_transaction_receipt(tx_hash).status == 0
+    receipt = sender.wait(tx_hash)
+    assert receipt.status == 1 and receipt.transactionHash != tx_hash
+    assert tester_w3.eth.get_storage_at(store.address, 5) == (5).to_bytes(32, 'big')
+    [retried] = sender._gas.values()
+    assert retried > cached
@@ -0,0 +1,157 @@
+import heapq
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from eth_utils import event_abi_to_log_topic
+from hexbytes import HexBytes
+from web3.contract import Contract
+from web3.exceptions import ContractLogicError, Web3Exception
+
+from ex4lib.rps_client import get_games
+from ex4lib.rps_indexer import DEFAULT_CHUNK_SIZE
+from ex4lib.rps_types import GameState
+from ex4lib.tx_sender import TxSender
+
+# Claims RPS games whose opponent did not reveal in time. revealPhaseEnded(gameID) succeeds from block
+# revealBlock + revealPeriodLength on, and only for the player who revealed first; the watcher follows the
+# MoveRevealed / GameEnded / GameCanceled events, keeps the deadlines of our accounts' games in a min-heap, and on
+# every new block sends the claims that the next block can include - no polling of game states, no early attempts
+# that revert. Games already in the reveal phase at start_block are found once, on the first poll: the ids of the
+# MoveRevealed logs before it, checked with one getGameStates per page (see seed()). Logs are read in block-range
+# chunks like RPSIndexer does, halving the chunk when the node refuses a range.
+#
+#   watcher = TimeoutWatcher(contract, [player1, player2])
+#   watcher.run(should_stop=lambda: False)
+
+logger = logging.getLogger(__name__)
+
+WATCHED_EVENTS = ('MoveRevealed', 'GameEnded', 'GameCanceled')
+
+
+class TimeoutWatcher:
+    def __init__(self, contract: Contract, accounts: Iterable[str], start_block: int = 0,
+                 sender: Optional[TxSender] = None, reveal_period_length: Optional[int] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        # accounts: the players we claim for. sender: send the claims signed locally instead of with transact().
+        # reveal_period_length: read from the contract unless given.
+        self.contract = contract
+        self.w3 = contract.w3
+        self.accounts = set(accounts)
+        self.sender = sender
+        if reveal_period_length is None:
+            reveal_period_length = contract.functions.revealPeriodLength().call()
+        self.reveal_period_length = reveal_period_length
+        self.next_block = start_block
+        self.chunk_size = chunk_size
+        self._seeded = False
+        # game id -> (first revealer, reveal block) for every game in the reveal phase
+        self.open_games: Dict[int, Tuple[str, int]] = {}
+        # (deadline, game id, reveal block); entries of games that ended since are skipped when they come up
+        self._deadlines: List[Tuple[int, int, int]] = []
+        self._events = {event_abi_to_log_topic(abi): contract.events[abi['name']]()
+                        for abi in contract.abi if abi['type'] == 'event' and abi['name'] in WATCHED_EVENTS}
+
+    def observe(self, event_name: str, args: Dict[str, Any], block_number: int) -> None:
+        game_id = args['gameID']
+        if event_name == 'MoveRevealed':
+            if game_id in self.open_games:
+                # the second reveal ends the game
+                del self.open_games[game_id]
+            else:
+                self.open_games[game_id] = (args['player'], block_number)
+                # if the opponent revealed first there is nothing for us to claim, only the game to follow
+                if args['player'] in self.accounts:
+                    heapq.heappush(self._deadlines, (block_number + self.reveal_period_length, game_id, block_number))
+        else:
+            self.open_games.pop(game_id, None)
+
+    def due(self, block_number: int) -> List[Tuple[int, str]]:
+        # Pops the (game id, first revealer) of every open game that can be claimed in block block_number.
+        claims = []
+        while self._deadlines and self._deadlines[0][0] <= block_number:
+            _, game_id, reveal_block = heapq.heappop(self._deadlines)
+            revealer, open_reveal_block = self.open_games.get(game_id, (None, None))
+            if open_reveal_block == reveal_block and revealer in self.accounts:
+                claims.append((game_id, revealer))
+        return claims
+
+    def seed(self, from_block: int = 0) -> None:
+        # Adds the games that were in the reveal phase at block start_block - 1. Candidates are the games with a
+        # MoveRevealed log in [from_block, start_block); their state at that block says which are still open, and
+        # their reveal block which of the logs was the first reveal.
+        self._seeded = True
+        if self.next_block <= from_block:
+            return
+        to_block = self.next_block - 1
+        topic = HexBytes(event_abi_to_log_topic(self.contract.events.MoveRevealed.abi)).to_0x_hex()
+        revealers: Dict[Tuple[int, int], str] = {}
+        for _, logs in self._get_logs(from_block, to_block, [topic]):
+            for log in logs:
+                args = self.contract.events.MoveRevealed().process_log(log)['args']
+                # keyed by block as well: a reused id also has the reveals of its earlier games
+                revealers[(args['gameID'], log['blockNumber'])] = args['player']
+        game_ids = sorted({game_id for game_id, _ in revealers})
+        for game in get_games(self.contract, game_ids, block_identifier=to_block):
+            if game.state == GameState.REVEAL1 and game.game_id not in self.open_games:
+                player = revealers.get((game.game_id, game.reveal_block))
+                if player is not None:
+                    self.observe('MoveRevealed', {'gameID': game.game_id, 'player': player}, game.reveal_block)
+
+    def _read_events(self, to_block: int) -> None:
+        topics = [HexBytes(topic).to_0x_hex() for topic in self._events]
+        for end, logs in self._get_logs(self.next_block, to_block, [topics]):
+            for log in logs:
+                decoded = self._events[bytes(log['topics'][0])].process_log(log)
+                self.observe(decoded['event'], decoded['args'], log['blockNumber'])
+            self.next_block = end + 1
+
+    def _get_logs(self, from_block: int, to_block: int, topics: list) -> Iterator[Tuple[int, list]]:
+        # (last block, logs) of each chunk of [from_block, to_block], in order
+        while from_block <= to_block:
+            end = min(from_block + self.chunk_size - 1, to_block)
+            try:
+                logs = self.w3.eth.get_logs({'address': self.contract.address, 'fromBlock': from_block,
+                                             'toBlock': end, 'topics': topics})
+            except (ValueError, Web3Exception):
+                # nodes cap the range / number of results of eth_getLogs: retry with smaller chunks
+                if self.chunk_size == 1:
+                    raise
+                self.chunk_size = max(1, self.chunk_size // 2)
+                continue
+            yield end, logs
+            from_block = end + 1
+
+    def claim(self, game_id: int, player: str) -> Optional[Any]:
+        function = self.contract.functions.revealPhaseEnded(game_id)
+        try:
+            if self.sender is not None:
+                return self.sender.transact(function, player)
+            return function.transact({'from': player})
+        except ContractLogicError as e:
+            # the opponent revealed in the meantime, or the game was claimed already
+            logger.info('claim of game %d failed: %s', game_id, e)
+            return None
+
+    def poll(self) -> List[Any]:
+        # Catches up with the chain and sends every claim the next block can include; returns their tx hashes.
+        if not self._seeded:
+            self.seed()
+        head = self.w3.eth.block_number
+        if head < self.next_block:
+            return []
+        self._read_events(head)
+        tx_hashes = []
+        for game_id, player in self.due(head + 1):
+            tx_hash = self.claim(game_id, player)
+            if tx_hash is not None:
+                # claimed: the GameEnded event will close the game, until then do not claim it again
+                del self.open_games[game_id]
+                tx_hashes.append(tx_hash)
+        return tx_hashes
+
+    def run(self, poll_interval: float = 0.5, should_stop: Callable[[], bool] = lambda: False) -> None:
+        # polls once per block (eth_blockNumber, and eth_getLogs only when a block arrived) until should_stop()
+        while not should_stop():
+            self.poll()
+            time.sleep(poll_interval)
@@ -0,0 +1,128 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from eth_account import Account
+from eth_account.signers.local import LocalAccount
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.contract.contract import ContractConstructor, ContractFunction
+from web3.types import TxParams, TxReceipt
+
+from ex4lib.nonces import NonceTracker
+
+# Sends transactions signed here with local keys (eth_sendRawTransaction) instead of transact() on unlocked node
+# accounts. Nonces are tracked locally (NonceTracker), fees are read once and reused until refresh_fees(), and the
+# gas limit of a contract call is estimated once per (contract, function selector) and reused with a margin, so a
+# write is normally a single RPC and one account can send bursts of transactions back to back.
+#
+# The cost of a call depends on the path it takes (the second makeMove of a game, the reveal that ends it), which
+# the cached estimate of an earlier call may not cover. wait() sends a transaction that ran out of its cached gas
+# limit again, once, with a fresh estimate; the cache then keeps the larger estimate.
+#
+#   sender = TxSender(w3, dev_accounts(w3))
+#   receipt = sender.wait(sender.transact(contract.functions.makeMove(1, bet, commitment), player1))
+
+# the accounts of `npx hardhat node` are derived from this mnemonic
+HARDHAT_MNEMONIC = 'test test test test test test test test test test test junk'
+DEFAULT_GAS_MARGIN = 1.25
+
+
+def dev_accounts(w3: Web3, count: int = 10) -> List[LocalAccount]:
+    # The local keys of the node's pre-funded accounts (eth-tester's, or Hardhat's default mnemonic).
+    tester = getattr(w3.provider, 'ethereum_tester', None)
+    if tester is not None:
+        return [Account.from_key(key.to_bytes()) for key in tester.backend.account_keys[:count]]
+    Account.enable_unaudited_hdwallet_features()
+    return [Account.from_mnemonic(HARDHAT_MNEMONIC, account_path=f"m/44'/60'/0'/0/{i}") for i in range(count)]
+
+
+class TxSender:
+    def __init__(self, w3: Web3, accounts: Iterable[LocalAccount], nonces: Optional[NonceTracker] = None,
+                 gas_margin: float = DEFAULT_GAS_MARGIN):
+        # gas_margin: cached estimates are made for the arguments of the first call, so later calls (cold storage,
+        # other branches) get this much headroom; wait() retries the ones that need more.
+        self.w3 = w3
+        self.accounts: Dict[str, LocalAccount] = {account.address: account for account in accounts}
+        self.nonces = nonces or NonceTracker()
+        self.gas_margin = gas_margin
+        self._gas: Dict[Tuple[Optional[str], bytes], int] = {}
+        # transactions sent with a cached gas limit and not waited for yet: {tx hash: tx as given to send()}
+        self._cached_gas_sends: Dict[HexBytes, TxParams] = {}
+        self._fees: Optional[Dict[str, int]] = None
+        self._chain_id: Optional[int] = None
+
+    def refresh_fees(self) -> Dict[str, int]:
+        # EIP-1559 fees good for the next blocks even if the base fee doubles
+        base_fee = self.w3.eth.get_block('latest')['baseFeePerGas']
+        priority_fee = self.w3.eth.max_priority_fee
+        self._fees = {'maxFeePerGas': 2 * base_fee + priority_fee, 'maxPriorityFeePerGas': priority_fee}
+        return self._fees
+
+    def resync(self, sender: str) -> None:
+        # sets the next nonce of sender to the node's pending count (after a dropped or rejected transaction)
+        self.nonces.reset(sender, self.w3.eth.get_transaction_count(sender, 'pending'))
+
+    def forget_gas(self) -> None:
+        self._gas.clear()
+
+    @staticmethod
+    def _gas_key(tx: TxParams) -> Tuple[Optional[str], bytes]:
+        return tx['to'], bytes(HexBytes(tx.get('data', b''))[:4])
+
+    def _estimate(self, tx: TxParams) -> int:
+        return int(self.w3.eth.estimate_gas(tx) * self.gas_margin)
+
+    def _gas_limit(self, tx: TxParams) -> int:
+        if 'to' not in tx:
+            # deployments are one-off: no point caching them
+            return self._estimate(tx)
+        key = self._gas_key(tx)
+        if key not in self._gas:
+            self._gas[key] = self._estimate(tx)
+        return self._gas[key]
+
+    def send(self, tx: TxParams) -> HexBytes:
+        # Signs and sends tx (which needs 'from'); nonce, gas, fees and chain id are filled in unless given.
+        given = tx
+        sender = tx['from']
+        account = self.accounts[sender]
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        tx = {'chainId': self._chain_id, 'value': 0, **(self._fees or self.refresh_fees()), **tx}
+        cached_gas = 'gas' not in tx and 'to' in tx
+        if 'gas' not in tx:
+            tx['gas'] = self._gas_limit(tx)
+        if not self.nonces.is_seeded(sender):
+            self.nonces.seed(sender, self.w3.eth.get_transaction_count(sender, 'pending'))
+        nonce = tx['nonce'] = self.nonces.take(sender)
+        del tx['from']
+        signed = account.sign_transaction(tx)
+        try:
+            tx_hash = self.w3.eth.send_raw_transaction(signed.raw_transaction)
+        except Exception:
+            # the nonce we took was not used: without this every later transaction would be stuck behind the gap
+            self.nonces.release(sender, nonce)
+            raise
+        if cached_gas:
+            self._cached_gas_sends[HexBytes(tx_hash)] = given
+        return tx_hash
+
+    def wait(self, tx_hash: HexBytes, timeout: float = 120) -> TxReceipt:
+        # The receipt of tx_hash. If it was sent with a cached gas limit and ran out of gas (it failed having used
+        # all of it), it is estimated again and sent once more, and the receipt of that transaction is returned.
+        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout)
+        tx = self._cached_gas_sends.pop(HexBytes(tx_hash), None)
+        if tx is None or receipt['status'] == 1 or receipt['gasUsed'] < self.w3.eth.get_transaction(tx_hash)['gas']:
+            return receipt
+        key = self._gas_key(tx)
+        gas = self._estimate(tx)
+        self._gas[key] = max(gas, self._gas.get(key, 0))
+        return self.w3.eth.wait_for_transaction_receipt(self.send({**tx, 'gas': gas}), timeout)
+
+    def transact(self, function: ContractFunction, sender: str, **tx: Any) -> HexBytes:
+        # like function.transact({'from': sender, **tx}), but signed locally
+        data = self.w3.eth.contract(abi=function.contract_abi).encode_abi(
+            function.abi_element_identifier, args=function.args, kwargs=function.kwargs)
+        return self.send({'from': sender, 'to': function.address, 'data': data, **tx})
+
+    def deploy(self, constructor: ContractConstructor, sender: str, **tx: Any) -> HexBytes:
+        return self.send({'from': sender, 'data': constructor.data_in_transaction, **tx})
@@ -1,14 +1,15 @@
+import os
 import unittest
 
-from solcx import compile_files, install_solc
-from web3 import Web3
-import solcx
 from web3.exceptions import ContractLogicError
 
-SOLC_VERSION = '0.8.19'
+from ex4lib.compiler import compile_contract
+from ex4lib.providers import make_web3
+from ex4lib.receipts import ReceiptWaiter
+from ex4lib.solc_binary import locked_version
 
-# Ensure you have the appropriate Solidity compiler version installed
-install_solc(SOLC_VERSION)
+# The compiler version is pinned in solc.lock and resolved offline (see ex4lib/solc_binary.py)
+SOLC_VERSION = locked_version()
 
 
 # Helper function to get balance in ether
@@ -16,39 +17,36 @@ def get_balance(address):
     return w3.from_wei(w3.eth.get_balance(address), 'ether')
 
 
-# Compile Solidity source code
-def compile(file_name: str):
-    solcx.set_solc_version(SOLC_VERSION)
-    compiled_sol = compile_files([file_name], output_values=['abi', 'bin'])
-    contract_id, contract_interface = compiled_sol.popitem()
-    if compiled_sol:
-        contract_id, contract_interface = compiled_sol.popitem()
+# Compile Solidity source code (cached, so solc only runs when a contract changes)
+def compile(file_name: str, contract_name: str):
+    contract_interface = compile_contract(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name), SOLC_VERSION, contract_name)
     return contract_interface['bin'], contract_interface['abi']
 
 
 # Compile the contracts
-wallet_bytecode, wallet_abi = compile(
-    r'..\VulnerableWallet.sol')
-attack_bytecode, attack_abi = compile(
-    r'..\WalletAttack.sol')
+wallet_bytecode, wallet_abi = compile('VulnerableWallet.sol', 'Wallet')
+attack_bytecode, attack_abi = compile('WalletAttack.sol', 'WalletAttack')
 
-# Web3 connection
-w3 = Web3(Web3.HTTPProvider("http://127.0.0.1:8545"))
+# Web3 connection (Hardhat node or in-process EVM, see --backend)
+w3 = make_web3()
 accounts = w3.eth.accounts
+# follows new blocks instead of polling each transaction hash on its own
+receipts = ReceiptWaiter(w3)
 
 
 def test_wallet_attack():
     # Deploy VulnerableWallet contract
     vulnerable_wallet_interface = w3.eth.contract(abi=wallet_abi, bytecode=wallet_bytecode)
     vulnerable_tx_hash = vulnerable_wallet_interface.constructor().transact({'from': w3.eth.accounts[0]})
-    vulnerable_tx_receipt = w3.eth.wait_for_transaction_receipt(vulnerable_tx_hash)
+    vulnerable_tx_receipt = receipts.wait_one(vulnerable_tx_hash)
     vulnerable_wallet_address = vulnerable_tx_receipt.contractAddress
     vul_wallet_instance = w3.eth.contract(address=vulnerable_wallet_address, abi=wallet_abi)
 
     # Deploy WalletAttack contract
     wallet_attack_interface = w3.eth.contract(abi=attack_abi, bytecode=attack_bytecode)
     wallet_attack_tx_hash = wallet_attack_interface.constructor().transact({'from': w3.eth.accounts[0]})
-    wallet_attack_tx_receipt = w3.eth.wait_for_transaction_receipt(wallet_attack_tx_hash)
+    wallet_attack_tx_receipt = receipts.wait_one(wallet_attack_tx_hash)
     wallet_attack_address = wallet_attack_tx_receipt.contractAddress
 
     # Call exploit function in WalletAttack contract
@@ -57,7 +55,7 @@ def test_wallet_attack():
     # Deposit 3 Ether to VulnerableWallet
     tx_hash = vul_wallet_instance.functions.deposit().transact(
         {'from': w3.eth.accounts[0], 'value': w3.to_wei(3, 'ether')})
-    tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    tx_receipt = receipts.wait_one(tx_hash)
     assert (get_balance(vulnerable_wallet_address) == 3)
     balance_0 = get_balance(vulnerable_wallet_address)
 
@@ -77,14 +75,14 @@ class TestWalletAttack(unittest.TestCase):
         # Deploy VulnerableWallet contract
         vulnerable_wallet_interface = w3.eth.contract(abi=wallet_abi, bytecode=wallet_bytecode)
         vulnerable_tx_hash = vulnerable_wallet_interface.constructor().transact({'from': accounts[1]})
-        vulnerable_tx_receipt = w3.eth.wait_for_transaction_receipt(vulnerable_tx_hash)
+        vulnerable_tx_receipt = receipts.wait_one(vulnerable_tx_hash)
         vulnerable_wallet_address = vulnerable_tx_receipt.contractAddress
         vul_wallet_instance = w3.eth.contract(address=vulnerable_wallet_address, abi=wallet_abi)
 
         # Deploy WalletAttack contract
         wallet_attack_interface = w3.eth.contract(abi=attack_abi, bytecode=attack_bytecode)
         wallet_attack_tx_hash = wallet_attack_interface.constructor().transact({'from': accounts[2]})
-        wallet_attack_tx_receipt = w3.eth.wait_for_transaction_receipt(wallet_attack_tx_hash)
+        wallet_attack_tx_receipt = receipts.wait_one(wallet_attack_tx_hash)
         wallet_attack_address = wallet_attack_tx_receipt.contractAddress
         wallet_attack_instance = w3.eth.contract(address=wallet_attack_address, abi=attack_abi)
 
@@ -99,7 +97,7 @@ class TestWalletAttack(unittest.TestCase):
         # Deposit 3 Ether to VulnerableWallet
         tx_hash = vul_wallet_instance.functions.deposit().transact(
             {'from': accounts[0], 'value': w3.to_wei(3, 'ether')})
-        w3.eth.wait_for_transaction_receipt(tx_hash)
+        receipts.wait_one(tx_hash)
         print(f"Balance of vulnerable wallet after deposit: {get_balance(vulnerable_wallet_address)} ETH")
         assert get_balance(vulnerable_wallet_address) == 3
 
@@ -108,7 +106,7 @@ class TestWalletAttack(unittest.TestCase):
             {'from': accounts[2], 'value': w3.to_wei(1, 'ether')})
         tx_hash = wallet_attack_instance.functions.exploit(vulnerable_wallet_address).transact(
             {'from': accounts[2], 'value': w3.to_wei(1, 'ether'), 'gas': gas_estimate * 2})
-        w3.eth.wait_for_transaction_receipt(tx_hash)
+        receipts.wait_one(tx_hash)
 
         # Check the balance of VulnerableWallet after the attack
         balance_after_attack = get_balance(vulnerable_wallet_address)
@@ -135,14 +133,14 @@ class TestWalletAttack(unittest.TestCase):
         # Deploy VulnerableWallet contract
         vulnerable_wallet_interface = w3.eth.contract(abi=wallet_abi, bytecode=wallet_bytecode)
         vulnerable_tx_hash = vulnerable_wallet_interface.constructor().transact({'from': accounts[1]})
-        vulnerable_tx_receipt = w3.eth.wait_for_transaction_receipt(vulnerable_tx_hash)
+        vulnerable_tx_receipt = receipts.wait_one(vulnerable_tx_hash)
         vulnerable_wallet_address = vulnerable_tx_receipt.contractAddress
         vul_wallet_instance = w3.eth.contract(address=vulnerable_wallet_address, abi=wallet_abi)
 
         # Deploy WalletAttack contract
         wallet_attack_interface = w3.eth.contract(abi=attack_abi, bytecode=attack_bytecode)
         wallet_attack_tx_hash = wallet_attack_interface.constructor().transact({'from': accounts[2]})
-        wallet_attack_tx_receipt = w3.eth.wait_for_transaction_receipt(wallet_attack_tx_hash)
+        wallet_attack_tx_receipt = receipts.wait_one(wallet_attack_tx_hash)
         wallet_attack_address = wallet_attack_tx_receipt.contractAddress
         wallet_attack_instance = w3.eth.contract(address=wallet_attack_address, abi=attack_abi)
 
@@ -157,7 +155,7 @@ class TestWalletAttack(unittest.TestCase):
         # Deposit 3 Ether to VulnerableWallet
         tx_hash = vul_wallet_instance.functions.deposit().transact(
             {'from': accounts[0], 'value': w3.to_wei(3, 'ether')})
-        w3.eth.wait_for_transaction_receipt(tx_hash)
+        receipts.wait_one(tx_hash)
         print(f"Balance of vulnerable wallet after deposit: {get_balance(vulnerable_wallet_address)} ETH")
         assert get_balance(vulnerable_wallet_address) == 3
 
@@ -173,21 +171,21 @@ class TestWalletAttack(unittest.TestCase):
         # Deploy VulnerableWallet contract
         vulnerable_wallet_interface = w3.eth.contract(abi=wallet_abi, bytecode=wallet_bytecode)
         vulnerable_tx_hash = vulnerable_wallet_interface.constructor().transact({'from': accounts[1]})
-        vulnerable_tx_receipt = w3.eth.wait_for_transaction_receipt(vulnerable_tx_hash)
+        vulnerable_tx_receipt = receipts.wait_one(vulnerable_tx_hash)
         vulnerable_wallet_address = vulnerable_tx_receipt.contractAddress
         vul_wallet_instance = w3.eth.contract(address=vulnerable_wallet_address, abi=wallet_abi)
 
         # Deploy WalletAttack contract
         wallet_attack_interface = w3.eth.contract(abi=attack_abi, bytecode=attack_bytecode)
         wallet_attack_tx_hash = wallet_attack_interface.constructor().transact({'from': accounts[2]})
-        wallet_attack_tx_receipt = w3.eth.wait_for_transaction_receipt(wallet_attack_tx_hash)
+        wallet_attack_tx_receipt = receipts.wait_one(wallet_attack_tx_hash)
         wallet_attack_address = wallet_attack_tx_receipt.contractAddress
         wallet_attack_instance = w3.eth.contract(address=wallet_attack_address, abi=attack_abi)
 
         # Check the balance of accounts[2] after the attack
         # Deposit 1 Ether to VulnerableWallet
         tx_hash = vul_wallet_instance.functions.deposit().transact({'from': accounts[0], 'value': w3.to_wei(1, 'ether')})
-        w3.eth.wait_for_transaction_receipt(tx_hash)
+        receipts.wait_one(tx_hash)
         assert get_balance(vulnerable_wallet_address) == 1
 
         # Attempt to exploit the WalletAttack contract on the vulnerable wallet
@@ -44,19 +44,28 @@ contract RPS is IRPS {
     } //These correspond to values 0,1,2,3
 
     struct Game {
-        address player1;
-        address player2;
-        uint betAmount;
-        Move move1;
-        Move move2;
-        bytes32 hiddenMove1;
-        bytes32 hiddenMove2;
-        GameState state;
-        uint revealBlock;
+        // The fields are ordered so that a game takes 4 storage slots:
+        address player1;     // slot 0 (20 bytes)
+        uint96 betAmount;    // slot 0 (12 bytes) - wei amounts up to ~7.9e28, far more ether than exists
+        address player2;     // slot 1 (20 bytes)
+        Move move1;          // slot 1 (1 byte)
+        Move move2;          // slot 1 (1 byte)
+        GameState state;     // slot 1 (1 byte)
+        uint64 revealBlock;  // slot 1 (8 bytes)
+        bytes32 hiddenMove1; // slot 2
+        bytes32 hiddenMove2; // slot 3
     }
     mapping(uint => Game) public games;
     mapping(address => uint) public balances;
-    uint public revealPeriodLength;
+    uint public immutable revealPeriodLength;
+
+    // Every state transition and balance change is logged, so games and balances can be followed from the logs alone.
+    event Deposit(address indexed player, uint amount);
+    event Withdrawal(address indexed player, uint amount);
+    event MoveCommitted(uint indexed gameID, address indexed player, uint betAmount); // first commit: MOVE1, second: MOVE2
+    event GameCanceled(uint indexed gameID, address indexed player);
+    event MoveRevealed(uint indexed gameID, address indexed player, Move move); // the first reveal starts the reveal phase
+    event GameEnded(uint indexed gameID, address indexed winner, uint payout); // on a tie winner is 0 and both get payout back
 
     constructor(uint _revealPeriodLength) {
         // Constructs a new contract that allows users to play multiple rock-paper-scissors games.
@@ -95,6 +104,26 @@ contract RPS is IRPS {
         uint betAmount,
         bytes32 hiddenMove
     ) external override {
+        _makeMove(gameID, betAmount, hiddenMove);
+    }
+
+    function depositAndMakeMove(uint gameID, uint betAmount, bytes32 hiddenMove) external payable {
+        // Adds msg.value to the sender's balance (as receive() does) and then makes the move, in one transaction.
+        // If the move reverts, so does the deposit.
+        _deposit();
+        _makeMove(gameID, betAmount, hiddenMove);
+    }
+
+    function makeMoves(uint[] calldata gameIDs, uint[] calldata betAmounts, bytes32[] calldata hiddenMoves) external {
+        // makeMove for each game, all in one transaction and all or nothing: if the move in any of the games
+        // would revert, the whole call reverts (with that game's reason) and none of the moves is made.
+        require(gameIDs.length == betAmounts.length && gameIDs.length == hiddenMoves.length, "Length mismatch");
+        for (uint i = 0; i < gameIDs.length; i++) {
+            _makeMove(gameIDs[i], betAmounts[i], hiddenMoves[i]);
+        }
+    }
+
+    function _makeMove(uint gameID, uint betAmount, bytes32 hiddenMove) internal {
         Game storage game = games[gameID];
 
         if (game.state == GameState.MOVE1) {
@@ -104,16 +133,17 @@ contract RPS is IRPS {
             game.player2 = msg.sender;
             game.hiddenMove2 = hiddenMove;
             game.state = GameState.MOVE2;
-            game.move2 = Move.NONE;
+            emit MoveCommitted(gameID, msg.sender, game.betAmount);
         } else if (game.state == GameState.NO_GAME) {
+            require(betAmount <= type(uint96).max, "Bet amount too large");
             require(balances[msg.sender] >= betAmount, "Not enough balance");
             balances[msg.sender] -= betAmount;
             game.player1 = msg.sender;
-            game.betAmount = betAmount;
+            game.betAmount = uint96(betAmount);
             game.hiddenMove1 = hiddenMove;
-            game.hiddenMove2 = 0;
+            // finished games are deleted, so all the other fields are already zero.
             game.state = GameState.MOVE1;
-            game.move1 = Move.NONE;
+            emit MoveCommitted(gameID, msg.sender, betAmount);
         } else {
             revert("Invalid game state");
         }
@@ -125,11 +155,11 @@ contract RPS is IRPS {
         // a canceled game returns the funds to the player. Only the player that made the first move can call this function, and it will run only if
         // no other commitment for a move was entered.
         Game storage game = games[gameID];
+        // (in state MOVE1 the other player did not yet commit)
         require(game.state == GameState.MOVE1, "player1 must commit");
-        require(game.hiddenMove2 == 0, "other player did not yet commit");
         require(msg.sender == game.player1, "Only the first player can cancel");
-        game.state = GameState.NO_GAME;
         balances[game.player1] += 1 * game.betAmount;
+        emit GameCanceled(gameID, game.player1);
         delete games[gameID];
     }
 
@@ -141,6 +171,29 @@ contract RPS is IRPS {
         // if a player has already revealed, and calls this function again, then this call reverts.
         // only players that have committed a move may reveal.
         // if the revealed move is bogus (not rock paper or scissors) the call should revert. This means that if both players entered bogus moves, the game cannot end and their money is stuck.
+        _revealMove(gameID, move, key);
+    }
+
+    function revealMoveAndWithdraw(uint gameID, Move move, bytes32 key) external {
+        // Reveals (as revealMove) and then withdraws what the reveal paid out, i.e. the payout if it ended the game.
+        // The first revealer is owed nothing yet and withdraws nothing. Funds already in the balance stay there.
+        uint before = balances[msg.sender];
+        _revealMove(gameID, move, key);
+        uint amount = balances[msg.sender] - before;
+        if (amount > 0) {
+            _withdraw(amount);
+        }
+    }
+
+    function revealMoves(uint[] calldata gameIDs, Move[] calldata moves, bytes32[] calldata keys) external {
+        // revealMove for each game, all or nothing like makeMoves.
+        require(gameIDs.length == moves.length && gameIDs.length == keys.length, "Length mismatch");
+        for (uint i = 0; i < gameIDs.length; i++) {
+            _revealMove(gameIDs[i], moves[i], keys[i]);
+        }
+    }
+
+    function _revealMove(uint gameID, Move move, bytes32 key) internal {
         Game storage game = games[gameID];
         require(
             game.state == GameState.MOVE2 || game.state == GameState.REVEAL1,
@@ -159,25 +212,27 @@ contract RPS is IRPS {
             require(game.move1 == Move.NONE, "Move1 already revealed");
             require(checkCommitment(game.hiddenMove1, move, key), "Invalid commitment");
             game.move1 = move;
+            emit MoveRevealed(gameID, msg.sender, move);
             if (game.state == GameState.REVEAL1) {
                 if (game.move2 != Move.NONE) {
                     endGame(gameID);
                 }
             }
             else {
-                game.revealBlock = block.number;
+                game.revealBlock = uint64(block.number);
                 game.state = GameState.REVEAL1;
             }
         } else if (msg.sender == game.player2) {
             require(game.move2 == Move.NONE, "Move2 already revealed");
             require(checkCommitment(game.hiddenMove2, move, key), "Invalid commitment");
             game.move2 = move;
+            emit MoveRevealed(gameID, msg.sender, move);
             if (game.state == GameState.REVEAL1) {
                 if (game.move1 != Move.NONE) {
                     endGame(gameID);
                 }
             } else {
-                game.revealBlock = block.number;
+                game.revealBlock = uint64(block.number);
                 game.state = GameState.REVEAL1;
             }
         }
@@ -193,18 +248,22 @@ contract RPS is IRPS {
                 (game.move1 == Move.PAPER && game.move2 == Move.ROCK) ||
                 (game.move1 == Move.SCISSORS && game.move2 == Move.PAPER)
             ) {
-                balances[game.player1] += 2 * game.betAmount;
+                balances[game.player1] += 2 * uint(game.betAmount);
+                emit GameEnded(gameID, game.player1, 2 * uint(game.betAmount));
             }
                 // player2 wins
             else {
-                balances[game.player2] += 2 * game.betAmount;
+                balances[game.player2] += 2 * uint(game.betAmount);
+                emit GameEnded(gameID, game.player2, 2 * uint(game.betAmount));
             }
         }
         // tie
         else{
             balances[game.player1] += game.betAmount;
-            balances[game.player2] += game.betAmount;}
-        game.state = GameState.NO_GAME;
+            balances[game.player2] += game.betAmount;
+            emit GameEnded(gameID, address(0), game.betAmount);}
+        // release the game's storage (refunds gas, and the id can be reused without stale data)
+        delete games[gameID];
     }
 
     function revealPhaseEnded(uint gameID) external {
@@ -224,14 +283,53 @@ contract RPS is IRPS {
         if (game.move1 != Move.NONE && game.move2 == Move.NONE) {
             require(msg.sender == game.player1,
             "this function can only be called by the first revealer");
-            balances[game.player1] += 2 * game.betAmount;
+            balances[game.player1] += 2 * uint(game.betAmount);
+            emit GameEnded(gameID, game.player1, 2 * uint(game.betAmount));
         } else if (game.move1 == Move.NONE && game.move2 != Move.NONE) {
               require(msg.sender == game.player2,
             "this function can only be called by the first revealer");
-            balances[game.player2] += 2 * game.betAmount;
+            balances[game.player2] += 2 * uint(game.betAmount);
+            emit GameEnded(gameID, game.player2, 2 * uint(game.betAmount));
+        }
+        delete games[gameID];
+    }
+    ////////// Bulk queries ////////////////////
+    // These answer for many games / players in one call, so indexers do not need an eth_call per id.
+
+    function getGameStates(uint[] calldata gameIDs) external view returns (
+        GameState[] memory states,
+        uint[] memory betAmounts,
+        uint[] memory revealBlocks
+    ) {
+        // Returns the state, bet amount and reveal block of each of the given games (in the same order).
+        states = new GameState[](gameIDs.length);
+        betAmounts = new uint[](gameIDs.length);
+        revealBlocks = new uint[](gameIDs.length);
+        for (uint i = 0; i < gameIDs.length; i++) {
+            Game storage game = games[gameIDs[i]];
+            states[i] = game.state;
+            betAmounts[i] = game.betAmount;
+            revealBlocks[i] = game.revealBlock;
+        }
+    }
+
+    function getGameStateRange(uint firstGameID, uint count) external view returns (
+        GameState[] memory states,
+        uint[] memory betAmounts,
+        uint[] memory revealBlocks
+    ) {
+        // Same as getGameStates for the ids firstGameID, firstGameID + 1, ..., firstGameID + count - 1.
+        states = new GameState[](count);
+        betAmounts = new uint[](count);
+        revealBlocks = new uint[](count);
+        for (uint i = 0; i < count; i++) {
+            Game storage game = games[firstGameID + i];
+            states[i] = game.state;
+            betAmounts[i] = game.betAmount;
+            revealBlocks[i] = game.revealBlock;
         }
-        game.state = GameState.NO_GAME;
     }
+
     ////////// Handling money ////////////////////
 
     function balanceOf(address player) external view returns (uint) {
@@ -240,18 +338,36 @@ contract RPS is IRPS {
         return balances[player];
     }
 
+    function balancesOf(address[] calldata players) external view returns (uint[] memory result) {
+        // returns balanceOf for each of the given players (in the same order).
+        result = new uint[](players.length);
+        for (uint i = 0; i < players.length; i++) {
+            result[i] = balances[players[i]];
+        }
+    }
+
 
     function withdraw(uint amount) external {
         // Withdraws amount from the account of the sender
         // (available funds are those that were deposited or won but not currently staked in a game).
+        _withdraw(amount);
+    }
+
+    function _withdraw(uint amount) internal {
         require(balances[msg.sender] >= amount, "Not enough balance");
         balances[msg.sender] -= amount;
+        emit Withdrawal(msg.sender, amount);
         msg.sender.call{value: amount}("");
     }
 
     receive() external payable {
         // adds eth to the account of the message sender.
+        _deposit();
+    }
+
+    function _deposit() internal {
         balances[msg.sender] += msg.value;
+        emit Deposit(msg.sender, msg.value);
     }
 
 }
@@ -0,0 +1,330 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.19;
+
+contract RPSChannel {
+    // Payment channels for playing many rounds of rock-paper-scissors between the same two players.
+    // Both players lock their funds once (open + join). Rounds are then played off-chain (see ex4lib/rps_channel.py):
+    //   1. each player signs a commitment for the next round: Commit(channelID, opening, player, round, betAmount, hiddenMove)
+    //   2. once both commitments are exchanged, each player sends its move and key (checked against the commitment)
+    //   3. both sign the balances after the round: State(channelID, opening, round, balance1, balance2, isFinal)
+    // The chain is only used again to settle:
+    //   - close() pays out a co-signed final state at once.
+    //   - otherwise either player calls submitState() with the latest co-signed state it has (or startClose() if
+    //     no round was ever signed). For disputePeriodLength blocks the other player can submit a later state.
+    //     A round that was committed to but not co-signed can be played on chain with disputeRound() and
+    //     revealMove(), under the reveal timeout of RPS: after revealPeriodLength blocks, the player that
+    //     revealed wins the bet if the other did not. settle() then pays out the balances.
+    // Hashes are signed as Ethereum signed messages (eth_sign / personal_sign of the 32 byte hash). They cover the
+    // contract, the channel id and how many times that id was opened, so a settled channel's messages are void in a
+    // channel later opened with the same id.
+
+    enum ChannelState {
+        NONE, // no channel with this id (or it was settled)
+        OPENING, // player1 opened the channel and locked its funds, player2 did not join yet
+        OPEN, // both players locked their funds, rounds are played off-chain
+        CLOSING // a player started to close the channel, states and disputed rounds can be submitted
+    } // These correspond to values 0,1,2,3
+
+    enum Move {
+        NONE,
+        ROCK,
+        PAPER,
+        SCISSORS
+    } //These correspond to values 0,1,2,3
+
+    struct Channel {
+        address player1;     // slot 0
+        uint96 balance1;     // slot 0
+        address player2;     // slot 1
+        uint96 balance2;     // slot 1
+        uint64 round;        // slot 2 - the round of the latest state (0: the deposits)
+        uint64 closingBlock; // slot 2
+        uint64 revealBlock;  // slot 2 - first reveal of the disputed round
+        ChannelState state;  // slot 2
+        Move move1;          // slot 2
+        Move move2;          // slot 2
+        uint96 betAmount;    // slot 3 - of the disputed round (0: no round in dispute), locked from both balances
+        bytes32 hiddenMove1; // slot 4
+        bytes32 hiddenMove2; // slot 5
+    }
+    mapping(uint => Channel) public channels;
+    // how many times each channel id was opened (not reset on settling); part of every signed message
+    mapping(uint => uint) public openings;
+    // payouts that could not be sent, and can be withdrawn
+    mapping(address => uint) public pending;
+    uint public immutable revealPeriodLength;
+    uint public immutable disputePeriodLength;
+    // gas forwarded with a payout, as with transfer(): enough to receive ether, not to run anything expensive
+    uint constant PAYOUT_GAS = 2300;
+
+    event ChannelOpened(uint indexed channelID, address indexed player1, address indexed player2, uint amount);
+    event ChannelJoined(uint indexed channelID, address indexed player2, uint amount);
+    event ChannelClosing(uint indexed channelID, address indexed player, uint round);
+    event RoundDisputed(uint indexed channelID, uint round, uint betAmount);
+    event MoveRevealed(uint indexed channelID, address indexed player, Move move);
+    event ChannelSettled(uint indexed channelID, uint round, uint payout1, uint payout2);
+
+    constructor(uint _revealPeriodLength, uint _disputePeriodLength) {
+        require(_revealPeriodLength >= 1, "Reveal period must be at least 1 block");
+        require(_disputePeriodLength >= 1, "Dispute period must be at least 1 block");
+        revealPeriodLength = _revealPeriodLength;
+        disputePeriodLength = _disputePeriodLength;
+    }
+
+    ////////// Messages ////////////////////
+
+    function stateHash(uint channelID, uint round, uint balance1, uint balance2, bool isFinal)
+    public view returns (bytes32) {
+        return keccak256(abi.encode(address(this), channelID, openings[channelID], round, balance1, balance2,
+            isFinal));
+    }
+
+    function commitHash(uint channelID, address player, uint round, uint betAmount, bytes32 hiddenMove)
+    public view returns (bytes32) {
+        // player is the signer: a commitment cannot be passed off as the other player's
+        return keccak256(abi.encode(address(this), channelID, openings[channelID], player, round, betAmount,
+            hiddenMove));
+    }
+
+    function signer(bytes32 hash, bytes calldata signature) public pure returns (address) {
+        require(signature.length == 65, "Invalid signature");
+        bytes32 digest = keccak256(abi.encodePacked("\x19Ethereum Signed Message:\n32", hash));
+        return ecrecover(digest, uint8(signature[64]), bytes32(signature[0:32]), bytes32(signature[32:64]));
+    }
+
+    function checkCommitment(bytes32 commitment, Move move, bytes32 key) public pure returns (bool) {
+        // the same commitments as RPS (see commit.py)
+        return keccak256(abi.encodePacked(uint(move), key)) == commitment;
+    }
+
+    ////////// Opening ////////////////////
+
+    function open(uint channelID, address player2) external payable {
+        // Opens the channel with player2, locking msg.value as the caller's (player1's) balance.
+        Channel storage channel = channels[channelID];
+        require(channel.state == ChannelState.NONE, "Channel id in use");
+        require(player2 != msg.sender && player2 != address(0), "Invalid opponent");
+        require(msg.value < 2 ** 95, "Deposit too large");
+        channel.player1 = msg.sender;
+        channel.player2 = player2;
+        channel.balance1 = uint96(msg.value);
+        channel.state = ChannelState.OPENING;
+        openings[channelID] += 1;
+        emit ChannelOpened(channelID, msg.sender, player2, msg.value);
+    }
+
+    function join(uint channelID) external payable {
+        // player2 locks msg.value as its balance; rounds can be played from now on.
+        Channel storage channel = channels[channelID];
+        require(channel.state == ChannelState.OPENING, "Channel is not opening");
+        require(msg.sender == channel.player2, "Only player2 can join");
+        require(msg.value < 2 ** 95, "Deposit too large");
+        channel.balance2 = uint96(msg.value);
+        channel.state = ChannelState.OPEN;
+        emit ChannelJoined(channelID, msg.sender, msg.value);
+    }
+
+    function cancel(uint channelID) external {
+        // player1 takes its deposit back if player2 did not join.
+        Channel storage channel = channels[channelID];
+        require(channel.state == ChannelState.OPENING, "Channel is not opening");
+        require(msg.sender == channel.player1, "Only player1 can cancel");
+        uint amount = channel.balance1;
+        delete channels[channelID];
+        emit ChannelSettled(channelID, 0, amount, 0);
+        _pay(msg.sender, amount);
+    }
+
+    ////////// Closing ////////////////////
+
+    function _checkState(Channel storage channel, uint channelID, uint round, uint balance1, uint balance2,
+                         bool isFinal, bytes calldata signature1, bytes calldata signature2) internal view {
+        bytes32 hash = stateHash(channelID, round, balance1, balance2, isFinal);
+        require(signer(hash, signature1) == channel.player1, "Invalid signature of player1");
+        require(signer(hash, signature2) == channel.player2, "Invalid signature of player2");
+        require(balance1 + balance2 == _total(channel), "Balances do not add up");
+    }
+
+    function _total(Channel storage channel) internal view returns (uint) {
+        return uint(channel.balance1) + channel.balance2 + 2 * uint(channel.betAmount);
+    }
+
+    function close(uint channelID, uint round, uint balance1, uint balance2,
+                   bytes calldata signature1, bytes calldata signature2) external {
+        // Settles a final state signed by both players right away (either player can send it).
+        Channel storage channel = channels[channelID];
+        require(channel.state == ChannelState.OPEN || channel.state == ChannelState.CLOSING, "Channel is not open");
+        require(round > channel.round, "State is not newer");
+        _checkState(channel, channelID, round, balance1, balance2, true, signature1, signature2);
+        _settle(channelID, round, balance1, balance2);
+    }
+
+    function startClose(uint channelID) external {
+        // Starts closing the channel on the latest state known on chain (the deposits if no state was submitted).
+        Channel storage channel = channels[channelID];
+        require(channel.state == ChannelState.OPEN, "Channel is not open");
+        require(msg.sender == channel.player1 || msg.sender == channel.player2, "Only players in this channel can close");
+        channel.state = ChannelState.CLOSING;
+        channel.closingBlock = uint64(block.number);
+        emit ChannelClosing(channelID, msg.sender, channel.round);
+    }
+
+    function submitState(uint channelID, uint round, uint balance1, uint balance2, bool isFinal,
+                         bytes calldata signature1, bytes calldata signature2) external {
+        // Submits a co-signed state newer than the one on chain, and starts closing the channel if it is open.
+        // A newer state supersedes a disputed round (it was played off-chain after all).
+        Channel storage channel = channels[channelID];
+        require(msg.sender == channel.player1 || msg.sender == channel.player2, "Only players in this channel can close");
+        if (channel.state == ChannelState.OPEN) {
+            channel.state = ChannelState.CLOSING;
+            channel.closingBlock = uint64(block.number);
+        } else {
+            require(channel.state == ChannelState.CLOSING, "Channel is not open");
+            require(block.number < channel.closingBlock + disputePeriodLength, "Dispute period is over");
+        }
+        require(round > channel.round, "State is not newer");
+        require(round < 2 ** 64, "Invalid round");
+        _checkState(channel, channelID, round, balance1, balance2, isFinal, signature1, signature2);
+        channel.round = uint64(round);
+        channel.balance1 = uint96(balance1);
+        channel.balance2 = uint96(balance2);
+        _clearRound(channel);
+        emit ChannelClosing(channelID, msg.sender, round);
+    }
+
+    ////////// Disputed round ////////////////////
+
+    function disputeRound(uint channelID, uint betAmount, bytes32 hiddenMove1, bytes calldata signature1,
+                          bytes32 hiddenMove2, bytes calldata signature2) external {
+        // Plays the round after the latest state on chain: both players signed their commitments to it, but not the
+        // state after it. The bet is locked from both balances, and the round continues with revealMove. The dispute
+        // period is extended so that both players get at least revealPeriodLength blocks to reveal, however late in
+        // it the round was disputed (otherwise settle() could call the round off before the other reveal is mined).
+        Channel storage channel = channels[channelID];
+        require(channel.state == ChannelState.CLOSING, "Channel is not closing");
+        require(block.number < channel.closingBlock + disputePeriodLength, "Dispute period is over");
+        require(channel.betAmount == 0, "Round already disputed");
+        require(betAmount > 0 && betAmount <= channel.balance1 && betAmount <= channel.balance2, "Invalid bet amount");
+        // a copy of the other player's commitment would only ever tie it
+        require(hiddenMove1 != hiddenMove2, "Identical commitments");
+        uint round = uint(channel.round) + 1;
+        require(signer(commitHash(channelID, channel.player1, round, betAmount, hiddenMove1), signature1)
+            == channel.player1, "Invalid signature of player1");
+        require(signer(commitHash(channelID, channel.player2, round, betAmount, hiddenMove2), signature2)
+            == channel.player2, "Invalid signature of player2");
+        channel.balance1 -= uint96(betAmount);
+        channel.balance2 -= uint96(betAmount);
+        channel.betAmount = uint96(betAmount);
+        channel.hiddenMove1 = hiddenMove1;
+        channel.hiddenMove2 = hiddenMove2;
+        if (block.number + revealPeriodLength > channel.closingBlock) {
+            channel.closingBlock = uint64(block.number + revealPeriodLength);
+        }
+        emit RoundDisputed(channelID, round, betAmount);
+    }
+
+    function revealMove(uint channelID, Move move, bytes32 key) external {
+        // Reveals a move of the disputed round, as RPS.revealMove. The second reveal ends the round.
+        Channel storage channel = channels[channelID];
+        require(channel.state == ChannelState.CLOSING && channel.betAmount > 0, "Cannot reveal");
+        require(
+            move == Move.ROCK || move == Move.PAPER || move == Move.SCISSORS,
+            "Invalid move"
+        );
+        if (msg.sender == channel.player1) {
+            require(channel.move1 == Move.NONE, "Move1 already revealed");
+            require(checkCommitment(channel.hiddenMove1, move, key), "Invalid commitment");
+            channel.move1 = move;
+        } else if (msg.sender == channel.player2) {
+            require(channel.move2 == Move.NONE, "Move2 already revealed");
+            require(checkCommitment(channel.hiddenMove2, move, key), "Invalid commitment");
+            channel.move2 = move;
+        } else {
+            revert("Only players in this channel can reveal");
+        }
+        emit MoveRevealed(channelID, msg.sender, move);
+        if (channel.move1 != Move.NONE && channel.move2 != Move.NONE) {
+            _endRound(channel);
+        } else {
+            channel.revealBlock = uint64(block.number);
+        }
+    }
+
+    function _endRound(Channel storage channel) internal {
+        // pays the pot of the disputed round: to the winner, back to both on a tie, or to the only player that
+        // revealed in time.
+        uint pot = 2 * uint(channel.betAmount);
+        Move move1 = channel.move1;
+        Move move2 = channel.move2;
+        if (move1 == move2) {
+            channel.balance1 += channel.betAmount;
+            channel.balance2 += channel.betAmount;
+        } else if (move2 == Move.NONE || (move1 != Move.NONE && uint(move1) % 3 == (uint(move2) + 1) % 3)) {
+            channel.balance1 += uint96(pot);
+        } else {
+            channel.balance2 += uint96(pot);
+        }
+        channel.round += 1;
+        _clearRound(channel);
+    }
+
+    function _clearRound(Channel storage channel) internal {
+        channel.betAmount = 0;
+        channel.move1 = Move.NONE;
+        channel.move2 = Move.NONE;
+        channel.revealBlock = 0;
+        channel.hiddenMove1 = 0;
+        channel.hiddenMove2 = 0;
+    }
+
+    ////////// Settling ////////////////////
+
+    function settle(uint channelID) external {
+        // Pays out the balances once the dispute period is over. A disputed round that only one player revealed is
+        // won by that player after revealPeriodLength blocks; one that nobody revealed is called off.
+        Channel storage channel = channels[channelID];
+        require(channel.state == ChannelState.CLOSING, "Channel is not closing");
+        require(block.number >= channel.closingBlock + disputePeriodLength, "Dispute period is not over");
+        if (channel.betAmount > 0) {
+            if (channel.move1 == Move.NONE && channel.move2 == Move.NONE) {
+                channel.balance1 += channel.betAmount;
+                channel.balance2 += channel.betAmount;
+                _clearRound(channel);
+            } else {
+                require(block.number >= channel.revealBlock + revealPeriodLength, "Reveal period is not over");
+                _endRound(channel);
+            }
+        }
+        _settle(channelID, channel.round, channel.balance1, channel.balance2);
+    }
+
+    function _settle(uint channelID, uint round, uint balance1, uint balance2) internal {
+        address player1 = channels[channelID].player1;
+        address player2 = channels[channelID].player2;
+        delete channels[channelID];
+        emit ChannelSettled(channelID, round, balance1, balance2);
+        _pay(player1, balance1);
+        _pay(player2, balance2);
+    }
+
+    function _pay(address player, uint amount) internal {
+        // A player that cannot receive ether (e.g. a contract, or an account with delegated code) must not block the
+        // other one's payout: the transfer only gets the PAYOUT_GAS stipend, so it can neither revert settle() nor use
+        // up its gas, and whatever is not received is credited to pending instead.
+        if (amount == 0) {
+            return;
+        }
+        (bool success,) = player.call{value: amount, gas: PAYOUT_GAS}("");
+        if (!success) {
+            pending[player] += amount;
+        }
+    }
+
+    function withdrawPending() external {
+        uint amount = pending[msg.sender];
+        require(amount > 0, "Nothing to withdraw");
+        pending[msg.sender] = 0;
+        (bool success,) = msg.sender.call{value: amount}("");
+        require(success, "Transfer failed");
+    }
+}
@@ -1,15 +1,117 @@
-from web3 import Web3
+import argparse
+import itertools
+import os
 import secrets
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+
+from eth_hash.auto import keccak
+from web3 import Web3
+
+# Commitments for RPS.makeMove: keccak256(abi.encodePacked(int256 move, bytes32 key)).
+#
+#   python commit.py                                   (one commitment, interactive)
+#   python commit.py --bulk moves.txt -o commits.csv   (one move per line; '-' reads stdin / writes stdout)
+#
+# The bulk mode packs the 64-byte preimages of a whole chunk into one buffer and hashes them with eth_hash (which
+# uses the native pysha3 / pycryptodome keccak), skipping web3's ABI encoder. Chunks are spread over a process
+# pool and written out in input order as "move,key,commitment" lines (hex, like the interactive mode prints).
+
+PREIMAGE_SIZE = 64
+DEFAULT_CHUNK_SIZE = 20000
 
 
 def get_commit(data: int, key: bytes) -> bytes:
     return bytes(Web3.solidity_keccak(['int256', 'bytes32'], [data, key]))
 
 
-print("Selecting a random key.")
-key = bytes(secrets.token_bytes(32))
-print(f"The key is: {key.hex()}")
+def pack_preimages(moves: List[int], keys: bytes) -> bytearray:
+    # move_i (int256, big endian two's complement) followed by key_i, for every i, in one contiguous buffer
+    buffer = bytearray(PREIMAGE_SIZE * len(moves))
+    for i, move in enumerate(moves):
+        offset = i * PREIMAGE_SIZE
+        buffer[offset:offset + 32] = move.to_bytes(32, 'big', signed=True)
+        buffer[offset + 32:offset + 64] = keys[i * 32:i * 32 + 32]
+    return buffer
+
+
+def commit_chunk(moves: List[int], keys: Optional[bytes] = None) -> Tuple[bytes, bytes]:
+    # Returns (keys, commitments) for the moves, each as 32-byte records concatenated; new random keys by default.
+    if keys is None:
+        keys = secrets.token_bytes(32 * len(moves))
+    preimages = bytes(pack_preimages(moves, keys))
+    commitments = b''.join(keccak(preimages[offset:offset + PREIMAGE_SIZE])
+                           for offset in range(0, len(preimages), PREIMAGE_SIZE))
+    return keys, commitments
+
+
+def _chunks(moves: Iterable[int], chunk_size: int) -> Iterator[List[int]]:
+    it = iter(moves)
+    while chunk := list(itertools.islice(it, chunk_size)):
+        yield chunk
+
+
+def bulk_commit(moves: Iterable[int], processes: Optional[int] = None,
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[List[int], bytes, bytes]]:
+    # Yields (moves, keys, commitments) per chunk, in input order. processes=1 does the work in this process.
+    chunks = _chunks(moves, chunk_size)
+    if processes == 1:
+        for chunk in chunks:
+            yield (chunk, *commit_chunk(chunk))
+        return
+    with ProcessPoolExecutor(processes) as pool:
+        # map() submits every chunk up front; bounding the window keeps memory flat for endless inputs
+        window = (processes or os.cpu_count() or 1) * 2
+        while batch := list(itertools.islice(chunks, window)):
+            for chunk, (keys, commitments) in zip(batch, pool.map(commit_chunk, batch)):
+                yield chunk, keys, commitments
+
+
+def write_commitments(moves: Iterable[int], out: IO[str], processes: Optional[int] = None,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    # Streams "move,key,commitment" lines to out; returns how many were written.
+    count = 0
+    for chunk, keys, commitments in bulk_commit(moves, processes, chunk_size):
+        out.write(''.join(f'{move},{keys[i * 32:i * 32 + 32].hex()},{commitments[i * 32:i * 32 + 32].hex()}\n'
+                          for i, move in enumerate(chunk)))
+        count += len(chunk)
+    return count
+
+
+def _read_moves(lines: Iterable[str]) -> Iterator[int]:
+    for line in lines:
+        if line.strip():
+            yield int(line)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Commitments for RPS moves')
+    parser.add_argument('--bulk', metavar='MOVES', help="file with one move per line ('-' for stdin)")
+    parser.add_argument('-o', '--output', default='-', help="where bulk commitments go ('-' for stdout)")
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (default: one per core)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.bulk is None:
+        print("Selecting a random key.")
+        key = bytes(secrets.token_bytes(32))
+        print(f"The key is: {key.hex()}")
+
+        num = int(input("Enter an int: "))
+        print("The commitment to the int you entered is: ", get_commit(num, key).hex())
+        return
+
+    source = sys.stdin if args.bulk == '-' else open(args.bulk)
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', buffering=1 << 20)
+    try:
+        count = write_commitments(_read_moves(source), out, args.processes, args.chunk_size)
+    finally:
+        for f in (source, out):
+            if f not in (sys.stdin, sys.stdout):
+                f.close()
+    print(f"Wrote {count} commitments.", file=sys.stderr)
 
 
-num = int(input("Enter an int: "))
-print("The commitment to the int you entered is: ", get_commit(num, key).hex())
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+import os
+
+import pytest
+from web3.exceptions import ContractLogicError
+
+from ex4lib import chain
+from ex4lib.compiler import compile_contract
+from ex4lib.providers import make_web3
+from ex4lib.rps_channel import ChannelPlayer, ChannelStore, StateUpdate, commit_hash, sign_hash, state_hash
+from ex4lib.rps_types import ChannelState, Move
+from ex4lib.tx_sender import dev_accounts
+
+# RPSChannel.sol with the off-chain client of ex4lib/rps_channel.py: many rounds between the same two players,
+# settled cooperatively or through a dispute.
+
+REVEAL_PHASE_LENGTH = 4
+DISPUTE_PERIOD_LENGTH = 10
+CHANNEL_ID = 7
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(scope='module')
+def w3():
+    w3 = make_web3()
+    assert w3.is_connected(), "Web3 is not connected"
+    return w3
+
+
+@pytest.fixture(scope='module')
+def signers(w3):
+    # local keys of the node's accounts 1 and 2
+    return dev_accounts(w3, 3)[1:3]
+
+
+@pytest.fixture(scope='module')
+def deployed_contract(w3):
+    contract_interface = compile_contract(os.path.join(HERE, 'RPSChannel.sol'), contract_name='RPSChannel')
+    factory = w3.eth.contract(abi=contract_interface['abi'], bytecode=contract_interface['bin'])
+    tx_hash = factory.constructor(REVEAL_PHASE_LENGTH, DISPUTE_PERIOD_LENGTH).transact({'from': w3.eth.accounts[0]})
+    address = w3.eth.wait_for_transaction_receipt(tx_hash).contractAddress
+    return w3.eth.contract(address=address, abi=contract_interface['abi'])
+
+
+@pytest.fixture
+def contract(w3, deployed_contract):
+    with chain.isolated(w3):
+        yield deployed_contract
+
+
+def open_channel(w3, contract, signers, tmp_path):
+    # an open channel with 5 ether from each player, and a ChannelPlayer for each of them
+    alice, bob = signers
+    deposit = w3.to_wei(5, 'ether')
+    contract.functions.open(CHANNEL_ID, bob.address).transact({'from': alice.address, 'value': deposit})
+    contract.functions.join(CHANNEL_ID).transact({'from': bob.address, 'value': deposit})
+    opening = contract.functions.openings(CHANNEL_ID).call()
+    return [ChannelPlayer(account, contract.address, CHANNEL_ID, opening, alice.address, bob.address, deposit,
+                          deposit, ChannelStore(str(tmp_path / f'{i}.db'))) for i, account in enumerate(signers)]
+
+
+@pytest.fixture
+def players(w3, contract, signers, tmp_path):
+    return open_channel(w3, contract, signers, tmp_path)
+
+
+def play_round(alice, bob, move1, move2, bet_amount):
+    commit1, commit2 = alice.commit(move1, bet_amount), bob.commit(move2, bet_amount)
+    alice.receive_commit(commit2)
+    bob.receive_commit(commit1)
+    alice.receive_reveal(bob.reveal())
+    bob.receive_reveal(alice.reveal())
+    signature1, signature2 = alice.sign_next_state(), bob.sign_next_state()
+    alice.receive_state_signature(signature2)
+    return bob.receive_state_signature(signature1)
+
+
+def received(w3, player, function):
+    # ether the player's account got from the transaction, net of its fee
+    before = w3.eth.get_balance(player)
+    receipt = w3.eth.get_transaction_receipt(function.transact({'from': player}))
+    return w3.eth.get_balance(player) - before + receipt['gasUsed'] * receipt['effectiveGasPrice']
+
+
+def test_messages_match_the_contract(contract, signers):
+    alice = signers[0]
+    state = StateUpdate(CHANNEL_ID, 2, 3, 4, True)
+    assert contract.functions.stateHash(CHANNEL_ID, 2, 3, 4, True).call() == state_hash(contract.address, 0, state)
+    message_hash = commit_hash(contract.address, CHANNEL_ID, 0, alice.address, 1, 5, b'\x01' * 32)
+    assert contract.functions.commitHash(CHANNEL_ID, alice.address, 1, 5, b'\x01' * 32).call() == message_hash
+    assert contract.functions.signer(message_hash, sign_hash(alice, message_hash)).call() == alice.address
+
+
+def test_cooperative_close(w3, contract, players):
+    alice, bob = players
+    bet_amount = w3.to_wei(0.1, 'ether')
+    # 28 rounds, none of them on chain: alice wins 10 more than bob
+    for move2 in [Move.SCISSORS, Move.PAPER, Move.ROCK] * 6 + [Move.SCISSORS] * 10:
+        play_round(alice, bob, Move.ROCK, move2, bet_amount)
+    assert (alice.state.balance1, alice.state.balance2) == (w3.to_wei(6, 'ether'), w3.to_wei(4, 'ether'))
+
+    alice.sign_final_state()
+    alice.receive_state_signature(bob.sign_final_state())
+    assert received(w3, bob.account.address, contract.functions.close(*alice.close_args())) == w3.to_wei(4, 'ether')
+    assert w3.eth.get_balance(contract.address) == 0
+    assert contract.functions.channels(CHANNEL_ID).call()[7] == ChannelState.NONE
+
+
+def test_dispute_with_stale_state_and_unfinished_round(w3, contract, players):
+    alice, bob = players
+    bet_amount = w3.to_wei(1, 'ether')
+    stale = play_round(alice, bob, Move.ROCK, Move.PAPER, bet_amount)  # bob wins
+    play_round(alice, bob, Move.ROCK, Move.SCISSORS, bet_amount)
+    play_round(alice, bob, Move.ROCK, Move.SCISSORS, bet_amount)
+
+    # bob closes on the state that suits him; alice answers with the latest one
+    state = stale.state
+    contract.functions.submitState(CHANNEL_ID, state.round, state.balance1, state.balance2, state.final,
+                                   stale.signature1, stale.signature2).transact({'from': bob.account.address})
+    with pytest.raises(ContractLogicError, match="State is not newer"):
+        contract.functions.submitState(CHANNEL_ID, state.round, state.balance1, state.balance2, state.final,
+                                       stale.signature1, stale.signature2).transact({'from': bob.account.address})
+    contract.functions.submitState(*alice.submit_state_args()).transact({'from': alice.account.address})
+
+    # a fourth round is committed and alice reveals, then bob stops answering: alice plays it on chain
+    bob.receive_commit(alice.commit(Move.PAPER, bet_amount))
+    alice.receive_commit(bob.commit(Move.ROCK, bet_amount))
+    bob.receive_reveal(alice.reveal())
+    contract.functions.disputeRound(*alice.dispute_args()).transact({'from': alice.account.address})
+    contract.functions.revealMove(*alice.reveal_args()).transact({'from': alice.account.address})
+    with pytest.raises(ContractLogicError, match="Dispute period is not over"):
+        contract.functions.settle(CHANNEL_ID).transact({'from': alice.account.address})
+    chain.mine(w3, DISPUTE_PERIOD_LENGTH)
+
+    # 5 + 1 for the state of round 3, + 1 for round 4
+    settle = contract.functions.settle(CHANNEL_ID)
+    assert received(w3, alice.account.address, settle) == w3.to_wei(7, 'ether')
+    assert w3.eth.get_balance(contract.address) == 0
+
+
+def test_states_of_a_settled_channel_are_void_after_reopening(w3, contract, signers, players, tmp_path):
+    alice, bob = players
+    bet_amount = w3.to_wei(1, 'ether')
+    play_round(alice, bob, Move.ROCK, Move.SCISSORS, bet_amount)
+    alice.sign_final_state()
+    alice.receive_state_signature(bob.sign_final_state())
+    old_final, old_close = alice.latest, alice.close_args()
+    contract.functions.close(*old_close).transact({'from': alice.account.address})
+
+    # the same id with the same deposits: alice's winning final state would pay out again if it were accepted
+    (tmp_path / 'reopened').mkdir()
+    new_alice, _ = open_channel(w3, contract, signers, tmp_path / 'reopened')
+    assert new_alice.opening == alice.opening + 1
+    with pytest.raises(ContractLogicError, match="Invalid signature of player1"):
+        contract.functions.close(*old_close).transact({'from': alice.account.address})
+    state = old_final.state
+    with pytest.raises(ContractLogicError, match="Invalid signature of player1"):
+        contract.functions.submitState(CHANNEL_ID, state.round, state.balance1, state.balance2, state.final,
+                                       old_final.signature1, old_final.signature2).transact(
+            {'from': alice.account.address})
+    assert contract.functions.channels(CHANNEL_ID).call()[7] == ChannelState.OPEN
+
+
+def test_round_disputed_in_the_last_block_of_the_dispute_period(w3, contract, players):
+    alice, bob = players
+    bet_amount = w3.to_wei(1, 'ether')
+    play_round(alice, bob, Move.ROCK, Move.SCISSORS, bet_amount)
+    # bob is about to lose the next round and never reveals it
+    bob.receive_commit(alice.commit(Move.PAPER, bet_amount))
+    alice.receive_commit(bob.commit(Move.ROCK, bet_amount))
+    bob.receive_reveal(alice.reveal())
+
+    tx_hash = contract.functions.submitState(*bob.submit_state_args()).transact({'from': bob.account.address})
+    closing_block = w3.eth.get_transaction_receipt(tx_hash)['blockNumber']
+    # the dispute is mined in the last block of the dispute period
+    chain.mine(w3, closing_block + DISPUTE_PERIOD_LENGTH - 2 - w3.eth.block_number)
+    tx_hash = contract.functions.disputeRound(*alice.dispute_args()).transact({'from': alice.account.address})
+    dispute_block = w3.eth.get_transaction_receipt(tx_hash)['blockNumber']
+    assert dispute_block == closing_block + DISPUTE_PERIOD_LENGTH - 1
+
+    # bob cannot call the round off before alice's reveal is in
+    with pytest.raises(ContractLogicError, match="Dispute period is not over"):
+        contract.functions.settle(CHANNEL_ID).transact({'from': bob.account.address})
+    contract.functions.revealMove(*alice.reveal_args()).transact({'from': alice.account.address})
+    chain.mine(w3, dispute_block + REVEAL_PHASE_LENGTH + DISPUTE_PERIOD_LENGTH - w3.eth.block_number)
+    # 5 + 1 for round 1, + 1 for the disputed round
+    assert received(w3, alice.account.address, contract.functions.settle(CHANNEL_ID)) == w3.to_wei(7, 'ether')
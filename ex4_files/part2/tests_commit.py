@@ -0,0 +1,30 @@
+import io
+
+from part2.commit import bulk_commit, commit_chunk, get_commit, write_commitments
+
+# The bulk commitment path must agree with get_commit (web3's solidity_keccak) for every move and key.
+
+
+def test_commit_chunk_matches_get_commit():
+    moves = [0, 1, 2, 3, -1, 2 ** 255 - 1, -2 ** 255]
+    keys, commitments = commit_chunk(moves)
+    assert len(keys) == len(commitments) == 32 * len(moves)
+    for i, move in enumerate(moves):
+        assert commitments[i * 32:i * 32 + 32] == get_commit(move, keys[i * 32:i * 32 + 32])
+
+
+def test_bulk_commit_keeps_input_order_across_processes():
+    moves = [i % 4 for i in range(250)]
+    chunks = list(bulk_commit(moves, processes=2, chunk_size=64))
+    assert [move for chunk, _, _ in chunks for move in chunk] == moves
+    for chunk, keys, commitments in chunks:
+        assert commitments[:32] == get_commit(chunk[0], keys[:32])
+
+
+def test_write_commitments_streams_csv_lines():
+    out = io.StringIO()
+    assert write_commitments([1, 3, 2], out, processes=1, chunk_size=2) == 3
+    lines = [line.split(',') for line in out.getvalue().splitlines()]
+    assert [int(move) for move, _, _ in lines] == [1, 3, 2]
+    for move, key, commitment in lines:
+        assert bytes.fromhex(commitment) == get_commit(int(move), bytes.fromhex(key))
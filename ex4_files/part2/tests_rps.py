@@ -1,12 +1,24 @@
+import os
+import random
 import pytest
 from hexbytes import HexBytes
 from web3 import Web3
-import solcx
-from solcx import compile_files, install_solc
 from web3.exceptions import ContractLogicError
 import hashlib
 from enum import Enum
 
+from ex4lib import chain
+from ex4lib.batch import batch_call
+from ex4lib.compiler import compile_contract
+from ex4lib.providers import make_web3
+from ex4lib.rps_indexer import RPSIndexer
+from ex4lib.rps_model import differential, random_actions
+from ex4lib.rps_client import (GameSummary, MoveCommitment, MoveReveal, balances_of, get_games, iter_game_range,
+                               make_moves, reveal_moves)
+from ex4lib.rps_types import GameState
+from ex4lib.solc_binary import locked_version
+from ex4lib.timeout_watcher import TimeoutWatcher
+
 
 # Define Move enum locally in your test file
 class Move(Enum):
@@ -16,37 +28,35 @@ class Move(Enum):
     SCISSORS = 3
 
 
-SOLC_VERSION = 'v0.8.19'
-
-# Ensure you have the appropriate Solidity compiler version installed
-install_solc(SOLC_VERSION)
+# The compiler version is pinned in solc.lock and resolved offline (see ex4lib/solc_binary.py)
+SOLC_VERSION = locked_version()
 REVEAL_PHASE_LENGTH = 4
 
 
-# Compile Solidity source code
+# Compile Solidity source code (cached, so solc only runs when RPS.sol changes)
 def compile(file_name: str):
-    solcx.set_solc_version(SOLC_VERSION)
-    compiled_sol = compile_files([file_name], output_values=['abi', 'bin'])
-    contract_id, contract_interface = compiled_sol.popitem()
+    contract_interface = compile_contract(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name), SOLC_VERSION)
     return contract_interface['bin'], contract_interface['abi']
 
 
-@pytest.fixture
+@pytest.fixture(scope='session')
 def w3():
-    # Initialize Web3 instance
-    w3 = Web3(Web3.HTTPProvider("http://127.0.0.1:8545"))
+    # Initialize Web3 instance (Hardhat node or in-process EVM, see --backend)
+    w3 = make_web3()
     assert w3.is_connected(), "Web3 is not connected"
     return w3
 
 
-@pytest.fixture
+@pytest.fixture(scope='session')
 def accounts(w3):
     # Get the list of accounts
     return w3.eth.accounts
 
 
-@pytest.fixture
-def contract(w3, accounts):
+@pytest.fixture(scope='session')
+def deployed_contract(w3, accounts):
+    # Deploys RPS and funds the players once per session; tests get this state back through chain_snapshot.
     # Compile the contract
     bytecode, abi = compile("RPS.sol")
 
@@ -55,29 +65,44 @@ def contract(w3, accounts):
     tx_hash = contract.constructor(REVEAL_PHASE_LENGTH).transact({'from': accounts[0]})
     tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
     contract_address = tx_receipt.contractAddress
+
+    # Fund player1, player2 and evil_player with enough balance
+    for player in accounts[1:4]:
+        w3.eth.send_transaction({'to': player, 'from': accounts[0], 'value': w3.to_wei(5, 'ether')})
     return w3.eth.contract(address=contract_address, abi=abi)
 
 
+@pytest.fixture(scope='session')
+def chain_snapshot(w3, deployed_contract):
+    # holds the id of the snapshot taken right after deployment (a new one is taken after every revert)
+    return [chain.snapshot(w3)]
+
+
+@pytest.fixture(autouse=True)
+def pristine_chain(w3, chain_snapshot):
+    # Every test starts from the freshly deployed and funded chain, and whatever it did is rolled back afterwards.
+    yield
+    chain.revert(w3, chain_snapshot[0])
+    chain_snapshot[0] = chain.snapshot(w3)
+
+
+@pytest.fixture
+def contract(deployed_contract):
+    return deployed_contract
+
+
 @pytest.fixture
-def player1(w3, accounts):
-    w3.eth.send_transaction(
-        {'to': accounts[1], 'from': w3.eth.accounts[0], 'value': w3.to_wei(5, 'ether')})
-    balance = w3.eth.get_balance(accounts[1])
-    print(balance)
+def player1(accounts):
     return accounts[1]
 
 
 @pytest.fixture
-def player2(w3, accounts):
-    # Fund player1 and player2 accounts with enough balance
-    w3.eth.send_transaction({'to': accounts[2], 'value': w3.to_wei(5, 'ether')})  # Fund player2's account
+def player2(accounts):
     return accounts[2]
 
 
 @pytest.fixture
-def evil_player(w3, accounts):
-    # Fund player1 and player2 accounts with enough balance
-    w3.eth.send_transaction({'to': accounts[3], 'value': w3.to_wei(5, 'ether')})  # Fund player2's account
+def evil_player(accounts):
     return accounts[3]
 
 
@@ -85,6 +110,11 @@ def virualBalance(contract, player):
     return contract.functions.balanceOf(player).call()
 
 
+def virualBalances(contract, *players):
+    # balanceOf for several players in a single JSON-RPC batch
+    return batch_call(contract.w3, [contract.functions.balanceOf(player) for player in players])
+
+
 def test_constructor(contract):
     # Check initial reveal period length according to the revealPeriodLength in contract constructor
     reveal_period_length = contract.functions.revealPeriodLength().call()
@@ -212,8 +242,7 @@ def test_reveal_move_both_players(contract, accounts, w3, player1, player2):
     bet_amount = w3.to_wei(5, 'ether')
     contract.receive().transact({'from': player1, 'value': w3.to_wei(5, 'ether')})
     contract.receive().transact({'from': player2, 'value': w3.to_wei(5, 'ether')})
-    loser_balance_before = contract.functions.balanceOf(player1).call()
-    winner_balance_before = contract.functions.balanceOf(player2).call()
+    loser_balance_before, winner_balance_before = virualBalances(contract, player1, player2)
     # Check balances before endGame
     # Player 1's move
     str1 = (Web3.to_bytes(text="secret1")).zfill(32)
@@ -235,8 +264,7 @@ def test_reveal_move_both_players(contract, accounts, w3, player1, player2):
     game_state = contract.functions.getGameState(game_id).call()
     assert game_state == 0  # GameState.NoGame
     # Calculate expected balances
-    winner_balance_after = contract.functions.balanceOf(player2).call()
-    loser_balance_after = contract.functions.balanceOf(player1).call()
+    winner_balance_after, loser_balance_after = virualBalances(contract, player2, player1)
 
     # Check if the winner balance increased by the correct amount (bet)
     assert winner_balance_after == winner_balance_before + bet_amount
@@ -250,8 +278,7 @@ def test_balanceOf_2_different_games_same_players(contract, accounts, w3, player
     bet_amount = w3.to_wei(5, 'ether')
     contract.receive().transact({'from': player1, 'value': w3.to_wei(5, 'ether')})
     contract.receive().transact({'from': player2, 'value': w3.to_wei(5, 'ether')})
-    player1_balance_before_first_game = contract.functions.balanceOf(player1).call()
-    player2_balance_before_first_game = contract.functions.balanceOf(player2).call()
+    player1_balance_before_first_game, player2_balance_before_first_game = virualBalances(contract, player1, player2)
     # Check balances before endGame
     # Player 1's move
     str1 = (Web3.to_bytes(text="secret1")).zfill(32)
@@ -270,8 +297,7 @@ def test_balanceOf_2_different_games_same_players(contract, accounts, w3, player
     # Check game state after both players revealed
     contract.functions.getGameState(game_id).call()
     # Calculate expected balances
-    player1_balance_after_first_game = contract.functions.balanceOf(player1).call()
-    player2_balance_after_first_game = contract.functions.balanceOf(player2).call()
+    player1_balance_after_first_game, player2_balance_after_first_game = virualBalances(contract, player1, player2)
     # Check if the winner balance increased by the correct amount (bet)
     assert player1_balance_before_first_game == player1_balance_after_first_game
     # Check if the loser balance decreased by the bet amount
@@ -288,8 +314,7 @@ def test_balanceOf_2_different_games_same_players(contract, accounts, w3, player
     # Check game state after first player revealed
     # Player 2 reveals move
     contract.functions.revealMove(game_id, 3, str2).transact({'from': player2})
-    player1_balance_after_second_game = contract.functions.balanceOf(player1).call()
-    player2_balance_after_second_game = contract.functions.balanceOf(player2).call()
+    player1_balance_after_second_game, player2_balance_after_second_game = virualBalances(contract, player1, player2)
     assert player1_balance_after_second_game == player1_balance_after_first_game + bet_amount
     assert player2_balance_after_second_game == player2_balance_after_first_game - bet_amount
 
@@ -339,8 +364,7 @@ def test_double_spent(contract, accounts, w3, player1):
 
 
 def test_revealPhaseEnded(contract, accounts, w3, player1, player2):
-    assert virualBalance(contract, player1) == 0
-    assert virualBalance(contract, player2) == 0
+    assert virualBalances(contract, player1, player2) == [0, 0]
     game_id = 0
 
     def tryToEnterRevealTestEnded(player=player1):
@@ -367,8 +391,7 @@ def test_revealPhaseEnded(contract, accounts, w3, player1, player2):
     tryToEnterRevealTestEnded()
 
     # Mine some unimportant blocks.
-    for i in range(REVEAL_PHASE_LENGTH + 1):
-        w3.provider.make_request('evm_mine', [])
+    chain.mine(w3, REVEAL_PHASE_LENGTH + 1)
     assert contract.functions.getGameState(game_id).call() == 1
 
     # See that you can't enter revealPhaseEnded
@@ -383,8 +406,7 @@ def test_revealPhaseEnded(contract, accounts, w3, player1, player2):
     tryToEnterRevealTestEnded()
 
     # Mine some unimportant blocks.
-    for i in range(REVEAL_PHASE_LENGTH + 1):
-        w3.provider.make_request('evm_mine', [])
+    chain.mine(w3, REVEAL_PHASE_LENGTH + 1)
     assert contract.functions.getGameState(game_id).call() == 2
 
     # See that you can't enter revealPhaseEnded
@@ -393,14 +415,13 @@ def test_revealPhaseEnded(contract, accounts, w3, player1, player2):
     tx3 = contract.functions.revealMove(game_id, 1, str1).transact({'from': player1})
 
     # Mine some IMPORTANT blocks.
-    for i in range(REVEAL_PHASE_LENGTH - 1):
-        w3.provider.make_request('evm_mine', [])
+    chain.mine(w3, REVEAL_PHASE_LENGTH - 1)
 
     # See that you can't enter revealPhaseEnded
     tryToEnterRevealTestEnded()
 
     # Mine one last block:
-    w3.provider.make_request('evm_mine', [])
+    chain.mine(w3)
 
     # See that you can enter revealPhaseEnded
     contract.functions.revealPhaseEnded(game_id).transact({'from': player1})
@@ -409,11 +430,9 @@ def test_revealPhaseEnded(contract, accounts, w3, player1, player2):
 
 def test_withdraw(contract, accounts, w3, player1, player2):
     def checkBaseBalance(b=5):
-        assert virualBalance(contract, player1) == w3.to_wei(b, 'ether')
-        assert virualBalance(contract, player2) == w3.to_wei(b, 'ether')
+        assert virualBalances(contract, player1, player2) == [w3.to_wei(b, 'ether')] * 2
 
-    assert virualBalance(contract, player1) == 0
-    assert virualBalance(contract, player2) == 0
+    assert virualBalances(contract, player1, player2) == [0, 0]
 
     game_id = 0
     bet_amount = w3.to_wei(5, 'ether')
@@ -426,8 +445,7 @@ def test_withdraw(contract, accounts, w3, player1, player2):
     hidden_move1 = HexBytes(Web3.solidity_keccak(['int256', 'bytes32'], [1, str1]))
     tx1 = contract.functions.makeMove(game_id, bet_amount, hidden_move1).transact({'from': player1})
 
-    assert virualBalance(contract, player1) == w3.to_wei(0, 'ether')
-    assert virualBalance(contract, player2) == w3.to_wei(5, 'ether')
+    assert virualBalances(contract, player1, player2) == [w3.to_wei(0, 'ether'), w3.to_wei(5, 'ether')]
 
     str2 = (Web3.to_bytes(text="secret2")).zfill(32)
     hidden_move2 = HexBytes(Web3.solidity_keccak(['int256', 'bytes32'], [2, str2]))
@@ -442,8 +460,7 @@ def test_withdraw(contract, accounts, w3, player1, player2):
     tx4 = contract.functions.revealMove(game_id, 2, str2).transact({'from': player2})
 
     # Game ended, now try to withdraw
-    assert virualBalance(contract, player1) == w3.to_wei(0, 'ether')
-    assert virualBalance(contract, player2) == w3.to_wei(10, 'ether')
+    assert virualBalances(contract, player1, player2) == [w3.to_wei(0, 'ether'), w3.to_wei(10, 'ether')]
 
     try:
         contract.functions.withdraw(w3.to_wei(15, 'ether')).transact({'from': player2})
@@ -452,8 +469,7 @@ def test_withdraw(contract, accounts, w3, player1, player2):
         pass
 
     contract.functions.withdraw(w3.to_wei(7, 'ether')).transact({'from': player2})
-    assert virualBalance(contract, player1) == w3.to_wei(0, 'ether')
-    assert virualBalance(contract, player2) == w3.to_wei(3, 'ether')
+    assert virualBalances(contract, player1, player2) == [w3.to_wei(0, 'ether'), w3.to_wei(3, 'ether')]
 
     try:
         contract.functions.withdraw(w3.to_wei(1, 'ether')).transact({'from': player1})
@@ -462,17 +478,14 @@ def test_withdraw(contract, accounts, w3, player1, player2):
         pass
 
     contract.receive().transact({'from': player2, 'value': bet_amount})
-    assert virualBalance(contract, player1) == w3.to_wei(0, 'ether')
-    assert virualBalance(contract, player2) == w3.to_wei(8, 'ether')
+    assert virualBalances(contract, player1, player2) == [w3.to_wei(0, 'ether'), w3.to_wei(8, 'ether')]
 
 
 def test_withdraw_draw(contract, accounts, w3, player1, player2):
     def checkBaseBalance(b=5):
-        assert virualBalance(contract, player1) == w3.to_wei(b, 'ether')
-        assert virualBalance(contract, player2) == w3.to_wei(b, 'ether')
+        assert virualBalances(contract, player1, player2) == [w3.to_wei(b, 'ether')] * 2
 
-    assert virualBalance(contract, player1) == 0
-    assert virualBalance(contract, player2) == 0
+    assert virualBalances(contract, player1, player2) == [0, 0]
 
     game_id = 0
     bet_amount = w3.to_wei(5, 'ether')
@@ -485,8 +498,7 @@ def test_withdraw_draw(contract, accounts, w3, player1, player2):
     hidden_move1 = HexBytes(Web3.solidity_keccak(['int256', 'bytes32'], [1, str1]))
     tx1 = contract.functions.makeMove(game_id, bet_amount, hidden_move1).transact({'from': player1})
 
-    assert virualBalance(contract, player1) == w3.to_wei(0, 'ether')
-    assert virualBalance(contract, player2) == w3.to_wei(5, 'ether')
+    assert virualBalances(contract, player1, player2) == [w3.to_wei(0, 'ether'), w3.to_wei(5, 'ether')]
 
     str2 = (Web3.to_bytes(text="secret2")).zfill(32)
     hidden_move2 = HexBytes(Web3.solidity_keccak(['int256', 'bytes32'], [1, str2]))
@@ -505,8 +517,7 @@ def test_withdraw_draw(contract, accounts, w3, player1, player2):
 
 
 def test_playerSendsTwoMoves(contract, accounts, w3, player1, player2):
-    assert virualBalance(contract, player1) == 0
-    assert virualBalance(contract, player2) == 0
+    assert virualBalances(contract, player1, player2) == [0, 0]
 
     game_id = 0
     bet_amount = w3.to_wei(5, 'ether')
@@ -553,8 +564,7 @@ def test_RedoGame(contract, player1, player2, w3):
         bet_amount = w3.to_wei(5, 'ether')
         contract.receive().transact({'from': player1, 'value': w3.to_wei(5, 'ether')})
         contract.receive().transact({'from': player2, 'value': w3.to_wei(5, 'ether')})
-        player1_balance_before_first_game = contract.functions.balanceOf(player1).call()
-        player2_balance_before_first_game = contract.functions.balanceOf(player2).call()
+        player1_balance_before_first_game, player2_balance_before_first_game = virualBalances(contract, player1, player2)
         # Check balances before endGame
         # Player 1's move
         str1 = (Web3.to_bytes(text="secret1")).zfill(32)
@@ -575,4 +585,164 @@ def test_RedoGame(contract, player1, player2, w3):
         # Calculate expected balances
         assert game_id == 0
     playSingleGame()
-    playSingleGame()
\ No newline at end of file
+    playSingleGame()
+
+
+def test_bulk_game_queries(contract, w3, player1, player2):
+    bet_amount = w3.to_wei(1, 'ether')
+    contract.receive().transact({'from': player1, 'value': w3.to_wei(3, 'ether')})
+    contract.receive().transact({'from': player2, 'value': w3.to_wei(1, 'ether')})
+    hidden_move = HexBytes(Web3.solidity_keccak(['int256', 'bytes32'], [1, b"secret"]))
+    contract.functions.makeMove(1, bet_amount, hidden_move).transact({'from': player1})
+    contract.functions.makeMove(3, bet_amount, hidden_move).transact({'from': player1})
+    contract.functions.makeMove(3, bet_amount, hidden_move).transact({'from': player2})
+
+    # the views answer for many ids / players at once
+    states, bet_amounts, reveal_blocks = contract.functions.getGameStates([3, 0, 1]).call()
+    assert states == [2, 0, 1]  # MOVE2, NO_GAME, MOVE1
+    assert bet_amounts == [bet_amount, 0, bet_amount]
+    assert reveal_blocks == [0, 0, 0]
+    assert contract.functions.getGameStateRange(0, 4).call()[0] == [0, 1, 0, 2]
+    assert contract.functions.balancesOf([player1, player2]).call() == [w3.to_wei(1, 'ether'), 0]
+
+    # the client pages through them
+    assert [game.state for game in iter_game_range(contract, 0, 5, page_size=2, pages_per_batch=2)] == [
+        GameState.NO_GAME, GameState.MOVE1, GameState.NO_GAME, GameState.MOVE2, GameState.NO_GAME]
+    assert get_games(contract, [3, 1], page_size=1) == [
+        GameSummary(3, GameState.MOVE2, bet_amount, 0), GameSummary(1, GameState.MOVE1, bet_amount, 0)]
+    assert balances_of(contract, [player1, player2], page_size=1) == {player1: w3.to_wei(1, 'ether'), player2: 0}
+
+
+def test_batch_moves(contract, w3, player1, player2):
+    bet_amount = w3.to_wei(1, 'ether')
+    contract.receive().transact({'from': player1, 'value': w3.to_wei(10, 'ether')})
+    contract.receive().transact({'from': player2, 'value': w3.to_wei(10, 'ether')})
+    key1, key2 = b"secret1".ljust(32, b"\0"), b"secret2".ljust(32, b"\0")
+    games = range(10, 16)
+    commit1 = [MoveCommitment(g, bet_amount, Web3.solidity_keccak(['int256', 'bytes32'], [1, key1])) for g in games]
+    commit2 = [MoveCommitment(g, 0, Web3.solidity_keccak(['int256', 'bytes32'], [3, key2])) for g in games]
+
+    # a small gas cap forces several transactions
+    assert len(make_moves(contract, player1, commit1, max_gas=300_000)) > 1
+    assert len(make_moves(contract, player2, commit2)) == 1
+    assert [game.state for game in get_games(contract, list(games))] == [GameState.MOVE2] * len(games)
+
+    # all or nothing: one bad game reverts the whole batch
+    with pytest.raises(ContractLogicError, match="Invalid commitment"):
+        contract.functions.revealMoves([10, 11], [1, 2], [key1, key1]).transact({'from': player1})
+    with pytest.raises(ContractLogicError, match="Length mismatch"):
+        contract.functions.revealMoves([10, 11], [1], [key1, key1]).transact({'from': player1})
+    assert contract.functions.getGameStates([10, 11]).call()[0] == [GameState.MOVE2] * 2
+
+    reveal_moves(contract, player1, [MoveReveal(g, 1, key1) for g in games], max_gas=200_000)
+    reveal_moves(contract, player2, [MoveReveal(g, 3, key2) for g in games])
+    # rock beats scissors in every game
+    assert [game.state for game in get_games(contract, list(games))] == [GameState.NO_GAME] * len(games)
+    assert list(virualBalances(contract, player1, player2)) == [w3.to_wei(16, 'ether'), w3.to_wei(4, 'ether')]
+
+
+def test_deposit_and_commit_reveal_and_withdraw(contract, w3, player1, player2):
+    bet_amount = w3.to_wei(1, 'ether')
+    key1, key2 = b"secret1".ljust(32, b"\0"), b"secret2".ljust(32, b"\0")
+    hidden1 = Web3.solidity_keccak(['int256', 'bytes32'], [2, key1])
+    hidden2 = Web3.solidity_keccak(['int256', 'bytes32'], [1, key2])
+
+    # the deposit is undone with the move it came with
+    with pytest.raises(ContractLogicError, match="Not enough balance"):
+        contract.functions.depositAndMakeMove(7, 2 * bet_amount, hidden1).transact({'from': player1, 'value': bet_amount})
+    assert virualBalance(contract, player1) == 0
+
+    contract.functions.depositAndMakeMove(7, bet_amount, hidden1).transact({'from': player1, 'value': 2 * bet_amount})
+    contract.functions.depositAndMakeMove(7, 0, hidden2).transact({'from': player2, 'value': bet_amount})
+    assert contract.functions.getGameState(7).call() == GameState.MOVE2
+    assert list(virualBalances(contract, player1, player2)) == [bet_amount, 0]
+
+    def received(player, function):
+        # ether the player's account got from the transaction, net of its fee
+        before = w3.eth.get_balance(player)
+        receipt = w3.eth.get_transaction_receipt(function.transact({'from': player}))
+        return w3.eth.get_balance(player) - before + receipt['gasUsed'] * receipt['effectiveGasPrice']
+
+    # the first revealer has nothing to withdraw yet; the final reveal withdraws the winnings only, and the deposit
+    # player1 had left over stays in the contract
+    assert received(player2, contract.functions.revealMoveAndWithdraw(7, 1, key2)) == 0
+    assert received(player1, contract.functions.revealMoveAndWithdraw(7, 2, key1)) == 2 * bet_amount
+    assert list(virualBalances(contract, player1, player2)) == [bet_amount, 0]
+
+
+def test_indexer_follows_events(contract, w3, player1, player2, tmp_path):
+    bet_amount = w3.to_wei(2, 'ether')
+    contract.receive().transact({'from': player1, 'value': w3.to_wei(3, 'ether')})
+    contract.receive().transact({'from': player2, 'value': w3.to_wei(2, 'ether')})
+    str1 = (Web3.to_bytes(text="secret1")).zfill(32)
+    str2 = (Web3.to_bytes(text="secret2")).zfill(32)
+    contract.functions.makeMove(7, bet_amount, HexBytes(Web3.solidity_keccak(['int256', 'bytes32'], [1, str1]))).transact({'from': player1})
+    contract.functions.makeMove(7, bet_amount, HexBytes(Web3.solidity_keccak(['int256', 'bytes32'], [2, str2]))).transact({'from': player2})
+    contract.functions.revealMove(7, 2, str2).transact({'from': player2})
+
+    indexer = RPSIndexer(contract, str(tmp_path / 'rps.sqlite'), chunk_size=3)
+    indexer.sync()
+    game = indexer.game(7)
+    assert game.state == GameState.REVEAL1
+    assert (game.player1, game.player2, game.bet_amount) == (player1, player2, bet_amount)
+
+    contract.functions.revealMove(7, 1, str1).transact({'from': player1})
+    contract.functions.withdraw(w3.to_wei(1, 'ether')).transact({'from': player2})
+    indexer.sync()
+    assert indexer.game(7).state == GameState.NO_GAME
+    assert [indexer.balance(player1), indexer.balance(player2)] == virualBalances(contract, player1, player2)
+    indexer.close()
+
+
+def test_timeout_watcher_claims_in_first_eligible_block(contract, w3, player1, player2):
+    bet_amount = w3.to_wei(1, 'ether')
+    contract.receive().transact({'from': player1, 'value': bet_amount})
+    contract.receive().transact({'from': player2, 'value': bet_amount})
+    watcher = TimeoutWatcher(contract, [player2], start_block=w3.eth.block_number)
+    str1 = (Web3.to_bytes(text="secret1")).zfill(32)
+    str2 = (Web3.to_bytes(text="secret2")).zfill(32)
+    contract.functions.makeMove(3, bet_amount, HexBytes(Web3.solidity_keccak(['int256', 'bytes32'], [1, str1]))).transact({'from': player1})
+    contract.functions.makeMove(3, bet_amount, HexBytes(Web3.solidity_keccak(['int256', 'bytes32'], [2, str2]))).transact({'from': player2})
+    tx_hash = contract.functions.revealMove(3, 2, str2).transact({'from': player2})
+    reveal_block = w3.eth.wait_for_transaction_receipt(tx_hash).blockNumber
+
+    # player1 never reveals: the watcher sends nothing until the claim can succeed, then claims at once
+    claims = watcher.poll()
+    while not claims:
+        chain.mine(w3)
+        claims = watcher.poll()
+    assert len(claims) == 1
+    assert w3.eth.wait_for_transaction_receipt(claims[0]).blockNumber == reveal_block + REVEAL_PHASE_LENGTH
+    assert contract.functions.getGameState(3).call() == GameState.NO_GAME
+    assert virualBalances(contract, player1, player2) == [0, 2 * bet_amount]
+    assert watcher.poll() == []
+
+
+def test_timeout_watcher_claims_games_revealed_before_it_started(contract, w3, player1, player2):
+    bet_amount = w3.to_wei(1, 'ether')
+    contract.receive().transact({'from': player1, 'value': bet_amount})
+    contract.receive().transact({'from': player2, 'value': bet_amount})
+    str1 = (Web3.to_bytes(text="secret1")).zfill(32)
+    str2 = (Web3.to_bytes(text="secret2")).zfill(32)
+    contract.functions.makeMove(3, bet_amount, HexBytes(Web3.solidity_keccak(['int256', 'bytes32'], [1, str1]))).transact({'from': player1})
+    contract.functions.makeMove(3, bet_amount, HexBytes(Web3.solidity_keccak(['int256', 'bytes32'], [2, str2]))).transact({'from': player2})
+    tx_hash = contract.functions.revealMove(3, 2, str2).transact({'from': player2})
+    reveal_block = w3.eth.wait_for_transaction_receipt(tx_hash).blockNumber
+    chain.mine(w3, REVEAL_PHASE_LENGTH)
+
+    # started after the reveal (and after the deadline): the game is found from the chain and claimed at once
+    watcher = TimeoutWatcher(contract, [player2], start_block=w3.eth.block_number)
+    claims = watcher.poll()
+    assert len(claims) == 1
+    assert w3.eth.wait_for_transaction_receipt(claims[0]).blockNumber > reveal_block + REVEAL_PHASE_LENGTH
+    assert contract.functions.getGameState(3).call() == GameState.NO_GAME
+    assert virualBalances(contract, player1, player2) == [0, 2 * bet_amount]
+
+
+def test_contract_matches_reference_model(contract, w3, accounts):
+    # random sequences replayed on the contract and on ex4lib.rps_model must agree step by step
+    players = accounts[4:8]
+    for seed in range(3):
+        actions = random_actions(random.Random(seed), len(players), 4, 150, reveal_period_length=REVEAL_PHASE_LENGTH)
+        with chain.isolated(w3):
+            differential(contract, players, actions, num_games=4)
\ No newline at end of file
@@ -0,0 +1,75 @@
+import asyncio
+import os
+
+from ex4lib.compiler import compile_contract
+from ex4lib.providers import make_async_web3
+from ex4lib.rps_player import AsyncRPSPlayer
+from ex4lib.rps_types import GameState, Move
+
+# The asyncio player engine (ex4lib/rps_player.py) playing many games at once, on its own AsyncWeb3 connection
+# (a separate in-process chain with --backend tester, the same node with http).
+
+REVEAL_PHASE_LENGTH = 4
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+async def deploy(w3):
+    contract_interface = compile_contract(os.path.join(HERE, 'RPS.sol'), contract_name='RPS')
+    factory = w3.eth.contract(abi=contract_interface['abi'], bytecode=contract_interface['bin'])
+    tx_hash = await factory.constructor(REVEAL_PHASE_LENGTH).transact({'from': (await w3.eth.accounts)[0]})
+    receipt = await w3.eth.wait_for_transaction_receipt(tx_hash)
+    return w3.eth.contract(address=receipt.contractAddress, abi=contract_interface['abi'])
+
+
+def test_concurrent_games():
+    async def main():
+        w3 = make_async_web3()
+        contract = await deploy(w3)
+        accounts = await w3.eth.accounts
+        player1, player2 = AsyncRPSPlayer(w3, contract, accounts[5]), AsyncRPSPlayer(w3, contract, accounts[6])
+        bet = w3.to_wei(1, 'gwei')
+        games = range(1000, 1030)
+        for player in (player1, player2):
+            await player.wait(await player.deposit(bet * len(games)))
+
+        # player1 always plays rock; player2 plays paper on even ids and rock (a tie) on odd ones
+        results = await asyncio.gather(
+            player1.play_many([(game_id, Move.ROCK, bet) for game_id in games], poll_interval=0.01),
+            player2.play_many([(game_id, Move.PAPER if game_id % 2 == 0 else Move.ROCK, bet) for game_id in games],
+                              poll_interval=0.01))
+        for states in results:
+            assert all(state in (GameState.REVEAL1, GameState.NO_GAME) for state in states), states
+        for game_id in games:
+            assert await contract.functions.getGameState(game_id).call() == GameState.NO_GAME
+            # whoever committed second saw MOVE2 before revealing
+            assert GameState.MOVE2 in player1.games[game_id].history + player2.games[game_id].history
+
+        assert await contract.functions.balanceOf(accounts[5]).call() == bet * 15
+        assert await contract.functions.balanceOf(accounts[6]).call() == bet * 45
+
+    asyncio.run(main())
+
+
+def test_reveal_when_opponent_commits_and_reveals_between_polls():
+    async def main():
+        w3 = make_async_web3()
+        contract = await deploy(w3)
+        accounts = await w3.eth.accounts
+        player1, player2 = AsyncRPSPlayer(w3, contract, accounts[5]), AsyncRPSPlayer(w3, contract, accounts[6])
+        bet, game_id = w3.to_wei(1, 'gwei'), 7
+        for player in (player1, player2):
+            await player.wait(await player.deposit(bet))
+
+        async def opponent():
+            # once player1 has seen MOVE1 and is sleeping until its next poll
+            while GameState.MOVE1 not in getattr(player1.games.get(game_id), 'history', []):
+                await asyncio.sleep(0.01)
+            await player2.wait(await player2.commit(game_id, Move.PAPER, bet))
+            await player2.wait(await player2.reveal(game_id))
+
+        state, _ = await asyncio.gather(player1.play(game_id, Move.SCISSORS, bet, poll_interval=1), opponent())
+        assert state == GameState.NO_GAME
+        assert player1.games[game_id].history == [GameState.MOVE1, GameState.REVEAL1, GameState.NO_GAME]
+        assert await contract.functions.balanceOf(accounts[5]).call() == bet * 2
+
+    asyncio.run(main())